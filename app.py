@@ -1,7 +1,15 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session, make_response
 from plaid_budget_fetcher import PlaidService
+from plaid_webhooks import WebhookQueue, WebhookVerifier
 from database import DatabaseManager
+from pagination import decode_cursor
+from json_responses import json_response, ndjson_response, wants_ndjson
+from password_hashing import PasswordHasherBusy
+import request_cache
 from dotenv import load_dotenv
+from datetime import date
+import hashlib
+import json
 import os
 from functools import wraps
 
@@ -10,10 +18,16 @@ load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+request_cache.init_app(app)
 
 # Initialize services
 plaid_service = None
 db = None
+webhook_verifier = None
+webhook_queue = None
+
+# Largest page the /transactions routes will return when a limit is requested
+TRANSACTIONS_MAX_PAGE_SIZE = 500
 
 def month_name_to_number(month_name):
     """Convert month name to month number"""
@@ -27,6 +41,29 @@ def month_name_to_number(month_name):
     }
     return month_mapping.get(month_name.strip().capitalize())
 
+def get_page_args():
+    """
+    Read the optional ?limit= and ?cursor= pagination parameters
+
+    Returns:
+        (limit, cursor); limit is None when neither is given (whole period)
+
+    Raises:
+        ValueError: If limit is not a positive integer or cursor is malformed
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor') or None
+    if limit is not None and limit.strip():
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        limit = min(limit, TRANSACTIONS_MAX_PAGE_SIZE)
+    else:
+        limit = None
+    if cursor:
+        decode_cursor(cursor)
+    return limit, cursor
+
 def get_plaid_service():
     global plaid_service
     if plaid_service is None:
@@ -40,7 +77,8 @@ def get_plaid_service():
         plaid_service = PlaidService(
             client_id=client_id,
             secret=secret,
-            environment=environment
+            environment=environment,
+            db=get_db()
         )
     return plaid_service
 
@@ -50,6 +88,19 @@ def get_db():
         db = DatabaseManager()
     return db
 
+def get_webhook_verifier():
+    global webhook_verifier
+    if webhook_verifier is None:
+        webhook_verifier = WebhookVerifier(get_plaid_service())
+    return webhook_verifier
+
+def get_webhook_queue():
+    global webhook_queue
+    if webhook_queue is None:
+        workers = int(os.getenv('PLAID_WEBHOOK_WORKERS', 1))
+        webhook_queue = WebhookQueue(get_plaid_service(), workers=workers)
+    return webhook_queue
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
@@ -60,6 +111,41 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def etag_from_data_version(f):
+    """
+    Decorator for JSON data routes: tag responses with an ETag derived from
+    the user's data version and answer a matching If-None-Match with 304
+    before the route runs any query or serializes anything
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = session['user_id']
+        version = get_db().get_data_version(user_id)
+        if version is None:
+            return f(*args, **kwargs)
+        
+        # Same user, data, URL and representation give the same body; routes
+        # that default to the current month also change when the month does.
+        # The transaction routes send NDJSON or JSON from one URL by Accept
+        representation = 'ndjson' if wants_ndjson() else 'json'
+        key = f"{user_id}:{version}:{request.full_path}:{representation}:{date.today():%Y-%m}"
+        etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+        
+        # A refresh must reach Plaid whatever the client already has
+        if request.args.get('refresh') != 'true' and request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            # Tagged with the version read before the route ran: if a write
+            # lands meanwhile the tag is already out of date, never too new
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Accept')
+        return response
+    return decorated_function
+
 @app.route('/')
 def main():
     if 'user_id' not in session:
@@ -70,6 +156,9 @@ def main():
         user_id = session['user_id']
         has_token = service.has_access_token(user_id)
         
+        # Record the visit so background refreshes prioritize this user
+        get_db().touch_user(user_id)
+        
         # Get user info
         user = get_db().get_user_by_id(user_id)
         
@@ -144,12 +233,16 @@ def login():
         try:
             user = get_db().authenticate_user(username, password)
             if user:
+                get_db().touch_user(user['id'])
                 session['user_id'] = user['id']
                 session['username'] = user['username']
                 flash(f'Welcome back, {user["username"]}!', 'success')
                 return redirect(url_for('main'))
             else:
                 flash('Invalid username or password.', 'error')
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
         except Exception as e:
             flash(f'Login error: {str(e)}', 'error')
     
@@ -183,6 +276,9 @@ def register():
                 return redirect(url_for('main'))
             else:
                 flash('Username already exists. Please choose a different one.', 'error')
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('register.html'), 503
         except Exception as e:
             flash(f'Registration error: {str(e)}', 'error')
     
@@ -229,6 +325,7 @@ def exchange_token():
 
 @app.route('/accounts', methods=['GET'])
 @login_required
+@etag_from_data_version
 def get_accounts():
     """Get user accounts (supports refresh parameter)"""
     try:
@@ -242,14 +339,15 @@ def get_accounts():
         force_refresh = request.args.get('refresh') == 'true'
         
         accounts = service.get_accounts(user_id, force_refresh=force_refresh)
-        return jsonify(accounts)
+        return json_response(accounts)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/transactions', methods=['GET'])
 @login_required
+@etag_from_data_version
 def get_transactions():
-    """Get user transactions (supports filtering and refresh)"""
+    """Get user transactions (supports filtering, refresh and ?format=ndjson streaming)"""
     try:
         service = get_plaid_service()
         user_id = session['user_id']
@@ -257,6 +355,11 @@ def get_transactions():
         if not service.has_access_token(user_id):
             return jsonify({"error": "No access token. Please connect a bank account first."}), 400
         
+        try:
+            limit, cursor = get_page_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Get query parameters
         account_types = request.args.getlist('account_types')  # e.g., ?account_types=depository&account_types=credit
         days = int(request.args.get('days', 30))
@@ -286,21 +389,29 @@ def get_transactions():
             # For days-based filtering, use current month
             month_int = current_date.month
         
+        # Stream the whole cached period, one transaction per line
+        if wants_ndjson():
+            return ndjson_response(service.iter_cached_transactions(
+                user_id, account_types=account_types, year=year_int, month=month_int))
+        
         transactions = service.get_transactions(
             user_id, 
             account_types=account_types,
             year=year_int if year_int is not None else None,
             month=month_int if month_int is not None else None,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            limit=limit,
+            cursor=cursor
         )
-        return jsonify(transactions)
+        return json_response(transactions)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/transactions/checking')
 @login_required
+@etag_from_data_version
 def get_checking_transactions():
-    """Get transactions from checking accounts only"""
+    """Get transactions from checking accounts only (supports ?format=ndjson streaming)"""
     try:
         service = get_plaid_service()
         user_id = session['user_id']
@@ -308,6 +419,11 @@ def get_checking_transactions():
         if not service.has_access_token(user_id):
             return jsonify({"error": "No access token. Please connect a bank account first."}), 400
         
+        try:
+            limit, cursor = get_page_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Get query parameters
         days = int(request.args.get('days', 30))
         year = request.args.get('year')
@@ -332,21 +448,29 @@ def get_checking_transactions():
             # For days-based filtering, use current month
             month_int = current_date.month
         
+        # Stream the whole cached period, one transaction per line
+        if wants_ndjson():
+            return ndjson_response(service.iter_cached_transactions(
+                user_id, account_types=['depository'], year=year_int, month=month_int))
+        
         transactions = service.get_transactions(
             user_id, 
             account_types=['depository'],
             year=year_int,
             month=month_int,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            limit=limit,
+            cursor=cursor
         )
-        return jsonify(transactions)
+        return json_response(transactions)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/transactions/credit')
 @login_required
+@etag_from_data_version
 def get_credit_transactions():
-    """Get transactions from credit card accounts only"""
+    """Get transactions from credit card accounts only (supports ?format=ndjson streaming)"""
     try:
         service = get_plaid_service()
         user_id = session['user_id']
@@ -354,6 +478,11 @@ def get_credit_transactions():
         if not service.has_access_token(user_id):
             return jsonify({"error": "No access token. Please connect a bank account first."}), 400
         
+        try:
+            limit, cursor = get_page_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Get query parameters
         days = int(request.args.get('days', 30))
         year = request.args.get('year')
@@ -378,14 +507,21 @@ def get_credit_transactions():
             # For days-based filtering, use current month
             month_int = current_date.month
         
+        # Stream the whole cached period, one transaction per line
+        if wants_ndjson():
+            return ndjson_response(service.iter_cached_transactions(
+                user_id, account_types=['credit'], year=year_int, month=month_int))
+        
         transactions = service.get_transactions(
             user_id, 
             account_types=['credit'],
             year=year_int,
             month=month_int,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            limit=limit,
+            cursor=cursor
         )
-        return jsonify(transactions)
+        return json_response(transactions)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -438,6 +574,27 @@ def transactions_page():
         flash(f"Error loading transactions: {str(e)}", "error")
         return redirect(url_for('main'))
 
+@app.route('/plaid/webhook', methods=['POST'])
+def plaid_webhook():
+    """Receive Plaid webhooks and queue a refresh of the affected item"""
+    try:
+        body = request.get_data()
+        
+        # Reject anything Plaid didn't sign (verification can be disabled for local testing)
+        if os.getenv('PLAID_WEBHOOK_VERIFY', 'true').lower() != 'false':
+            if not get_webhook_verifier().verify(body, request.headers.get('Plaid-Verification')):
+                return jsonify({"error": "Invalid webhook signature"}), 401
+        
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return jsonify({"error": "Invalid JSON body"}), 400
+        
+        queued = get_webhook_queue().enqueue(payload)
+        return jsonify({"received": True, "queued": queued})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/status', methods=['GET'])
 @login_required
 def status():
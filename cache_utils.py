@@ -0,0 +1,84 @@
+"""
+In-process caching utilities.
+Provides a thread-safe LRU cache whose entries also expire after a TTL,
+optionally bounded by the approximate memory its values use.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry time-to-live"""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, max_bytes: Optional[int] = None):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid after it is set
+            max_bytes: Optional limit on the total size passed to set(); least
+                       recently used entries are evicted to stay under it
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry (marking it recently used) or default"""
+        with self.lock:
+            entry = self.entries.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.bytes -= size
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0):
+        """
+        Store an entry, evicting the least recently used ones if over maxsize
+        (or over max_bytes, counting size as the entry's approximate footprint);
+        an entry bigger than max_bytes on its own is not stored
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self.entries[key] = (expires_at, value, size)
+            self.entries.move_to_end(key)
+            self.bytes += size
+            while len(self.entries) > self.maxsize or \
+                    (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value (or default)"""
+        with self.lock:
+            entry = self.entries.pop(key, self._MISSING)
+            if entry is not self._MISSING:
+                self.bytes -= entry[2]
+        return default if entry is self._MISSING else entry[1]
+
+    def clear(self):
+        """Remove every entry"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
@@ -1,173 +1,380 @@
 import sqlite3
-import hashlib
-import secrets
+import datetime
 import os
-from typing import Optional, Dict, Any
+import queue
+import threading
+from typing import Optional, Dict, Any, Iterator
 from contextlib import contextmanager
+from pagination import decode_cursor, encode_cursor
+from password_hashing import get_password_hasher
+from request_cache import invalidates, request_memoized
+from schema_migrations import Migration, migrate_once
+from summary_cache import versioned_summary
+
+
+def _create_schema(cursor):
+    """Schema version 1: every table and index, upgrading databases created before versioning"""
+    # Create users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            last_seen_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create user_tokens table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            access_token TEXT NOT NULL,
+            item_id TEXT,
+            public_token TEXT,
+            institution_id TEXT,
+            institution_name TEXT,
+            transactions_cursor TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Create accounts table for caching account information
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            token_id INTEGER NOT NULL,
+            account_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            subtype TEXT,
+            institution_name TEXT,
+            current_balance REAL,
+            available_balance REAL,
+            iso_currency_code TEXT DEFAULT 'USD',
+            unofficial_currency_code TEXT,
+            account_classification TEXT NOT NULL CHECK (account_classification IN ('asset', 'liability')),
+            custom_name TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            FOREIGN KEY (token_id) REFERENCES user_tokens (id) ON DELETE CASCADE,
+            UNIQUE(user_id, account_id)
+        )
+    ''')
+    
+    # Create transactions table for caching transaction data
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            account_id TEXT NOT NULL,
+            transaction_id TEXT NOT NULL,
+            amount REAL NOT NULL,
+            iso_currency_code TEXT DEFAULT 'USD',
+            unofficial_currency_code TEXT,
+            date DATE NOT NULL,
+            datetime TIMESTAMP,
+            authorized_date DATE,
+            authorized_datetime TIMESTAMP,
+            name TEXT NOT NULL,
+            merchant_name TEXT,
+            account_owner TEXT,
+            category TEXT,
+            subcategory TEXT,
+            transaction_type TEXT,
+            pending BOOLEAN DEFAULT FALSE,
+            institution_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            UNIQUE(user_id, transaction_id)
+        )
+    ''')
+    
+    # Create institutions table for caching Plaid institution metadata
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS institutions (
+            institution_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            logo TEXT,
+            primary_color TEXT,
+            url TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create transaction_rollups table: per-month totals by account and category,
+    # kept in step with transactions so summaries don't rescan raw rows
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_rollups (
+            user_id INTEGER NOT NULL,
+            year_month TEXT NOT NULL,
+            account_id TEXT NOT NULL,
+            category_primary TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            total_debits REAL NOT NULL DEFAULT 0,
+            total_credits REAL NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, year_month, account_id, category_primary, category),
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Create refresh_locks table so worker processes don't refresh the same item at once
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS refresh_locks (
+            lock_key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        )
+    ''')
+    
+    # Add activity column to users table if it doesn't exist
+    cursor.execute("PRAGMA table_info(users)")
+    user_columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'last_seen_at' not in user_columns:
+        cursor.execute('ALTER TABLE users ADD COLUMN last_seen_at TIMESTAMP')
+    
+    # Add institution columns to existing tables if they don't exist
+    cursor.execute("PRAGMA table_info(user_tokens)")
+    columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'institution_id' not in columns:
+        cursor.execute('ALTER TABLE user_tokens ADD COLUMN institution_id TEXT')
+    
+    if 'institution_name' not in columns:
+        cursor.execute('ALTER TABLE user_tokens ADD COLUMN institution_name TEXT')
+    
+    # Add /transactions/sync cursor column to user_tokens if it doesn't exist
+    if 'transactions_cursor' not in columns:
+        cursor.execute('ALTER TABLE user_tokens ADD COLUMN transactions_cursor TEXT')
+    
+    # Add category columns to transactions table if they don't exist
+    cursor.execute("PRAGMA table_info(transactions)")
+    transaction_columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'category_primary' not in transaction_columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN category_primary TEXT')
+    
+    if 'category_detailed' not in transaction_columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN category_detailed TEXT')
+    
+    if 'category_confidence' not in transaction_columns:
+        cursor.execute('ALTER TABLE transactions ADD COLUMN category_confidence TEXT')
+    
+    # Add custom_name column to accounts table if it doesn't exist
+    cursor.execute("PRAGMA table_info(accounts)")
+    account_columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'custom_name' not in account_columns:
+        cursor.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
+    
+    # Create indexes for faster lookups
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_user_id ON user_tokens(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_user_id ON accounts(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_token_id ON accounts(token_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_account_id ON accounts(account_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_custom_name ON accounts(custom_name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_account_id ON transactions(account_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_transaction_id ON transactions(transaction_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category_primary ON transactions(category_primary)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category_detailed ON transactions(category_detailed)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category)')
+    
+    # Covering index for period queries: the date range is an index range
+    # scan and summaries never need to visit the table rows
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_date_covering
+        ON transactions(user_id, date, account_id, amount, category_primary, category)
+    ''')
+    
+    # Keyset pagination index: read backwards it yields (date, datetime, id)
+    # newest first, so each page is a seek from the previous cursor
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_keyset
+        ON transactions(user_id, date, datetime)
+    ''')
+    
+    # Derive rollups for transactions stored before the table existed
+    DatabaseManager._rebuild_rollups(cursor)
+    
+
+def _add_user_data_version(cursor):
+    """Schema version 2: users.data_version, bumped by every account or transaction write"""
+    cursor.execute('ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0')
+
+
+def _add_sheet_syncs(cursor):
+    """Schema version 3: watermark and row mapping state for incremental sheet syncs"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_syncs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            spreadsheet_id TEXT NOT NULL,
+            sheet_title TEXT NOT NULL,
+            watermark_updated_at TIMESTAMP,
+            watermark_id INTEGER NOT NULL DEFAULT 0,
+            next_row INTEGER NOT NULL DEFAULT 2,
+            synced_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            UNIQUE(user_id, spreadsheet_id, sheet_title)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sheet_sync_rows (
+            sync_id INTEGER NOT NULL,
+            transaction_id TEXT NOT NULL,
+            row_number INTEGER NOT NULL,
+            row_hash TEXT NOT NULL,
+            PRIMARY KEY (sync_id, transaction_id),
+            FOREIGN KEY (sync_id) REFERENCES sheet_syncs (id) ON DELETE CASCADE
+        )
+    ''')
+    # Change feed index: transactions in (updated_at, id) order after a watermark
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_updated
+        ON transactions(user_id, updated_at, id)
+    ''')
+
+
+def _add_transaction_change_tracking(cursor):
+    """Schema version 4: pending_transaction_id, removal records and the sheet syncs' removal watermark"""
+    # Plaid's link from a posted transaction to its pending predecessor
+    cursor.execute('ALTER TABLE transactions ADD COLUMN pending_transaction_id TEXT')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_pending
+        ON transactions(user_id, pending_transaction_id)
+    ''')
+    # One row per deleted transaction, so syncs read only removals after their watermark
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_removals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            transaction_id TEXT NOT NULL,
+            removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transaction_removals_user_id
+        ON transaction_removals(user_id, id)
+    ''')
+    cursor.execute('ALTER TABLE sheet_syncs ADD COLUMN removal_watermark_id INTEGER NOT NULL DEFAULT 0')
+
+
+# Append new migrations here; never edit one that has shipped
+SCHEMA_MIGRATIONS = [
+    Migration(1, 'create_schema', _create_schema),
+    Migration(2, 'add_user_data_version', _add_user_data_version),
+    Migration(3, 'add_sheet_syncs', _add_sheet_syncs),
+    Migration(4, 'add_transaction_change_tracking', _add_transaction_change_tracking),
+]
+
 
 class DatabaseManager:
     """Manages SQLite database operations for user authentication and token storage"""
     
-    def __init__(self, db_path: str = "plaid_app.db"):
+    def __init__(self, db_path: str = "plaid_app.db", pool_size: Optional[int] = None):
         self.db_path = db_path
+        # Identifies this database in the process-wide summary cache
+        self.cache_namespace = os.path.abspath(db_path)
+        
+        # Idle connections kept open for reuse; busier moments open extra
+        # connections that are closed again once returned
+        if pool_size is None:
+            pool_size = int(os.getenv('SQLITE_POOL_SIZE', 5))
+        self.pool_size = max(0, pool_size)
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=self.pool_size)
+        self._pool_lock = threading.Lock()
+        self._pool_pid = os.getpid()
+        
         self.init_database()
     
     def init_database(self):
-        """Initialize the database and create tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    salt TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create user_tokens table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_tokens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    access_token TEXT NOT NULL,
-                    item_id TEXT,
-                    public_token TEXT,
-                    institution_id TEXT,
-                    institution_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Create accounts table for caching account information
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    token_id INTEGER NOT NULL,
-                    account_id TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    subtype TEXT,
-                    institution_name TEXT,
-                    current_balance REAL,
-                    available_balance REAL,
-                    iso_currency_code TEXT DEFAULT 'USD',
-                    unofficial_currency_code TEXT,
-                    account_classification TEXT NOT NULL CHECK (account_classification IN ('asset', 'liability')),
-                    custom_name TEXT,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-                    FOREIGN KEY (token_id) REFERENCES user_tokens (id) ON DELETE CASCADE,
-                    UNIQUE(user_id, account_id)
-                )
-            ''')
-            
-            # Create transactions table for caching transaction data
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    account_id TEXT NOT NULL,
-                    transaction_id TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    iso_currency_code TEXT DEFAULT 'USD',
-                    unofficial_currency_code TEXT,
-                    date DATE NOT NULL,
-                    datetime TIMESTAMP,
-                    authorized_date DATE,
-                    authorized_datetime TIMESTAMP,
-                    name TEXT NOT NULL,
-                    merchant_name TEXT,
-                    account_owner TEXT,
-                    category TEXT,
-                    subcategory TEXT,
-                    transaction_type TEXT,
-                    pending BOOLEAN DEFAULT FALSE,
-                    institution_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-                    UNIQUE(user_id, transaction_id)
-                )
-            ''')
-            
-            # Add institution columns to existing tables if they don't exist
-            cursor.execute("PRAGMA table_info(user_tokens)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'institution_id' not in columns:
-                cursor.execute('ALTER TABLE user_tokens ADD COLUMN institution_id TEXT')
-            
-            if 'institution_name' not in columns:
-                cursor.execute('ALTER TABLE user_tokens ADD COLUMN institution_name TEXT')
-            
-            # Add category columns to transactions table if they don't exist
-            cursor.execute("PRAGMA table_info(transactions)")
-            transaction_columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'category_primary' not in transaction_columns:
-                cursor.execute('ALTER TABLE transactions ADD COLUMN category_primary TEXT')
-            
-            if 'category_detailed' not in transaction_columns:
-                cursor.execute('ALTER TABLE transactions ADD COLUMN category_detailed TEXT')
-            
-            if 'category_confidence' not in transaction_columns:
-                cursor.execute('ALTER TABLE transactions ADD COLUMN category_confidence TEXT')
-            
-            # Add custom_name column to accounts table if it doesn't exist
-            cursor.execute("PRAGMA table_info(accounts)")
-            account_columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'custom_name' not in account_columns:
-                cursor.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
-            
-            # Create indexes for faster lookups
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_user_id ON user_tokens(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_user_id ON accounts(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_token_id ON accounts(token_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_account_id ON accounts(account_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_custom_name ON accounts(custom_name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_account_id ON transactions(account_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_transaction_id ON transactions(transaction_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category_primary ON transactions(category_primary)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category_detailed ON transactions(category_detailed)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category)')
-            
-            conn.commit()
+        """Bring the schema up to date; once current this is a single version check"""
+        migrate_once(os.path.abspath(self.db_path),
+                     lambda: sqlite3.connect(self.db_path, isolation_level=None),
+                     SCHEMA_MIGRATIONS,
+                     lambda cursor: cursor.execute('BEGIN IMMEDIATE'),
+                     (sqlite3.OperationalError,))
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection that may be handed between threads by the pool"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        return conn
+    
+    def _acquire_connection(self) -> sqlite3.Connection:
+        """Take a healthy idle connection from the pool, or open a new one"""
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                # Connections must not be shared with a forked parent
+                self._pool = queue.LifoQueue(maxsize=self.pool_size)
+                self._pool_pid = os.getpid()
+        
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return self._open_connection()
+            try:
+                conn.execute('SELECT 1')
+                return conn
+            except sqlite3.Error:
+                conn.close()
+    
+    def _release_connection(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, closing it if the pool is full"""
+        try:
+            if conn.in_transaction:
+                # Don't leak uncommitted work (or held locks) to the next caller
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        
+        if not self.pool_size or self._pool_pid != os.getpid():
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        """Context manager for pooled database connections"""
+        conn = self._acquire_connection()
         try:
             yield conn
         finally:
-            conn.close()
+            self._release_connection(conn)
+    
+    def close_connections(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
     
     def _hash_password(self, password: str, salt: Optional[str] = None) -> tuple[str, str]:
-        """Hash a password with salt"""
-        if salt is None:
-            salt = secrets.token_hex(32)
-        
-        password_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000  # iterations
-        )
-        return password_hash.hex(), salt
+        """Hash a password with salt using the configured KDF, on the hashing pool"""
+        return get_password_hasher().hash(password, salt)
     
     def create_user(self, username: str, password: str) -> Optional[int]:
         """Create a new user and return user ID"""
@@ -199,19 +406,34 @@ class DatabaseManager:
             ''', (username,))
             
             user = cursor.fetchone()
-            if not user:
-                return None
-            
-            # Verify password
-            password_hash, _ = self._hash_password(password, user['salt'])
-            if password_hash == user['password_hash']:
-                return {
-                    'id': user['id'],
-                    'username': user['username']
-                }
-            
+        if not user:
+            return None
+        
+        # Verify password without holding a connection while the KDF runs
+        matches, needs_rehash = get_password_hasher().verify(password, user['password_hash'], user['salt'])
+        if not matches:
             return None
+        
+        # Upgrade hashes made with older KDF settings while we have the password
+        if needs_rehash:
+            password_hash, salt = self._hash_password(password)
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        UPDATE users SET password_hash = ?, salt = ?
+                        WHERE id = ? AND password_hash = ?
+                    ''', (password_hash, salt, user['id'], user['password_hash']))
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error upgrading password hash: {e}")
+        
+        return {
+            'id': user['id'],
+            'username': user['username']
+        }
     
+    @request_memoized('user')
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         with self.get_connection() as conn:
@@ -227,6 +449,31 @@ class DatabaseManager:
                 return dict(user)
             return None
     
+    def touch_user(self, user_id: int) -> bool:
+        """Record that a user was just active (used to prioritize background refreshes)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('UPDATE users SET last_seen_at = CURRENT_TIMESTAMP WHERE id = ?', (user_id,))
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error updating user activity: {e}")
+            return False
+    
+    def get_data_version(self, user_id: int) -> Optional[int]:
+        """Current version of a user's account and transaction data (None if no such user)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT data_version FROM users WHERE id = ?', (user_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    def _bump_data_version(self, cursor, user_id: int):
+        """Mark a user's cached summaries stale as part of the current write (caller commits)"""
+        cursor.execute('UPDATE users SET data_version = data_version + 1 WHERE id = ?', (user_id,))
+    
+    @invalidates('tokens')
     def store_user_token(self, user_id: int, access_token: str, item_id: Optional[str] = None, 
                          public_token: Optional[str] = None, institution_id: Optional[str] = None, 
                          institution_name: Optional[str] = None) -> bool:
@@ -270,13 +517,14 @@ class DatabaseManager:
         except sqlite3.Error:
             return False
     
+    @request_memoized('tokens')
     def get_user_tokens(self, user_id: int) -> list[Dict[str, Any]]:
         """Get all user's access tokens with institution information"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, access_token, item_id, public_token, institution_id, institution_name,
-                       created_at, updated_at
+                       transactions_cursor, created_at, updated_at
                 FROM user_tokens
                 WHERE user_id = ?
                 ORDER BY created_at DESC
@@ -285,11 +533,27 @@ class DatabaseManager:
             tokens = cursor.fetchall()
             return [dict(token) for token in tokens]
     
+    def get_token_by_item_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Get the access token row (including user_id) for a Plaid item"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, user_id, access_token, item_id, public_token, institution_id, institution_name,
+                       transactions_cursor, created_at, updated_at
+                FROM user_tokens
+                WHERE item_id = ?
+                ORDER BY created_at DESC
+            ''', (item_id,))
+            
+            token = cursor.fetchone()
+            return dict(token) if token else None
+    
     def get_user_token(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user's first access token with institution information (for backward compatibility)"""
         tokens = self.get_user_tokens(user_id)
         return tokens[0] if tokens else None
     
+    @invalidates('tokens', 'accounts')
     def delete_user_token(self, user_id: int, token_id: Optional[int] = None) -> bool:
         """Delete a specific user token or all tokens for user"""
         try:
@@ -300,17 +564,47 @@ class DatabaseManager:
                                  (user_id, token_id))
                 else:
                     cursor.execute('DELETE FROM user_tokens WHERE user_id = ?', (user_id,))
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except sqlite3.Error:
             return False
     
+    @invalidates('tokens')
+    def update_transactions_cursor(self, user_id: int, token_id: int, transactions_cursor: Optional[str]) -> bool:
+        """Store the /transactions/sync cursor for a specific token"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE user_tokens
+                    SET transactions_cursor = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND id = ?
+                ''', (transactions_cursor, user_id, token_id))
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error updating transactions cursor: {e}")
+            return False
+    
+    def get_transactions_cursor(self, user_id: int, token_id: int) -> Optional[str]:
+        """Get the stored /transactions/sync cursor for a specific token"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT transactions_cursor FROM user_tokens
+                WHERE user_id = ? AND id = ?
+            ''', (user_id, token_id))
+            
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
     def get_all_users(self) -> list[Dict[str, Any]]:
         """Get all users (for admin purposes)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT u.id, u.username, u.created_at,
+                SELECT u.id, u.username, u.created_at, u.last_seen_at,
                        CASE WHEN ut.access_token IS NOT NULL THEN 1 ELSE 0 END as has_token
                 FROM users u
                 LEFT JOIN user_tokens ut ON u.id = ut.user_id
@@ -319,62 +613,164 @@ class DatabaseManager:
             
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_institution(self, institution_id: str) -> Optional[Dict[str, Any]]:
+        """Get cached institution metadata"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT institution_id, name, logo, primary_color, url, updated_at
+                FROM institutions
+                WHERE institution_id = ?
+            ''', (institution_id,))
+            
+            institution = cursor.fetchone()
+            return dict(institution) if institution else None
+    
+    def store_institution(self, institution: Dict[str, Any]) -> bool:
+        """Insert or refresh cached institution metadata"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO institutions (institution_id, name, logo, primary_color, url, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (institution_id) DO UPDATE SET
+                        name = excluded.name,
+                        logo = excluded.logo,
+                        primary_color = excluded.primary_color,
+                        url = excluded.url,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (
+                    institution['institution_id'], institution['name'], institution.get('logo'),
+                    institution.get('primary_color'), institution.get('url')
+                ))
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error storing institution: {e}")
+            return False
+    
+    def acquire_refresh_lock(self, lock_key: str, owner: str, ttl_seconds: float) -> bool:
+        """Take a refresh lock row unless another owner holds an unexpired one"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO refresh_locks (lock_key, owner, expires_at)
+                    VALUES (?, ?, datetime('now', ?))
+                    ON CONFLICT (lock_key) DO UPDATE SET
+                        owner = excluded.owner,
+                        expires_at = excluded.expires_at
+                    WHERE refresh_locks.expires_at <= CURRENT_TIMESTAMP
+                ''', (lock_key, owner, f'+{int(ttl_seconds)} seconds'))
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error acquiring refresh lock: {e}")
+            return False
+    
+    def release_refresh_lock(self, lock_key: str, owner: str) -> bool:
+        """Release a refresh lock row held by owner"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM refresh_locks WHERE lock_key = ? AND owner = ?
+                ''', (lock_key, owner))
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error releasing refresh lock: {e}")
+            return False
+    
+    def _classify_account_row(self, account: Dict[str, Any]) -> str:
+        """Use the classification provided by PlaidService, or fall back to our own logic"""
+        classification = account.get('account_classification')
+        if classification:
+            return classification
+        
+        account_type = (account.get('type') or '').lower()
+        account_subtype = (account.get('subtype') or '').lower()
+        
+        if account_type in ['depository', 'investment', 'other']:
+            return 'asset'
+        elif account_type in ['credit', 'loan']:
+            return 'liability'
+        # Default classification based on subtype
+        if account_subtype in ['checking', 'savings', 'money market', 'cd', 'brokerage', 'ira', '401k']:
+            return 'asset'
+        elif account_subtype in ['credit card', 'line of credit', 'mortgage', 'auto', 'student']:
+            return 'liability'
+        return 'asset'  # Default to asset
+    
+    @invalidates('accounts')
     def store_accounts(self, user_id: int, token_id: int, accounts_data: list[Dict[str, Any]]) -> bool:
-        """Store account information in the database"""
+        """
+        Upsert account information in one batch, keeping custom_name and created_at
+        
+        updated_at is refreshed on every stored account, since it dates the
+        cache, but data_version moves only when an account's data changed.
+        """
+        # Key on account_id so a repeated account doesn't hit the same row twice
+        rows_by_id = {}
+        for account in accounts_data:
+            balances = account.get('balances') or {}
+            rows_by_id[account['account_id']] = (
+                user_id, token_id, account['account_id'], account['name'],
+                account['type'], account.get('subtype'), account.get('institution_name'),
+                balances.get('current'), balances.get('available'),
+                balances.get('iso_currency_code', 'USD'),
+                balances.get('unofficial_currency_code'),
+                self._classify_account_row(account), True
+            )
+        rows = list(rows_by_id.values())
+        if not rows:
+            return True
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                for account in accounts_data:
-                    # Use the classification provided by PlaidService, or fall back to our own logic
-                    classification = account.get('account_classification')
-                    
-                    if not classification:
-                        # Fallback classification logic if not provided
-                        account_type = account.get('type', '').lower()
-                        account_subtype = account.get('subtype', '').lower()
-                        
-                        if account_type in ['depository', 'investment', 'other']:
-                            classification = 'asset'
-                        elif account_type in ['credit', 'loan']:
-                            classification = 'liability'
-                        else:
-                            # Default classification based on subtype
-                            if account_subtype in ['checking', 'savings', 'money market', 'cd', 'brokerage', 'ira', '401k']:
-                                classification = 'asset'
-                            elif account_subtype in ['credit card', 'line of credit', 'mortgage', 'auto', 'student']:
-                                classification = 'liability'
-                            else:
-                                classification = 'asset'  # Default to asset
-                    
-                    # Extract balance information
-                    balances = account.get('balances', {})
-                    current_balance = balances.get('current')
-                    available_balance = balances.get('available')
-                    
-                    # Check if account already exists to preserve custom_name
-                    cursor.execute('SELECT custom_name FROM accounts WHERE user_id = ? AND account_id = ?', 
-                                 (user_id, account['account_id']))
-                    existing_account = cursor.fetchone()
-                    existing_custom_name = existing_account['custom_name'] if existing_account else None
-                    
-                    # Insert or update account
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO accounts (
-                            user_id, token_id, account_id, name, type, subtype, 
-                            institution_name, current_balance, available_balance,
-                            iso_currency_code, unofficial_currency_code, account_classification,
-                            custom_name, is_active, updated_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (
-                        user_id, token_id, account['account_id'], account['name'],
-                        account['type'], account.get('subtype'), account.get('institution_name'),
-                        current_balance, available_balance,
-                        balances.get('iso_currency_code', 'USD'),
-                        balances.get('unofficial_currency_code'),
-                        classification, existing_custom_name, True
-                    ))
-                
+                changes_before = conn.total_changes
+                cursor.executemany('''
+                    INSERT INTO accounts (
+                        user_id, token_id, account_id, name, type, subtype,
+                        institution_name, current_balance, available_balance,
+                        iso_currency_code, unofficial_currency_code, account_classification,
+                        is_active, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, account_id) DO UPDATE SET
+                        token_id = excluded.token_id,
+                        name = excluded.name,
+                        type = excluded.type,
+                        subtype = excluded.subtype,
+                        institution_name = excluded.institution_name,
+                        current_balance = excluded.current_balance,
+                        available_balance = excluded.available_balance,
+                        iso_currency_code = excluded.iso_currency_code,
+                        unofficial_currency_code = excluded.unofficial_currency_code,
+                        account_classification = excluded.account_classification,
+                        is_active = excluded.is_active,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (
+                        accounts.token_id, accounts.name, accounts.type, accounts.subtype,
+                        accounts.institution_name, accounts.current_balance, accounts.available_balance,
+                        accounts.iso_currency_code, accounts.unofficial_currency_code,
+                        accounts.account_classification, accounts.is_active
+                    ) IS NOT (
+                        excluded.token_id, excluded.name, excluded.type, excluded.subtype,
+                        excluded.institution_name, excluded.current_balance, excluded.available_balance,
+                        excluded.iso_currency_code, excluded.unofficial_currency_code,
+                        excluded.account_classification, excluded.is_active
+                    )
+                ''', rows)
+                changed = conn.total_changes > changes_before
+                # Unchanged accounts are still fresh as of now
+                cursor.executemany('''
+                    UPDATE accounts SET updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND account_id = ?
+                ''', [(user_id, account_id) for account_id in rows_by_id])
+                if changed:
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -382,6 +778,7 @@ class DatabaseManager:
             print(f"Error storing accounts: {e}")
             return False
     
+    @request_memoized('accounts')
     def get_cached_accounts(self, user_id: int) -> list[Dict[str, Any]]:
         """Get cached account information from database"""
         with self.get_connection() as conn:
@@ -421,6 +818,7 @@ class DatabaseManager:
             
             return accounts
     
+    @invalidates('accounts')
     def update_account_balances(self, user_id: int, accounts_data: list[Dict[str, Any]]) -> bool:
         """Update account balances from fresh API data"""
         try:
@@ -440,6 +838,7 @@ class DatabaseManager:
                         account['account_id']
                     ))
                 
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -447,19 +846,34 @@ class DatabaseManager:
             print(f"Error updating account balances: {e}")
             return False
     
+    @invalidates('accounts')
     def delete_accounts_by_token(self, user_id: int, token_id: int) -> bool:
         """Delete accounts associated with a specific token"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # The accounts' transactions go too, recorded as removals, so a
+                # relinked item stores them afresh instead of matching orphans
+                account_filter = 'account_id IN (SELECT account_id FROM accounts WHERE user_id = ? AND token_id = ?)'
+                cursor.execute(f'''
+                    INSERT INTO transaction_removals (user_id, transaction_id)
+                    SELECT user_id, transaction_id FROM transactions WHERE user_id = ? AND {account_filter}
+                ''', (user_id, user_id, token_id))
+                cursor.execute(f'DELETE FROM transactions WHERE user_id = ? AND {account_filter}',
+                               (user_id, user_id, token_id))
+                cursor.execute(f'DELETE FROM transaction_rollups WHERE user_id = ? AND {account_filter}',
+                               (user_id, user_id, token_id))
                 cursor.execute('DELETE FROM accounts WHERE user_id = ? AND token_id = ?', 
                              (user_id, token_id))
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except sqlite3.Error as e:
             print(f"Error deleting accounts: {e}")
             return False
     
+    @request_memoized('accounts')
+    @versioned_summary
     def get_account_summary(self, user_id: int) -> Dict[str, Any]:
         """Get summary statistics for user's accounts"""
         with self.get_connection() as conn:
@@ -508,6 +922,7 @@ class DatabaseManager:
                             classification_summary.get('liability', {}).get('total_balance', 0))
             }
     
+    @invalidates('accounts')
     def update_account_custom_name(self, user_id: int, account_id: str, custom_name: Optional[str]) -> bool:
         """Update the custom name for an account"""
         try:
@@ -527,6 +942,7 @@ class DatabaseManager:
                 
                 # Check if any rows were updated
                 if cursor.rowcount > 0:
+                    self._bump_data_version(cursor, user_id)
                     conn.commit()
                     return True
                 else:
@@ -537,55 +953,111 @@ class DatabaseManager:
             return False
     
     def store_transactions(self, user_id: int, transactions_data: list[Dict[str, Any]]) -> bool:
-        """Store transaction information in the database"""
+        """
+        Upsert transaction information in one batch, keeping id and created_at
+        
+        Rows identical to what is stored are left alone, updated_at included,
+        so re-storing an unchanged period neither shows up as a change to
+        incremental syncs nor invalidates cached summaries.
+        """
+        # Key on transaction_id so a transaction both added and modified in one
+        # sync is written once, with its latest version
+        rows_by_id = {}
+        for transaction in transactions_data:
+            # Extract category information
+            category = None
+            subcategory = None
+            categories = transaction.get('category', [])
+            if categories:
+                category = categories[0] if len(categories) > 0 else None
+                subcategory = categories[1] if len(categories) > 1 else None
+            
+            rows_by_id[transaction.get('transaction_id')] = (
+                user_id, transaction.get('account_id'), transaction.get('transaction_id'),
+                transaction.get('amount'),
+                transaction.get('iso_currency_code', 'USD'),
+                transaction.get('unofficial_currency_code'),
+                transaction.get('date'), transaction.get('datetime'),
+                transaction.get('authorized_date'),
+                transaction.get('authorized_datetime'),
+                transaction.get('name'), transaction.get('merchant_name'),
+                transaction.get('account_owner'),
+                category, subcategory,
+                transaction.get('transaction_type'),
+                transaction.get('pending', False),
+                transaction.get('institution_name'),
+                transaction.get('category_primary', 'OTHER'),
+                transaction.get('category_detailed', 'OTHER'),
+                transaction.get('category_confidence', 'UNKNOWN'),
+                transaction.get('pending_transaction_id')
+            )
+        rows = list(rows_by_id.values())
+        if not rows:
+            return True
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                for transaction in transactions_data:
-                    # Extract transaction data
-                    transaction_id = transaction.get('transaction_id')
-                    account_id = transaction.get('account_id')
-                    amount = transaction.get('amount')
-                    date = transaction.get('date')
-                    name = transaction.get('name')
-                    
-                    # Extract category information
-                    category = None
-                    subcategory = None
-                    categories = transaction.get('category', [])
-                    if categories:
-                        category = categories[0] if len(categories) > 0 else None
-                        subcategory = categories[1] if len(categories) > 1 else None
-                    
-                    # Insert or update transaction
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO transactions (
-                            user_id, account_id, transaction_id, amount, iso_currency_code,
-                            unofficial_currency_code, date, datetime, authorized_date,
-                            authorized_datetime, name, merchant_name, account_owner,
-                            category, subcategory, transaction_type, pending,
-                            institution_name, category_primary, category_detailed,
-                            category_confidence, updated_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (
-                        user_id, account_id, transaction_id, amount,
-                        transaction.get('iso_currency_code', 'USD'),
-                        transaction.get('unofficial_currency_code'),
-                        date, transaction.get('datetime'),
-                        transaction.get('authorized_date'),
-                        transaction.get('authorized_datetime'),
-                        name, transaction.get('merchant_name'),
-                        transaction.get('account_owner'),
-                        category, subcategory,
-                        transaction.get('transaction_type'),
-                        transaction.get('pending', False),
-                        transaction.get('institution_name'),
-                        transaction.get('category_primary', 'OTHER'),
-                        transaction.get('category_detailed', 'OTHER'),
-                        transaction.get('category_confidence', 'UNKNOWN')
-                    ))
+                # Months whose rollups change: where the rows were and where they are now
+                months = self._transaction_months(cursor, user_id, list(rows_by_id))
+                months.update(str(row[6])[:7] for row in rows if row[6])
                 
+                changes_before = conn.total_changes
+                cursor.executemany('''
+                    INSERT INTO transactions (
+                        user_id, account_id, transaction_id, amount, iso_currency_code,
+                        unofficial_currency_code, date, datetime, authorized_date,
+                        authorized_datetime, name, merchant_name, account_owner,
+                        category, subcategory, transaction_type, pending,
+                        institution_name, category_primary, category_detailed,
+                        category_confidence, pending_transaction_id, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, transaction_id) DO UPDATE SET
+                        account_id = excluded.account_id,
+                        amount = excluded.amount,
+                        iso_currency_code = excluded.iso_currency_code,
+                        unofficial_currency_code = excluded.unofficial_currency_code,
+                        date = excluded.date,
+                        datetime = excluded.datetime,
+                        authorized_date = excluded.authorized_date,
+                        authorized_datetime = excluded.authorized_datetime,
+                        name = excluded.name,
+                        merchant_name = excluded.merchant_name,
+                        account_owner = excluded.account_owner,
+                        category = excluded.category,
+                        subcategory = excluded.subcategory,
+                        transaction_type = excluded.transaction_type,
+                        pending = excluded.pending,
+                        institution_name = excluded.institution_name,
+                        category_primary = excluded.category_primary,
+                        category_detailed = excluded.category_detailed,
+                        category_confidence = excluded.category_confidence,
+                        pending_transaction_id = excluded.pending_transaction_id,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (
+                        transactions.account_id, transactions.amount, transactions.iso_currency_code,
+                        transactions.unofficial_currency_code, transactions.date, transactions.datetime,
+                        transactions.authorized_date, transactions.authorized_datetime, transactions.name,
+                        transactions.merchant_name, transactions.account_owner, transactions.category,
+                        transactions.subcategory, transactions.transaction_type, transactions.pending,
+                        transactions.institution_name, transactions.category_primary,
+                        transactions.category_detailed, transactions.category_confidence,
+                        transactions.pending_transaction_id
+                    ) IS NOT (
+                        excluded.account_id, excluded.amount, excluded.iso_currency_code,
+                        excluded.unofficial_currency_code, excluded.date, excluded.datetime,
+                        excluded.authorized_date, excluded.authorized_datetime, excluded.name,
+                        excluded.merchant_name, excluded.account_owner, excluded.category,
+                        excluded.subcategory, excluded.transaction_type, excluded.pending,
+                        excluded.institution_name, excluded.category_primary,
+                        excluded.category_detailed, excluded.category_confidence,
+                        excluded.pending_transaction_id
+                    )
+                ''', rows)
+                if conn.total_changes > changes_before:
+                    self._refresh_rollups(cursor, user_id, months)
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -593,193 +1065,318 @@ class DatabaseManager:
             print(f"Error storing transactions: {e}")
             return False
     
+    def delete_transactions(self, user_id: int, transaction_ids: list[str]) -> bool:
+        """Delete specific transactions (e.g. those removed by /transactions/sync)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                months = self._transaction_months(cursor, user_id, transaction_ids)
+                params = [(user_id, transaction_id) for transaction_id in transaction_ids]
+                cursor.executemany('''
+                    INSERT INTO transaction_removals (user_id, transaction_id)
+                    SELECT user_id, transaction_id FROM transactions WHERE user_id = ? AND transaction_id = ?
+                ''', params)
+                cursor.executemany('DELETE FROM transactions WHERE user_id = ? AND transaction_id = ?', params)
+                if cursor.rowcount > 0:
+                    self._refresh_rollups(cursor, user_id, months)
+                    self._bump_data_version(cursor, user_id)
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error deleting transactions: {e}")
+            return False
+    
+    def _transaction_months(self, cursor, user_id: int, transaction_ids: list[str]) -> set[str]:
+        """Distinct YYYY-MM months of the stored transactions with these IDs"""
+        months = set()
+        for i in range(0, len(transaction_ids), 500):
+            chunk = transaction_ids[i:i + 500]
+            placeholders = ','.join(['?' for _ in chunk])
+            cursor.execute(f'''
+                SELECT DISTINCT substr(date, 1, 7) FROM transactions
+                WHERE user_id = ? AND transaction_id IN ({placeholders})
+            ''', [user_id, *chunk])
+            months.update(row[0] for row in cursor.fetchall())
+        return months
+    
+    def _refresh_rollups(self, cursor, user_id: int, months: set[str]):
+        """Recompute a user's rollup rows for the given YYYY-MM months (caller commits)"""
+        for year_month in sorted(months):
+            year, month = int(year_month[:4]), int(year_month[5:7])
+            start, end = self._period_bounds(year, month)
+            cursor.execute('DELETE FROM transaction_rollups WHERE user_id = ? AND year_month = ?',
+                           (user_id, year_month))
+            cursor.execute('''
+                INSERT INTO transaction_rollups (
+                    user_id, year_month, account_id, category_primary, category,
+                    transaction_count, total_debits, total_credits, total_amount
+                )
+                SELECT 
+                    user_id, ?, account_id, COALESCE(category_primary, ''), COALESCE(category, ''),
+                    COUNT(*),
+                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END),
+                    SUM(ABS(amount))
+                FROM transactions
+                WHERE user_id = ? AND date >= ? AND date < ?
+                GROUP BY account_id, COALESCE(category_primary, ''), COALESCE(category, '')
+            ''', (year_month, user_id, start, end))
+    
+    @staticmethod
+    def _rebuild_rollups(cursor, user_id: Optional[int] = None):
+        """Recompute transaction_rollups from transactions for one user, or for everyone (caller commits)"""
+        user_filter = ' WHERE user_id = ?' if user_id is not None else ''
+        params = (user_id,) if user_id is not None else ()
+        cursor.execute('DELETE FROM transaction_rollups' + user_filter, params)
+        cursor.execute('''
+            INSERT INTO transaction_rollups (
+                user_id, year_month, account_id, category_primary, category,
+                transaction_count, total_debits, total_credits, total_amount
+            )
+            SELECT 
+                user_id, substr(date, 1, 7), account_id,
+                COALESCE(category_primary, ''), COALESCE(category, ''),
+                COUNT(*),
+                SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+                SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END),
+                SUM(ABS(amount))
+            FROM transactions''' + user_filter + '''
+            GROUP BY user_id, substr(date, 1, 7), account_id,
+                     COALESCE(category_primary, ''), COALESCE(category, '')
+        ''', params)
+    
+    def rebuild_transaction_rollups(self, user_id: Optional[int] = None) -> bool:
+        """Recompute transaction_rollups from scratch for one user, or for everyone"""
+        try:
+            with self.get_connection() as conn:
+                self._rebuild_rollups(conn.cursor(), user_id)
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error rebuilding transaction rollups: {e}")
+            return False
+    
+    @staticmethod
+    def _period_bounds(year: Optional[int], month: Optional[int] = None) -> Optional[tuple[str, str]]:
+        """Half-open [start, end) ISO date range for a year or month (None for no period)"""
+        if year is None:
+            return None
+        if month is None:
+            start, end = datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+        elif month == 12:
+            start, end = datetime.date(year, 12, 1), datetime.date(year + 1, 1, 1)
+        else:
+            start, end = datetime.date(year, month, 1), datetime.date(year, month + 1, 1)
+        return start.isoformat(), end.isoformat()
+    
+    def _transactions_query(self, user_id: int, account_types: Optional[list[str]], account_id: Optional[str],
+                            year: Optional[int], month: Optional[int],
+                            cursor: Optional[str] = None) -> tuple[str, list[Any]]:
+        """Build the newest-first transaction listing query (without LIMIT) and its parameters"""
+        # Build query with optional account type filtering and account ID filtering
+        query = '''
+            SELECT t.*, a.name as account_name, a.type as account_type, 
+                   a.subtype as account_subtype, a.institution_name
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
+            WHERE t.user_id = ? AND a.is_active = 1
+        '''
+        params: list[Any] = [user_id]
+        
+        # Add year/month filtering as a half-open date range so the
+        # (user_id, date) index is used
+        period = self._period_bounds(year, month)
+        after = decode_cursor(cursor) if cursor else None
+        if period:
+            query += ' AND t.date >= ?'
+            params.append(period[0])
+            # A cursor inside the period already bounds the range from above;
+            # SQLite seeks on a single upper bound, so don't give it a looser one
+            if after is None or after[0] >= period[1]:
+                query += ' AND t.date < ?'
+                params.append(period[1])
+        
+        if account_id:
+            query += ' AND t.account_id = ?'
+            params.append(account_id)
+        elif account_types:
+            placeholders = ','.join(['?' for _ in account_types])
+            query += f' AND a.type IN ({placeholders})'
+            params.extend(account_types)
+        
+        # Continue strictly after the previous page's last row; NULL datetimes sort last
+        if after:
+            after_date, after_datetime, after_id = after
+            if after_datetime is None:
+                query += ' AND t.date <= ? AND (t.date < ? OR (t.datetime IS NULL AND t.id < ?))'
+                params.extend([after_date, after_date, after_id])
+            else:
+                query += (' AND t.date <= ? AND (t.date < ? OR t.datetime < ? OR t.datetime IS NULL'
+                          ' OR (t.datetime = ? AND t.id < ?))')
+                params.extend([after_date, after_date, after_datetime, after_datetime, after_id])
+        
+        query += ' ORDER BY t.date DESC, t.datetime DESC, t.id DESC'
+        return query, params
+    
+    @staticmethod
+    def _format_transaction(row) -> Dict[str, Any]:
+        """Shape a transaction listing row like the Plaid API's transaction objects"""
+        transaction_dict = dict(row)
+        return {
+            'transaction_id': transaction_dict['transaction_id'],
+            'account_id': transaction_dict['account_id'],
+            'account_name': transaction_dict['account_name'],
+            'account_type': transaction_dict['account_type'],
+            'account_subtype': transaction_dict['account_subtype'],
+            'amount': transaction_dict['amount'],
+            'name': transaction_dict['name'],
+            'merchant_name': transaction_dict['merchant_name'],
+            'category': transaction_dict['category'],
+            'subcategory': transaction_dict['subcategory'],
+            'category_primary': transaction_dict.get('category_primary', 'OTHER'),
+            'category_detailed': transaction_dict.get('category_detailed', 'OTHER'),
+            'category_confidence': transaction_dict.get('category_confidence', 'UNKNOWN'),
+            'date': transaction_dict['date'],
+            'pending': transaction_dict['pending'],
+            'institution_name': transaction_dict['institution_name'],
+            'formatted_amount': f"${abs(transaction_dict['amount']):,.2f}",
+            'transaction_type': 'debit' if transaction_dict['amount'] > 0 else 'credit',
+            'pending_transaction_id': transaction_dict['pending_transaction_id'],
+            'updated_at': transaction_dict['updated_at']
+        }
+    
     def get_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None, 
-                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: int = 100, offset: int = 0) -> list[Dict[str, Any]]:
-        """Get cached transaction information from database"""
+                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: Optional[int] = 100,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of cached transactions, newest first
+        
+        Pages are keyset-paginated on (date, datetime, id): pass the previous
+        page's next_cursor to continue after it. limit=None returns every match.
+        
+        Returns:
+            Dictionary with 'transactions' and 'next_cursor' (None on the last page)
+        
+        Raises:
+            ValueError: If cursor is not a valid pagination cursor
+        """
+        query, params = self._transactions_query(user_id, account_types, account_id, year, month, cursor)
+        if limit is not None:
+            # One extra row tells us whether another page follows
+            query += ' LIMIT ?'
+            params.append(limit + 1)
+        
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            db_cursor = conn.cursor()
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
             
-            # Build query with optional account type filtering and account ID filtering
-            query = '''
-                SELECT t.*, a.name as account_name, a.type as account_type, 
-                       a.subtype as account_subtype, a.institution_name
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = ? AND a.is_active = 1
-            '''
-            params: list[Any] = [user_id]
-            
-            # Add year/month filtering
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    query += ' AND strftime("%Y", t.date) = ? AND strftime("%m", t.date) = ?'
-                    params.extend([str(year), f"{month:02d}"])
-                else:
-                    # Entire year
-                    query += ' AND strftime("%Y", t.date) = ?'
-                    params.append(str(year))
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(last['date'], last['datetime'], last['id'])
             
-            if account_id:
-                query += ' AND t.account_id = ?'
-                params.append(account_id)
-            elif account_types:
-                placeholders = ','.join(['?' for _ in account_types])
-                query += f' AND a.type IN ({placeholders})'
-                params.extend(account_types)
-            
-            query += ' ORDER BY t.date DESC, t.datetime DESC LIMIT ? OFFSET ?'
-            params.extend([limit, offset])
-            
-            cursor.execute(query, params)
-            
-            transactions = []
-            for row in cursor.fetchall():
-                transaction_dict = dict(row)
-                # Format the transaction data
-                formatted_transaction = {
-                    'transaction_id': transaction_dict['transaction_id'],
-                    'account_id': transaction_dict['account_id'],
-                    'account_name': transaction_dict['account_name'],
-                    'account_type': transaction_dict['account_type'],
-                    'account_subtype': transaction_dict['account_subtype'],
-                    'amount': transaction_dict['amount'],
-                    'name': transaction_dict['name'],
-                    'merchant_name': transaction_dict['merchant_name'],
-                    'category': transaction_dict['category'],
-                    'subcategory': transaction_dict['subcategory'],
-                    'category_primary': transaction_dict.get('category_primary', 'OTHER'),
-                    'category_detailed': transaction_dict.get('category_detailed', 'OTHER'),
-                    'category_confidence': transaction_dict.get('category_confidence', 'UNKNOWN'),
-                    'date': transaction_dict['date'],
-                    'pending': transaction_dict['pending'],
-                    'institution_name': transaction_dict['institution_name'],
-                    'formatted_amount': f"${abs(transaction_dict['amount']):,.2f}",
-                    'transaction_type': 'debit' if transaction_dict['amount'] > 0 else 'credit',
-                    'updated_at': transaction_dict['updated_at']
-                }
-                transactions.append(formatted_transaction)
-            
-            return transactions
+            transactions = [self._format_transaction(row) for row in rows]
+            return {'transactions': transactions, 'next_cursor': next_cursor}
+    
+    def iter_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None,
+                                 account_id: Optional[str] = None, year: Optional[int] = None,
+                                 month: Optional[int] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every cached transaction for the period, newest first, as rows are read
+        
+        The connection is held until the generator is exhausted or closed.
+        """
+        query, params = self._transactions_query(user_id, account_types, account_id, year, month)
+        with self.get_connection() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.execute(query, params)
+            while True:
+                rows = db_cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield self._format_transaction(row)
     
+    @versioned_summary
     def get_transaction_summary(self, user_id: int, account_types: Optional[list[str]] = None, 
                               account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, Any]:
         """Get transaction summary statistics"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Build query with optional account type filtering and account ID filtering
+            # Read the monthly rollups for the period, grouped by both category
+            # schemes; totals and both breakdowns are reduced from these groups
             query = '''
                 SELECT 
-                    COUNT(*) as total_transactions,
-                    SUM(CASE WHEN t.amount > 0 THEN t.amount ELSE 0 END) as total_debits,
-                    SUM(CASE WHEN t.amount < 0 THEN ABS(t.amount) ELSE 0 END) as total_credits,
-                    AVG(ABS(t.amount)) as avg_transaction_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = ? AND a.is_active = 1
+                    NULLIF(r.category, '') as category,
+                    NULLIF(r.category_primary, '') as category_primary,
+                    SUM(r.transaction_count) as transaction_count,
+                    SUM(r.total_debits) as total_debits,
+                    SUM(r.total_credits) as total_credits,
+                    SUM(r.total_amount) as total_amount
+                FROM transaction_rollups r
+                JOIN accounts a ON r.account_id = a.account_id AND r.user_id = a.user_id
+                WHERE r.user_id = ? AND a.is_active = 1
             '''
             
             params: list[Any] = [user_id]
             
-            # Add year/month filtering
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    query += ' AND strftime("%Y", t.date) = ? AND strftime("%m", t.date) = ?'
-                    params.extend([str(year), f"{month:02d}"])
-                else:
-                    # Entire year
-                    query += ' AND strftime("%Y", t.date) = ?'
-                    params.append(str(year))
+            # Add year/month filtering as a half-open YYYY-MM range
+            period = self._period_bounds(year, month)
+            if period:
+                query += ' AND r.year_month >= ? AND r.year_month < ?'
+                params.extend(bound[:7] for bound in period)
             
             if account_id:
-                query += ' AND t.account_id = ?'
+                query += ' AND r.account_id = ?'
                 params.append(account_id)
             elif account_types:
                 placeholders = ','.join(['?' for _ in account_types])
                 query += f' AND a.type IN ({placeholders})'
                 params.extend(account_types)
             
+            query += ' GROUP BY r.category, r.category_primary'
             cursor.execute(query, params)
-            row = cursor.fetchone()
-            
-            # Get spending by category (old category field for backward compatibility)
-            category_query = '''
-                SELECT 
-                    t.category,
-                    COUNT(*) as transaction_count,
-                    SUM(ABS(t.amount)) as total_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = ? AND a.is_active = 1
-                AND t.category IS NOT NULL
-            '''
             
-            # Add year/month filtering to category query
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    category_query += ' AND strftime("%Y", t.date) = ? AND strftime("%m", t.date) = ?'
-                else:
-                    # Entire year
-                    category_query += ' AND strftime("%Y", t.date) = ?'
-            
-            if account_id:
-                category_query += ' AND t.account_id = ?'
-            elif account_types:
-                placeholders = ','.join(['?' for _ in account_types])
-                category_query += f' AND a.type IN ({placeholders})'
-            
-            category_query += ' GROUP BY t.category ORDER BY total_amount DESC LIMIT 10'
-            
-            cursor.execute(category_query, params)
-            categories = []
-            for cat_row in cursor.fetchall():
-                categories.append({
-                    'category': cat_row['category'],
-                    'transaction_count': cat_row['transaction_count'],
-                    'total_amount': cat_row['total_amount']
-                })
-            
-            # Get spending by primary category (new Plaid categorization)
-            primary_category_query = '''
-                SELECT 
-                    t.category_primary,
-                    COUNT(*) as transaction_count,
-                    SUM(ABS(t.amount)) as total_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = ? AND a.is_active = 1
-                AND t.category_primary IS NOT NULL
-                AND t.category_primary != 'OTHER'
-            '''
-            
-            # Add year/month filtering to primary category query
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    primary_category_query += ' AND strftime("%Y", t.date) = ? AND strftime("%m", t.date) = ?'
-                else:
-                    # Entire year
-                    primary_category_query += ' AND strftime("%Y", t.date) = ?'
-            
-            if account_id:
-                primary_category_query += ' AND t.account_id = ?'
-            elif account_types:
-                placeholders = ','.join(['?' for _ in account_types])
-                primary_category_query += f' AND a.type IN ({placeholders})'
+            total_transactions = 0
+            total_debits = 0
+            total_credits = 0
+            total_amount = 0
+            category_totals: Dict[str, list] = {}
+            primary_category_totals: Dict[str, list] = {}
+            for group in cursor.fetchall():
+                count = group['transaction_count']
+                amount = group['total_amount'] or 0
+                total_transactions += count
+                total_debits += group['total_debits'] or 0
+                total_credits += group['total_credits'] or 0
+                total_amount += amount
+                
+                # Spending by category (old category field for backward compatibility)
+                if group['category'] is not None:
+                    totals = category_totals.setdefault(group['category'], [0, 0])
+                    totals[0] += count
+                    totals[1] += amount
+                
+                # Spending by primary category (new Plaid categorization)
+                if group['category_primary'] is not None and group['category_primary'] != 'OTHER':
+                    totals = primary_category_totals.setdefault(group['category_primary'], [0, 0])
+                    totals[0] += count
+                    totals[1] += amount
             
-            primary_category_query += ' GROUP BY t.category_primary ORDER BY total_amount DESC LIMIT 10'
+            def top_by_amount(totals: Dict[str, list]) -> list:
+                return sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:10]
             
-            cursor.execute(primary_category_query, params)
-            primary_categories = []
-            for cat_row in cursor.fetchall():
-                primary_categories.append({
-                    'category': cat_row['category_primary'],
-                    'transaction_count': cat_row['transaction_count'],
-                    'total_amount': cat_row['total_amount']
-                })
+            categories = [
+                {'category': category, 'transaction_count': count, 'total_amount': amount}
+                for category, (count, amount) in top_by_amount(category_totals)
+            ]
+            primary_categories = [
+                {'category': category, 'transaction_count': count, 'total_amount': amount}
+                for category, (count, amount) in top_by_amount(primary_category_totals)
+            ]
             
             # Calculate period days
             if year is not None and month is not None:
@@ -794,11 +1391,11 @@ class DatabaseManager:
                 days = 30
             
             return {
-                'total_transactions': row['total_transactions'] or 0,
-                'total_debits': row['total_debits'] or 0,
-                'total_credits': row['total_credits'] or 0,
-                'avg_transaction_amount': row['avg_transaction_amount'] or 0,
-                'net_flow': (row['total_debits'] or 0) - (row['total_credits'] or 0),
+                'total_transactions': total_transactions,
+                'total_debits': total_debits,
+                'total_credits': total_credits,
+                'avg_transaction_amount': total_amount / total_transactions if total_transactions else 0,
+                'net_flow': total_debits - total_credits,
                 'top_categories': categories,
                 'top_primary_categories': primary_categories,
                 'period_days': days
@@ -809,10 +1406,207 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO transaction_removals (user_id, transaction_id)
+                    SELECT user_id, transaction_id FROM transactions WHERE user_id = ? AND account_id = ?
+                ''', (user_id, account_id))
                 cursor.execute('DELETE FROM transactions WHERE user_id = ? AND account_id = ?', 
                              (user_id, account_id))
+                deleted = cursor.rowcount
+                cursor.execute('DELETE FROM transaction_rollups WHERE user_id = ? AND account_id = ?',
+                             (user_id, account_id))
+                if deleted > 0:
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except sqlite3.Error as e:
             print(f"Error deleting transactions: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def get_transaction_changes(self, user_id: int, after_updated_at: Optional[str] = None, after_id: int = 0,
+                                settle_seconds: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Get the user's transactions changed since a watermark, oldest change first
+        
+        Rows are ordered on (updated_at, id) and continue strictly after
+        (after_updated_at, after_id); pass None to start from the beginning.
+        Rows updated within the last settle_seconds are left for the next call,
+        so a write still committing with an earlier timestamp can't slip in
+        behind a watermark that has already passed it.
+        
+        Returns:
+            Dictionary with 'transactions' (formatted like get_cached_transactions)
+            and 'watermark', the (updated_at, id) of the last row (None if empty)
+        """
+        query = '''
+            SELECT t.*, a.name as account_name, a.type as account_type, 
+                   a.subtype as account_subtype, a.institution_name
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
+            WHERE t.user_id = ? AND a.is_active = 1 AND t.updated_at <= datetime('now', ?)
+        '''
+        params: list[Any] = [user_id, f'-{int(settle_seconds)} seconds']
+        if after_updated_at is not None:
+            query += ' AND (t.updated_at > ? OR (t.updated_at = ? AND t.id > ?))'
+            params.extend([after_updated_at, after_updated_at, after_id])
+        query += ' ORDER BY t.updated_at, t.id LIMIT ?'
+        params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            watermark = (rows[-1]['updated_at'], rows[-1]['id']) if rows else None
+            return {'transactions': [self._format_transaction(row) for row in rows], 'watermark': watermark}
+    
+    def get_sheet_sync(self, user_id: int, spreadsheet_id: str, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """Incremental sync state of a user's sheet (None if it has never been synced)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, user_id, spreadsheet_id, sheet_title, watermark_updated_at,
+                       watermark_id, removal_watermark_id, next_row, synced_at
+                FROM sheet_syncs
+                WHERE user_id = ? AND spreadsheet_id = ? AND sheet_title = ?
+            ''', (user_id, spreadsheet_id, sheet_title))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def reset_sheet_sync(self, user_id: int, spreadsheet_id: str, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """
+        Start a sheet's sync state over from an empty sheet, forgetting its row mapping
+        
+        next_row is left at 1 until a sync has written the header row, so a
+        start interrupted before then is started again. Removals recorded so
+        far are already reflected in what the next sync reads.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO sheet_syncs (user_id, spreadsheet_id, sheet_title, removal_watermark_id, next_row)
+                    VALUES (?, ?, ?, (SELECT COALESCE(MAX(id), 0) FROM transaction_removals WHERE user_id = ?), 1)
+                    ON CONFLICT (user_id, spreadsheet_id, sheet_title) DO UPDATE SET
+                        watermark_updated_at = NULL,
+                        watermark_id = 0,
+                        removal_watermark_id = excluded.removal_watermark_id,
+                        next_row = 1,
+                        synced_at = NULL
+                ''', (user_id, spreadsheet_id, sheet_title, user_id))
+                cursor.execute('''
+                    DELETE FROM sheet_sync_rows WHERE sync_id = (
+                        SELECT id FROM sheet_syncs
+                        WHERE user_id = ? AND spreadsheet_id = ? AND sheet_title = ?
+                    )
+                ''', (user_id, spreadsheet_id, sheet_title))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error resetting sheet sync: {e}")
+            return None
+        return self.get_sheet_sync(user_id, spreadsheet_id, sheet_title)
+    
+    def get_sheet_rows(self, sync_id: int, transaction_ids: list[str]) -> Dict[str, tuple[int, str]]:
+        """Sheet row number and row hash of each of these transactions already synced"""
+        rows = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(transaction_ids), 500):
+                chunk = transaction_ids[i:i + 500]
+                placeholders = ','.join(['?' for _ in chunk])
+                cursor.execute(f'''
+                    SELECT transaction_id, row_number, row_hash FROM sheet_sync_rows
+                    WHERE sync_id = ? AND transaction_id IN ({placeholders})
+                ''', [sync_id, *chunk])
+                rows.update((row[0], (row[1], row[2])) for row in cursor.fetchall())
+        return rows
+    
+    def get_sheet_removals(self, sync_id: int, user_id: int, after_id: int = 0, settle_seconds: int = 0,
+                           limit: int = 1000) -> Dict[str, Any]:
+        """
+        Get the synced rows of transactions removed since a removal watermark
+        
+        Reads transaction_removals after after_id, oldest first, leaving
+        removals younger than settle_seconds for the next call. Of those it
+        returns the rows the sheet still maps that should be blanked: the
+        transaction hasn't been stored again since, and no posted transaction
+        replacing it is waiting to take its row over.
+        
+        Returns:
+            Dictionary with 'rows' ((transaction_id, row_number) pairs), 'count'
+            (removals read) and 'watermark' (id of the last one, None if none)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, transaction_id FROM transaction_removals
+                WHERE user_id = ? AND id > ? AND removed_at <= datetime('now', ?)
+                ORDER BY id LIMIT ?
+            ''', (user_id, after_id, f'-{int(settle_seconds)} seconds', limit))
+            removals = cursor.fetchall()
+            if not removals:
+                return {'rows': [], 'count': 0, 'watermark': None}
+            
+            transaction_ids = list({row[1] for row in removals})
+            rows = []
+            for i in range(0, len(transaction_ids), 500):
+                chunk = transaction_ids[i:i + 500]
+                placeholders = ','.join(['?' for _ in chunk])
+                cursor.execute(f'''
+                    SELECT r.transaction_id, r.row_number
+                    FROM sheet_sync_rows r
+                    WHERE r.sync_id = ? AND r.transaction_id IN ({placeholders})
+                      AND NOT EXISTS (
+                          SELECT 1 FROM transactions t
+                          WHERE t.user_id = ? AND t.transaction_id = r.transaction_id
+                      )
+                      AND NOT EXISTS (
+                          SELECT 1 FROM transactions t
+                          WHERE t.user_id = ? AND t.pending_transaction_id = r.transaction_id
+                            AND NOT EXISTS (
+                                SELECT 1 FROM sheet_sync_rows s
+                                WHERE s.sync_id = r.sync_id AND s.transaction_id = t.transaction_id
+                            )
+                      )
+                ''', [sync_id, *chunk, user_id, user_id])
+                rows.extend((row[0], row[1]) for row in cursor.fetchall())
+            return {'rows': sorted(rows, key=lambda row: row[1]), 'count': len(removals),
+                    'watermark': removals[-1][0]}
+    
+    def save_sheet_sync_progress(self, sync_id: int, rows: list[tuple[str, int, str]], released: list[str],
+                                 watermark_updated_at: Optional[str], watermark_id: int,
+                                 removal_watermark_id: int, next_row: int) -> bool:
+        """
+        Record what a sync step wrote, in one transaction
+        
+        Args:
+            sync_id: The sheet_syncs row
+            rows: (transaction_id, row_number, row_hash) of rows written
+            released: Transaction IDs whose rows were blanked or taken over by a posted transaction
+            watermark_updated_at: updated_at of the last change applied
+            watermark_id: id of the last change applied
+            removal_watermark_id: id of the last transaction_removals row applied
+            next_row: First sheet row not yet used
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM sheet_sync_rows WHERE sync_id = ? AND transaction_id = ?',
+                                   [(sync_id, transaction_id) for transaction_id in released])
+                cursor.executemany('''
+                    INSERT INTO sheet_sync_rows (sync_id, transaction_id, row_number, row_hash)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (sync_id, transaction_id) DO UPDATE SET
+                        row_number = excluded.row_number,
+                        row_hash = excluded.row_hash
+                ''', [(sync_id, *row) for row in rows])
+                cursor.execute('''
+                    UPDATE sheet_syncs
+                    SET watermark_updated_at = ?, watermark_id = ?, removal_watermark_id = ?,
+                        next_row = ?, synced_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (watermark_updated_at, watermark_id, removal_watermark_id, next_row, sync_id))
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            print(f"Error saving sheet sync progress: {e}")
+            return False
@@ -1,10 +1,21 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-import hashlib
-import secrets
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+from psycopg2.extras import RealDictCursor, execute_values
+import datetime
 import os
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from typing import Optional, Dict, Any, Iterator
 from contextlib import contextmanager
+from pagination import decode_cursor, encode_cursor
+from password_hashing import get_password_hasher
+from request_cache import invalidates, request_memoized
+from pathlib import Path
+from schema_migrations import migrate_once, sql_file_migrations
+from summary_cache import versioned_summary
 from dotenv import load_dotenv
 import logging
 
@@ -14,10 +25,35 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Rows per multi-row INSERT statement when storing transactions
+TRANSACTION_BATCH_SIZE = 500
+
+# Schema migrations: the numbered sql/NN_create_*/NN_add_*.sql scripts
+SCHEMA_MIGRATIONS = sql_file_migrations(Path(__file__).resolve().parent / 'sql')
+
+# Raised by the version check on a database that predates schema_version
+MIGRATION_ERRORS = (psycopg2.errors.UndefinedTable,)
+
+
+def begin_migration(cursor):
+    """Serialize schema migrations across processes until the transaction ends"""
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('schema_version'))")
+
+
 class DatabaseManager:
     """Manages PostgreSQL database operations for user authentication and token storage"""
     
-    def __init__(self, db_config: Optional[Dict[str, Any]] = None):
+    def __init__(self, db_config: Optional[Dict[str, Any]] = None, pool_min: Optional[int] = None,
+                 pool_max: Optional[int] = None, pool_timeout: Optional[float] = None):
+        """
+        Args:
+            db_config: psycopg2 connection parameters (default: POSTGRES_* environment variables)
+            pool_min: Connections opened up front (POSTGRES_POOL_MIN, default 1)
+            pool_max: Maximum open connections per process (POSTGRES_POOL_MAX, default 10);
+                      0 connects per operation, e.g. when an external pgbouncer does the pooling
+            pool_timeout: Seconds to wait for a free connection before giving up
+                          (POSTGRES_POOL_TIMEOUT, default 30)
+        """
         if db_config is None:
             self.db_config = {
                 'host': os.getenv('POSTGRES_HOST', 'localhost'),
@@ -28,8 +64,33 @@ class DatabaseManager:
             }
         else:
             self.db_config = db_config
+        # Identifies this database in the process-wide summary cache
+        self.cache_namespace = (self.db_config.get('host'), self.db_config.get('port'),
+                                self.db_config.get('database'))
+        
+        if pool_min is None:
+            pool_min = int(os.getenv('POSTGRES_POOL_MIN', 1))
+        if pool_max is None:
+            pool_max = int(os.getenv('POSTGRES_POOL_MAX', 10))
+        if pool_timeout is None:
+            pool_timeout = float(os.getenv('POSTGRES_POOL_TIMEOUT', 30))
+        self.pool_max = max(0, pool_max)
+        self.pool_min = min(max(0, pool_min), self.pool_max)
+        self.pool_timeout = pool_timeout
+        # Idle connections that have sat longer than this are pinged before reuse
+        self.pool_check_interval = float(os.getenv('POSTGRES_POOL_CHECK_SECONDS', 30))
+        self._pool_lock = threading.Lock()
+        self._reset_pool()
         
         self.test_connection()
+        self.init_database()
+        self._prewarm_pool()
+    
+    def init_database(self):
+        """Apply pending sql/ migrations; once current this is a single version check"""
+        migrate_once(tuple(sorted(self.db_config.items())),
+                     lambda: psycopg2.connect(**self.db_config),
+                     SCHEMA_MIGRATIONS, begin_migration, MIGRATION_ERRORS, placeholder='%s')
     
     def test_connection(self):
         """Test PostgreSQL connection on initialization"""
@@ -42,27 +103,158 @@ class DatabaseManager:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
             raise
     
+    def _reset_pool(self):
+        """Start with an empty pool (on creation and in forked children)"""
+        self._pool_pid = os.getpid()
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_max or 1)
+        self._pool_stats = {
+            'open': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'acquired': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'discarded': 0,
+        }
+    
+    def _prewarm_pool(self):
+        """Open pool_min idle connections so the first requests don't pay for connecting"""
+        if not self.pool_max:
+            return
+        while self._idle.qsize() < self.pool_min:
+            try:
+                conn = psycopg2.connect(**self.db_config)
+            except psycopg2.Error as e:
+                logger.warning(f"Could not prewarm PostgreSQL pool: {e}")
+                return
+            with self._pool_lock:
+                self._pool_stats['open'] += 1
+            self._idle.put((conn, time.monotonic()))
+    
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Check an idle connection before handing it out"""
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.pool_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _discard(self, conn):
+        """Close a pooled connection and stop counting it"""
+        try:
+            conn.close()
+        finally:
+            with self._pool_lock:
+                self._pool_stats['open'] -= 1
+                self._pool_stats['discarded'] += 1
+    
+    def _acquire_connection(self):
+        """Take a connection slot (waiting up to pool_timeout) and a healthy connection"""
+        with self._pool_lock:
+            if self._pool_pid != os.getpid():
+                # Connections must not be shared with a forked parent
+                self._reset_pool()
+        
+        if not self._slots.acquire(blocking=False):
+            with self._pool_lock:
+                self._pool_stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.pool_timeout):
+                with self._pool_lock:
+                    self._pool_stats['timeouts'] += 1
+                logger.warning(f"PostgreSQL pool exhausted: {self.pool_stats()}")
+                raise psycopg2.pool.PoolError(
+                    f"connection pool exhausted (no connection free after {self.pool_timeout}s)"
+                )
+        
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = psycopg2.connect(**self.db_config)
+                    with self._pool_lock:
+                        self._pool_stats['open'] += 1
+                    break
+                if self._is_healthy(candidate, idle_since):
+                    conn = candidate
+                else:
+                    self._discard(candidate)
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        with self._pool_lock:
+            self._pool_stats['acquired'] += 1
+            self._pool_stats['in_use'] += 1
+            self._pool_stats['peak_in_use'] = max(self._pool_stats['peak_in_use'], self._pool_stats['in_use'])
+        return conn
+    
+    def _release_connection(self, conn):
+        """Return a connection to the pool in a clean state"""
+        forked = self._pool_pid != os.getpid()
+        try:
+            if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Reads open a transaction too; never hand one over to the next caller
+                conn.rollback()
+            if conn.closed or forked:
+                self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            if not forked:
+                with self._pool_lock:
+                    self._pool_stats['in_use'] -= 1
+                self._slots.release()
+    
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = psycopg2.connect(**self.db_config)
+        """Context manager for pooled database connections"""
+        if not self.pool_max:
+            conn = psycopg2.connect(**self.db_config)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        
+        conn = self._acquire_connection()
         try:
             yield conn
         finally:
-            conn.close()
+            self._release_connection(conn)
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Connection pool counters (open, idle, in use, waits and timeouts)"""
+        with self._pool_lock:
+            stats = dict(self._pool_stats)
+        stats['idle'] = self._idle.qsize()
+        stats['max'] = self.pool_max
+        return stats
+    
+    def close_connections(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
     
     def _hash_password(self, password: str, salt: Optional[str] = None) -> tuple[str, str]:
-        """Hash a password with salt"""
-        if salt is None:
-            salt = secrets.token_hex(32)
-        
-        password_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000  # iterations
-        )
-        return password_hash.hex(), salt
+        """Hash a password with salt using the configured KDF, on the hashing pool"""
+        return get_password_hasher().hash(password, salt)
     
     def create_user(self, username: str, password: str) -> Optional[int]:
         """Create a new user and return user ID"""
@@ -95,19 +287,34 @@ class DatabaseManager:
             ''', (username,))
             
             user = cursor.fetchone()
-            if not user:
-                return None
-            
-            # Verify password
-            password_hash, _ = self._hash_password(password, user['salt'])
-            if password_hash == user['password_hash']:
-                return {
-                    'id': user['id'],
-                    'username': user['username']
-                }
-            
+        if not user:
             return None
+        
+        # Verify password without holding a connection while the KDF runs
+        matches, needs_rehash = get_password_hasher().verify(password, user['password_hash'], user['salt'])
+        if not matches:
+            return None
+        
+        # Upgrade hashes made with older KDF settings while we have the password
+        if needs_rehash:
+            password_hash, salt = self._hash_password(password)
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        UPDATE users SET password_hash = %s, salt = %s
+                        WHERE id = %s AND password_hash = %s
+                    ''', (password_hash, salt, user['id'], user['password_hash']))
+                    conn.commit()
+            except psycopg2.Error as e:
+                logger.error(f"Error upgrading password hash: {e}")
+        
+        return {
+            'id': user['id'],
+            'username': user['username']
+        }
     
+    @request_memoized('user')
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         with self.get_connection() as conn:
@@ -123,6 +330,31 @@ class DatabaseManager:
                 return dict(user)
             return None
     
+    def touch_user(self, user_id: int) -> bool:
+        """Record that a user was just active (used to prioritize background refreshes)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('UPDATE users SET last_seen_at = CURRENT_TIMESTAMP WHERE id = %s', (user_id,))
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            logger.error(f"Error updating user activity: {e}")
+            return False
+    
+    def get_data_version(self, user_id: int) -> Optional[int]:
+        """Current version of a user's account and transaction data (None if no such user)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT data_version FROM users WHERE id = %s', (user_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    def _bump_data_version(self, cursor, user_id: int):
+        """Mark a user's cached summaries stale as part of the current write (caller commits)"""
+        cursor.execute('UPDATE users SET data_version = data_version + 1 WHERE id = %s', (user_id,))
+    
+    @invalidates('tokens')
     def store_user_token(self, user_id: int, access_token: str, item_id: Optional[str] = None, 
                          public_token: Optional[str] = None, institution_id: Optional[str] = None, 
                          institution_name: Optional[str] = None) -> bool:
@@ -166,13 +398,14 @@ class DatabaseManager:
         except psycopg2.Error:
             return False
     
+    @request_memoized('tokens')
     def get_user_tokens(self, user_id: int) -> list[Dict[str, Any]]:
         """Get all user's access tokens with institution information"""
         with self.get_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute('''
                 SELECT id, access_token, item_id, public_token, institution_id, institution_name,
-                       created_at, updated_at
+                       transactions_cursor, created_at, updated_at
                 FROM user_tokens
                 WHERE user_id = %s
                 ORDER BY created_at DESC
@@ -181,11 +414,27 @@ class DatabaseManager:
             tokens = cursor.fetchall()
             return [dict(token) for token in tokens]
     
+    def get_token_by_item_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Get the access token row (including user_id) for a Plaid item"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT id, user_id, access_token, item_id, public_token, institution_id, institution_name,
+                       transactions_cursor, created_at, updated_at
+                FROM user_tokens
+                WHERE item_id = %s
+                ORDER BY created_at DESC
+            ''', (item_id,))
+            
+            token = cursor.fetchone()
+            return dict(token) if token else None
+    
     def get_user_token(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user's first access token with institution information (for backward compatibility)"""
         tokens = self.get_user_tokens(user_id)
         return tokens[0] if tokens else None
     
+    @invalidates('tokens', 'accounts')
     def delete_user_token(self, user_id: int, token_id: Optional[int] = None) -> bool:
         """Delete a specific user token or all tokens for user"""
         try:
@@ -196,17 +445,47 @@ class DatabaseManager:
                                  (user_id, token_id))
                 else:
                     cursor.execute('DELETE FROM user_tokens WHERE user_id = %s', (user_id,))
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except psycopg2.Error:
             return False
     
+    @invalidates('tokens')
+    def update_transactions_cursor(self, user_id: int, token_id: int, transactions_cursor: Optional[str]) -> bool:
+        """Store the /transactions/sync cursor for a specific token"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE user_tokens
+                    SET transactions_cursor = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND id = %s
+                ''', (transactions_cursor, user_id, token_id))
+                conn.commit()
+                return cursor.rowcount > 0
+        except psycopg2.Error as e:
+            logger.error(f"Error updating transactions cursor: {e}")
+            return False
+    
+    def get_transactions_cursor(self, user_id: int, token_id: int) -> Optional[str]:
+        """Get the stored /transactions/sync cursor for a specific token"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT transactions_cursor FROM user_tokens
+                WHERE user_id = %s AND id = %s
+            ''', (user_id, token_id))
+            
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
     def get_all_users(self) -> list[Dict[str, Any]]:
         """Get all users (for admin purposes)"""
         with self.get_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute('''
-                SELECT u.id, u.username, u.created_at,
+                SELECT u.id, u.username, u.created_at, u.last_seen_at,
                        CASE WHEN ut.access_token IS NOT NULL THEN 1 ELSE 0 END as has_token
                 FROM users u
                 LEFT JOIN user_tokens ut ON u.id = ut.user_id
@@ -215,74 +494,164 @@ class DatabaseManager:
             
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_institution(self, institution_id: str) -> Optional[Dict[str, Any]]:
+        """Get cached institution metadata"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT institution_id, name, logo, primary_color, url, updated_at
+                FROM institutions
+                WHERE institution_id = %s
+            ''', (institution_id,))
+            
+            institution = cursor.fetchone()
+            return dict(institution) if institution else None
+    
+    def store_institution(self, institution: Dict[str, Any]) -> bool:
+        """Insert or refresh cached institution metadata"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO institutions (institution_id, name, logo, primary_color, url, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (institution_id) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        logo = EXCLUDED.logo,
+                        primary_color = EXCLUDED.primary_color,
+                        url = EXCLUDED.url,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (
+                    institution['institution_id'], institution['name'], institution.get('logo'),
+                    institution.get('primary_color'), institution.get('url')
+                ))
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            logger.error(f"Error storing institution: {e}")
+            return False
+    
+    def acquire_refresh_lock(self, lock_key: str, owner: str, ttl_seconds: float) -> bool:
+        """Take a refresh lock row unless another owner holds an unexpired one"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO refresh_locks (lock_key, owner, expires_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                    ON CONFLICT (lock_key) DO UPDATE SET
+                        owner = EXCLUDED.owner,
+                        expires_at = EXCLUDED.expires_at
+                    WHERE refresh_locks.expires_at <= CURRENT_TIMESTAMP
+                ''', (lock_key, owner, ttl_seconds))
+                conn.commit()
+                return cursor.rowcount > 0
+        except psycopg2.Error as e:
+            logger.error(f"Error acquiring refresh lock: {e}")
+            return False
+    
+    def release_refresh_lock(self, lock_key: str, owner: str) -> bool:
+        """Release a refresh lock row held by owner"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    DELETE FROM refresh_locks WHERE lock_key = %s AND owner = %s
+                ''', (lock_key, owner))
+                conn.commit()
+                return cursor.rowcount > 0
+        except psycopg2.Error as e:
+            logger.error(f"Error releasing refresh lock: {e}")
+            return False
+    
+    def _classify_account_row(self, account: Dict[str, Any]) -> str:
+        """Use the classification provided by PlaidService, or fall back to our own logic"""
+        classification = account.get('account_classification')
+        if classification:
+            return classification
+        
+        account_type = (account.get('type') or '').lower()
+        account_subtype = (account.get('subtype') or '').lower()
+        
+        if account_type in ['depository', 'investment', 'other']:
+            return 'asset'
+        elif account_type in ['credit', 'loan']:
+            return 'liability'
+        # Default classification based on subtype
+        if account_subtype in ['checking', 'savings', 'money market', 'cd', 'brokerage', 'ira', '401k']:
+            return 'asset'
+        elif account_subtype in ['credit card', 'line of credit', 'mortgage', 'auto', 'student']:
+            return 'liability'
+        return 'asset'  # Default to asset
+    
+    @invalidates('accounts')
     def store_accounts(self, user_id: int, token_id: int, accounts_data: list[Dict[str, Any]]) -> bool:
-        """Store account information in the database"""
+        """
+        Upsert account information in one batch, keeping custom_name and created_at
+        
+        updated_at is refreshed on every stored account, since it dates the
+        cache, but data_version moves only when an account's data changed.
+        """
+        # Key on account_id so a repeated account doesn't hit the same row twice
+        rows_by_id = {}
+        for account in accounts_data:
+            balances = account.get('balances') or {}
+            rows_by_id[account['account_id']] = (
+                user_id, token_id, account['account_id'], account['name'],
+                account['type'], account.get('subtype'), account.get('institution_name'),
+                balances.get('current'), balances.get('available'),
+                balances.get('iso_currency_code', 'USD'),
+                balances.get('unofficial_currency_code'),
+                self._classify_account_row(account), True
+            )
+        rows = list(rows_by_id.values())
+        if not rows:
+            return True
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                for account in accounts_data:
-                    # Use the classification provided by PlaidService, or fall back to our own logic
-                    classification = account.get('account_classification')
-                    
-                    if not classification:
-                        # Fallback classification logic if not provided
-                        account_type = account.get('type', '').lower()
-                        account_subtype = account.get('subtype', '').lower()
-                        
-                        if account_type in ['depository', 'investment', 'other']:
-                            classification = 'asset'
-                        elif account_type in ['credit', 'loan']:
-                            classification = 'liability'
-                        else:
-                            # Default classification based on subtype
-                            if account_subtype in ['checking', 'savings', 'money market', 'cd', 'brokerage', 'ira', '401k']:
-                                classification = 'asset'
-                            elif account_subtype in ['credit card', 'line of credit', 'mortgage', 'auto', 'student']:
-                                classification = 'liability'
-                            else:
-                                classification = 'asset'  # Default to asset
-                    
-                    # Extract balance information
-                    balances = account.get('balances', {})
-                    current_balance = balances.get('current')
-                    available_balance = balances.get('available')
-                    
-                    # Check if account already exists to preserve custom_name
-                    cursor.execute('SELECT custom_name FROM accounts WHERE user_id = %s AND account_id = %s', 
-                                 (user_id, account['account_id']))
-                    existing_account = cursor.fetchone()
-                    existing_custom_name = existing_account['custom_name'] if existing_account else None
-                    
-                    # Insert or update account
-                    cursor.execute('''
-                        INSERT INTO accounts (
-                            user_id, token_id, account_id, name, type, subtype, 
-                            institution_name, current_balance, available_balance,
-                            iso_currency_code, unofficial_currency_code, account_classification,
-                            custom_name, is_active, updated_at
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                        ON CONFLICT (user_id, account_id) DO UPDATE SET
-                            name = EXCLUDED.name,
-                            type = EXCLUDED.type,
-                            subtype = EXCLUDED.subtype,
-                            institution_name = EXCLUDED.institution_name,
-                            current_balance = EXCLUDED.current_balance,
-                            available_balance = EXCLUDED.available_balance,
-                            iso_currency_code = EXCLUDED.iso_currency_code,
-                            unofficial_currency_code = EXCLUDED.unofficial_currency_code,
-                            account_classification = EXCLUDED.account_classification,
-                            is_active = EXCLUDED.is_active,
-                            updated_at = CURRENT_TIMESTAMP
-                    ''', (
-                        user_id, token_id, account['account_id'], account['name'],
-                        account['type'], account.get('subtype'), account.get('institution_name'),
-                        current_balance, available_balance,
-                        balances.get('iso_currency_code', 'USD'),
-                        balances.get('unofficial_currency_code'),
-                        classification, existing_custom_name, True
-                    ))
-                
+                changed = execute_values(cursor, '''
+                    INSERT INTO accounts (
+                        user_id, token_id, account_id, name, type, subtype,
+                        institution_name, current_balance, available_balance,
+                        iso_currency_code, unofficial_currency_code, account_classification,
+                        is_active, updated_at
+                    ) VALUES %s
+                    ON CONFLICT (user_id, account_id) DO UPDATE SET
+                        token_id = EXCLUDED.token_id,
+                        name = EXCLUDED.name,
+                        type = EXCLUDED.type,
+                        subtype = EXCLUDED.subtype,
+                        institution_name = EXCLUDED.institution_name,
+                        current_balance = EXCLUDED.current_balance,
+                        available_balance = EXCLUDED.available_balance,
+                        iso_currency_code = EXCLUDED.iso_currency_code,
+                        unofficial_currency_code = EXCLUDED.unofficial_currency_code,
+                        account_classification = EXCLUDED.account_classification,
+                        is_active = EXCLUDED.is_active,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (
+                        accounts.token_id, accounts.name, accounts.type, accounts.subtype,
+                        accounts.institution_name, accounts.current_balance, accounts.available_balance,
+                        accounts.iso_currency_code, accounts.unofficial_currency_code,
+                        accounts.account_classification, accounts.is_active
+                    ) IS DISTINCT FROM (
+                        EXCLUDED.token_id, EXCLUDED.name, EXCLUDED.type, EXCLUDED.subtype,
+                        EXCLUDED.institution_name, EXCLUDED.current_balance, EXCLUDED.available_balance,
+                        EXCLUDED.iso_currency_code, EXCLUDED.unofficial_currency_code,
+                        EXCLUDED.account_classification, EXCLUDED.is_active
+                    )
+                    RETURNING 1
+                ''', rows, template='(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)',
+                    fetch=True)
+                # Unchanged accounts are still fresh as of now
+                cursor.execute('''
+                    UPDATE accounts SET updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND account_id = ANY(%s)
+                ''', (user_id, list(rows_by_id)))
+                if changed:
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -290,6 +659,7 @@ class DatabaseManager:
             logger.error(f"Error storing accounts: {e}")
             return False
     
+    @request_memoized('accounts')
     def get_cached_accounts(self, user_id: int) -> list[Dict[str, Any]]:
         """Get cached account information from database"""
         with self.get_connection() as conn:
@@ -329,6 +699,7 @@ class DatabaseManager:
             
             return accounts
     
+    @invalidates('accounts')
     def update_account_balances(self, user_id: int, accounts_data: list[Dict[str, Any]]) -> bool:
         """Update account balances from fresh API data"""
         try:
@@ -348,6 +719,7 @@ class DatabaseManager:
                         account['account_id']
                     ))
                 
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -355,19 +727,37 @@ class DatabaseManager:
             logger.error(f"Error updating account balances: {e}")
             return False
     
+    @invalidates('accounts')
     def delete_accounts_by_token(self, user_id: int, token_id: int) -> bool:
         """Delete accounts associated with a specific token"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                self._lock_rollups(cursor, user_id)
+                # The accounts' transactions go too, recorded as removals, so a
+                # relinked item stores them afresh instead of matching orphans
+                account_filter = 'account_id IN (SELECT account_id FROM accounts WHERE user_id = %s AND token_id = %s)'
+                cursor.execute(f'''
+                    WITH deleted AS (
+                        DELETE FROM transactions WHERE user_id = %s AND {account_filter}
+                        RETURNING user_id, transaction_id
+                    )
+                    INSERT INTO transaction_removals (user_id, transaction_id)
+                    SELECT user_id, transaction_id FROM deleted
+                ''', (user_id, user_id, token_id))
+                cursor.execute(f'DELETE FROM transaction_rollups WHERE user_id = %s AND {account_filter}',
+                               (user_id, user_id, token_id))
                 cursor.execute('DELETE FROM accounts WHERE user_id = %s AND token_id = %s', 
                              (user_id, token_id))
+                self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except psycopg2.Error as e:
             logger.error(f"Error deleting accounts: {e}")
             return False
     
+    @request_memoized('accounts')
+    @versioned_summary
     def get_account_summary(self, user_id: int) -> Dict[str, Any]:
         """Get summary statistics for user's accounts"""
         with self.get_connection() as conn:
@@ -416,6 +806,7 @@ class DatabaseManager:
                             classification_summary.get('liability', {}).get('total_balance', 0))
             }
     
+    @invalidates('accounts')
     def update_account_custom_name(self, user_id: int, account_id: str, custom_name: Optional[str]) -> bool:
         """Update the custom name for an account"""
         try:
@@ -435,6 +826,7 @@ class DatabaseManager:
                 
                 # Check if any rows were updated
                 if cursor.rowcount > 0:
+                    self._bump_data_version(cursor, user_id)
                     conn.commit()
                     return True
                 else:
@@ -445,75 +837,119 @@ class DatabaseManager:
             return False
     
     def store_transactions(self, user_id: int, transactions_data: list[Dict[str, Any]]) -> bool:
-        """Store transaction information in the database"""
+        """
+        Upsert transaction information in one batch, keeping id and created_at
+        
+        Rows identical to what is stored are left alone, updated_at included,
+        so re-storing an unchanged period neither shows up as a change to
+        incremental syncs nor invalidates cached summaries.
+        """
+        # Key on transaction_id so a transaction both added and modified in one
+        # sync is written once, with its latest version
+        rows_by_id = {}
+        for transaction in transactions_data:
+            # Extract category information
+            category = None
+            subcategory = None
+            categories = transaction.get('category', [])
+            if categories:
+                category = categories[0] if len(categories) > 0 else None
+                subcategory = categories[1] if len(categories) > 1 else None
+            
+            rows_by_id[transaction.get('transaction_id')] = (
+                user_id, transaction.get('account_id'), transaction.get('transaction_id'),
+                transaction.get('amount'),
+                transaction.get('iso_currency_code', 'USD'),
+                transaction.get('unofficial_currency_code'),
+                transaction.get('date'), transaction.get('datetime'),
+                transaction.get('authorized_date'),
+                transaction.get('authorized_datetime'),
+                transaction.get('name'), transaction.get('merchant_name'),
+                transaction.get('account_owner'),
+                category, subcategory,
+                transaction.get('transaction_type'),
+                transaction.get('pending', False),
+                transaction.get('institution_name'),
+                transaction.get('category_primary', 'OTHER'),
+                transaction.get('category_detailed', 'OTHER'),
+                transaction.get('category_confidence', 'UNKNOWN'),
+                transaction.get('pending_transaction_id')
+            )
+        rows = list(rows_by_id.values())
+        if not rows:
+            return True
+        
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                self._lock_rollups(cursor, user_id)
                 
-                for transaction in transactions_data:
-                    # Extract transaction data
-                    transaction_id = transaction.get('transaction_id')
-                    account_id = transaction.get('account_id')
-                    amount = transaction.get('amount')
-                    date = transaction.get('date')
-                    name = transaction.get('name')
-                    
-                    # Extract category information
-                    category = None
-                    subcategory = None
-                    categories = transaction.get('category', [])
-                    if categories:
-                        category = categories[0] if len(categories) > 0 else None
-                        subcategory = categories[1] if len(categories) > 1 else None
-                    
-                    # Insert or update transaction
-                    cursor.execute('''
-                        INSERT INTO transactions (
-                            user_id, account_id, transaction_id, amount, iso_currency_code,
-                            unofficial_currency_code, date, datetime, authorized_date,
-                            authorized_datetime, name, merchant_name, account_owner,
-                            category, subcategory, transaction_type, pending,
-                            institution_name, category_primary, category_detailed,
-                            category_confidence, updated_at
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                        ON CONFLICT (user_id, transaction_id) DO UPDATE SET
-                            amount = EXCLUDED.amount,
-                            iso_currency_code = EXCLUDED.iso_currency_code,
-                            unofficial_currency_code = EXCLUDED.unofficial_currency_code,
-                            date = EXCLUDED.date,
-                            datetime = EXCLUDED.datetime,
-                            authorized_date = EXCLUDED.authorized_date,
-                            authorized_datetime = EXCLUDED.authorized_datetime,
-                            name = EXCLUDED.name,
-                            merchant_name = EXCLUDED.merchant_name,
-                            account_owner = EXCLUDED.account_owner,
-                            category = EXCLUDED.category,
-                            subcategory = EXCLUDED.subcategory,
-                            transaction_type = EXCLUDED.transaction_type,
-                            pending = EXCLUDED.pending,
-                            institution_name = EXCLUDED.institution_name,
-                            category_primary = EXCLUDED.category_primary,
-                            category_detailed = EXCLUDED.category_detailed,
-                            category_confidence = EXCLUDED.category_confidence,
-                            updated_at = CURRENT_TIMESTAMP
-                    ''', (
-                        user_id, account_id, transaction_id, amount,
-                        transaction.get('iso_currency_code', 'USD'),
-                        transaction.get('unofficial_currency_code'),
-                        date, transaction.get('datetime'),
-                        transaction.get('authorized_date'),
-                        transaction.get('authorized_datetime'),
-                        name, transaction.get('merchant_name'),
-                        transaction.get('account_owner'),
-                        category, subcategory,
-                        transaction.get('transaction_type'),
-                        transaction.get('pending', False),
-                        transaction.get('institution_name'),
-                        transaction.get('category_primary', 'OTHER'),
-                        transaction.get('category_detailed', 'OTHER'),
-                        transaction.get('category_confidence', 'UNKNOWN')
-                    ))
+                # Months whose rollups change: where the rows were and where they are now
+                cursor.execute('''
+                    SELECT DISTINCT to_char(date, 'YYYY-MM') FROM transactions
+                    WHERE user_id = %s AND transaction_id = ANY(%s)
+                ''', (user_id, list(rows_by_id)))
+                months = {row[0] for row in cursor.fetchall()}
+                months.update(str(row[6])[:7] for row in rows if row[6])
                 
+                changed = execute_values(cursor, '''
+                    INSERT INTO transactions (
+                        user_id, account_id, transaction_id, amount, iso_currency_code,
+                        unofficial_currency_code, date, datetime, authorized_date,
+                        authorized_datetime, name, merchant_name, account_owner,
+                        category, subcategory, transaction_type, pending,
+                        institution_name, category_primary, category_detailed,
+                        category_confidence, pending_transaction_id, updated_at
+                    ) VALUES %s
+                    ON CONFLICT (user_id, transaction_id) DO UPDATE SET
+                        account_id = EXCLUDED.account_id,
+                        amount = EXCLUDED.amount,
+                        iso_currency_code = EXCLUDED.iso_currency_code,
+                        unofficial_currency_code = EXCLUDED.unofficial_currency_code,
+                        date = EXCLUDED.date,
+                        datetime = EXCLUDED.datetime,
+                        authorized_date = EXCLUDED.authorized_date,
+                        authorized_datetime = EXCLUDED.authorized_datetime,
+                        name = EXCLUDED.name,
+                        merchant_name = EXCLUDED.merchant_name,
+                        account_owner = EXCLUDED.account_owner,
+                        category = EXCLUDED.category,
+                        subcategory = EXCLUDED.subcategory,
+                        transaction_type = EXCLUDED.transaction_type,
+                        pending = EXCLUDED.pending,
+                        institution_name = EXCLUDED.institution_name,
+                        category_primary = EXCLUDED.category_primary,
+                        category_detailed = EXCLUDED.category_detailed,
+                        category_confidence = EXCLUDED.category_confidence,
+                        pending_transaction_id = EXCLUDED.pending_transaction_id,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (
+                        transactions.account_id, transactions.amount, transactions.iso_currency_code,
+                        transactions.unofficial_currency_code, transactions.date, transactions.datetime,
+                        transactions.authorized_date, transactions.authorized_datetime, transactions.name,
+                        transactions.merchant_name, transactions.account_owner, transactions.category,
+                        transactions.subcategory, transactions.transaction_type, transactions.pending,
+                        transactions.institution_name, transactions.category_primary,
+                        transactions.category_detailed, transactions.category_confidence,
+                        transactions.pending_transaction_id
+                    ) IS DISTINCT FROM (
+                        EXCLUDED.account_id, EXCLUDED.amount, EXCLUDED.iso_currency_code,
+                        EXCLUDED.unofficial_currency_code, EXCLUDED.date, EXCLUDED.datetime,
+                        EXCLUDED.authorized_date, EXCLUDED.authorized_datetime, EXCLUDED.name,
+                        EXCLUDED.merchant_name, EXCLUDED.account_owner, EXCLUDED.category,
+                        EXCLUDED.subcategory, EXCLUDED.transaction_type, EXCLUDED.pending,
+                        EXCLUDED.institution_name, EXCLUDED.category_primary,
+                        EXCLUDED.category_detailed, EXCLUDED.category_confidence,
+                        EXCLUDED.pending_transaction_id
+                    )
+                    RETURNING 1
+                ''', rows,
+                    template='(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '
+                             '%s, CURRENT_TIMESTAMP)',
+                    page_size=TRANSACTION_BATCH_SIZE, fetch=True)
+                if changed:
+                    self._refresh_rollups(cursor, user_id, months)
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
                 
@@ -521,193 +957,304 @@ class DatabaseManager:
             logger.error(f"Error storing transactions: {e}")
             return False
     
+    def delete_transactions(self, user_id: int, transaction_ids: list[str]) -> bool:
+        """Delete specific transactions (e.g. those removed by /transactions/sync)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._lock_rollups(cursor, user_id)
+                cursor.execute('''
+                    DELETE FROM transactions WHERE user_id = %s AND transaction_id = ANY(%s)
+                    RETURNING transaction_id, to_char(date, 'YYYY-MM')
+                ''', (user_id, list(transaction_ids)))
+                deleted = cursor.fetchall()
+                if deleted:
+                    execute_values(cursor, 'INSERT INTO transaction_removals (user_id, transaction_id) VALUES %s',
+                                   [(user_id, row[0]) for row in deleted], page_size=TRANSACTION_BATCH_SIZE)
+                    self._refresh_rollups(cursor, user_id, {row[1] for row in deleted})
+                    self._bump_data_version(cursor, user_id)
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            logger.error(f"Error deleting transactions: {e}")
+            return False
+    
+    def _lock_rollups(self, cursor, user_id: int):
+        """Serialize rollup maintenance for a user until the current transaction ends"""
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('transaction_rollups'), %s)", (user_id,))
+    
+    def _refresh_rollups(self, cursor, user_id: int, months: set[str]):
+        """Recompute a user's rollup rows for the given YYYY-MM months (caller commits)"""
+        for year_month in sorted(months):
+            year, month = int(year_month[:4]), int(year_month[5:7])
+            start, end = self._period_bounds(year, month)
+            cursor.execute('DELETE FROM transaction_rollups WHERE user_id = %s AND year_month = %s',
+                           (user_id, year_month))
+            cursor.execute('''
+                INSERT INTO transaction_rollups (
+                    user_id, year_month, account_id, category_primary, category,
+                    transaction_count, total_debits, total_credits, total_amount
+                )
+                SELECT 
+                    user_id, %s, account_id, COALESCE(category_primary, ''), COALESCE(category, ''),
+                    COUNT(*),
+                    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+                    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END),
+                    SUM(ABS(amount))
+                FROM transactions
+                WHERE user_id = %s AND date >= %s AND date < %s
+                GROUP BY user_id, account_id, COALESCE(category_primary, ''), COALESCE(category, '')
+            ''', (year_month, user_id, start, end))
+    
+    def rebuild_transaction_rollups(self, user_id: Optional[int] = None) -> bool:
+        """Recompute transaction_rollups from scratch for one user, or for everyone"""
+        user_filter = ' WHERE user_id = %s' if user_id is not None else ''
+        params = (user_id,) if user_id is not None else ()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if user_id is not None:
+                    self._lock_rollups(cursor, user_id)
+                else:
+                    cursor.execute('LOCK TABLE transaction_rollups IN EXCLUSIVE MODE')
+                cursor.execute('DELETE FROM transaction_rollups' + user_filter, params)
+                cursor.execute('''
+                    INSERT INTO transaction_rollups (
+                        user_id, year_month, account_id, category_primary, category,
+                        transaction_count, total_debits, total_credits, total_amount
+                    )
+                    SELECT 
+                        user_id, to_char(date, 'YYYY-MM'), account_id,
+                        COALESCE(category_primary, ''), COALESCE(category, ''),
+                        COUNT(*),
+                        SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+                        SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END),
+                        SUM(ABS(amount))
+                    FROM transactions''' + user_filter + '''
+                    GROUP BY user_id, to_char(date, 'YYYY-MM'), account_id,
+                             COALESCE(category_primary, ''), COALESCE(category, '')
+                ''', params)
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            logger.error(f"Error rebuilding transaction rollups: {e}")
+            return False
+    
+    @staticmethod
+    def _period_bounds(year: Optional[int], month: Optional[int] = None) -> Optional[tuple[datetime.date, datetime.date]]:
+        """Half-open [start, end) date range for a year or month (None for no period)"""
+        if year is None:
+            return None
+        if month is None:
+            return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+        if month == 12:
+            return datetime.date(year, 12, 1), datetime.date(year + 1, 1, 1)
+        return datetime.date(year, month, 1), datetime.date(year, month + 1, 1)
+    
+    def _transactions_query(self, user_id: int, account_types: Optional[list[str]], account_id: Optional[str],
+                            year: Optional[int], month: Optional[int],
+                            cursor: Optional[str] = None) -> tuple[str, list[Any]]:
+        """Build the newest-first transaction listing query (without LIMIT) and its parameters"""
+        # Build query with optional account type filtering and account ID filtering
+        query = '''
+            SELECT t.*, a.name as account_name, a.type as account_type, 
+                   a.subtype as account_subtype, a.institution_name
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
+            WHERE t.user_id = %s AND a.is_active = TRUE
+        '''
+        params: list[Any] = [user_id]
+        
+        # Add year/month filtering as a half-open date range so the
+        # (user_id, date) index is used
+        period = self._period_bounds(year, month)
+        if period:
+            query += ' AND t.date >= %s AND t.date < %s'
+            params.extend(period)
+        
+        if account_id:
+            query += ' AND t.account_id = %s'
+            params.append(account_id)
+        elif account_types:
+            placeholders = ','.join(['%s' for _ in account_types])
+            query += f' AND a.type IN ({placeholders})'
+            params.extend(account_types)
+        
+        # Continue strictly after the previous page's last row; NULL datetimes sort last
+        if cursor:
+            after_date, after_datetime, after_id = decode_cursor(cursor)
+            if after_datetime is None:
+                query += ' AND t.date <= %s AND (t.date < %s OR (t.datetime IS NULL AND t.id < %s))'
+                params.extend([after_date, after_date, after_id])
+            else:
+                query += (' AND t.date <= %s AND (t.date < %s OR t.datetime < %s OR t.datetime IS NULL'
+                          ' OR (t.datetime = %s AND t.id < %s))')
+                params.extend([after_date, after_date, after_datetime, after_datetime, after_id])
+        
+        query += ' ORDER BY t.date DESC, t.datetime DESC NULLS LAST, t.id DESC'
+        return query, params
+    
+    @staticmethod
+    def _format_transaction(row) -> Dict[str, Any]:
+        """Shape a transaction listing row like the Plaid API's transaction objects"""
+        transaction_dict = dict(row)
+        return {
+            'transaction_id': transaction_dict['transaction_id'],
+            'account_id': transaction_dict['account_id'],
+            'account_name': transaction_dict['account_name'],
+            'account_type': transaction_dict['account_type'],
+            'account_subtype': transaction_dict['account_subtype'],
+            'amount': float(transaction_dict['amount']),
+            'name': transaction_dict['name'],
+            'merchant_name': transaction_dict['merchant_name'],
+            'category': transaction_dict['category'],
+            'subcategory': transaction_dict['subcategory'],
+            'category_primary': transaction_dict.get('category_primary', 'OTHER'),
+            'category_detailed': transaction_dict.get('category_detailed', 'OTHER'),
+            'category_confidence': transaction_dict.get('category_confidence', 'UNKNOWN'),
+            'date': transaction_dict['date'],
+            'pending': transaction_dict['pending'],
+            'institution_name': transaction_dict['institution_name'],
+            'formatted_amount': f"${abs(float(transaction_dict['amount'])):,.2f}",
+            'transaction_type': 'debit' if float(transaction_dict['amount']) > 0 else 'credit',
+            'pending_transaction_id': transaction_dict['pending_transaction_id'],
+            'updated_at': transaction_dict['updated_at']
+        }
+    
     def get_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None, 
-                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: int = 100, offset: int = 0) -> list[Dict[str, Any]]:
-        """Get cached transaction information from database"""
+                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: Optional[int] = 100,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of cached transactions, newest first
+        
+        Pages are keyset-paginated on (date, datetime, id): pass the previous
+        page's next_cursor to continue after it. limit=None returns every match.
+        
+        Returns:
+            Dictionary with 'transactions' and 'next_cursor' (None on the last page)
+        
+        Raises:
+            ValueError: If cursor is not a valid pagination cursor
+        """
+        query, params = self._transactions_query(user_id, account_types, account_id, year, month, cursor)
+        if limit is not None:
+            # One extra row tells us whether another page follows
+            query += ' LIMIT %s'
+            params.append(limit + 1)
+        
         with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Build query with optional account type filtering and account ID filtering
-            query = '''
-                SELECT t.*, a.name as account_name, a.type as account_type, 
-                       a.subtype as account_subtype, a.institution_name
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = %s AND a.is_active = TRUE
-            '''
-            params: list[Any] = [user_id]
-            
-            # Add year/month filtering
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    query += ' AND EXTRACT(YEAR FROM t.date) = %s AND EXTRACT(MONTH FROM t.date) = %s'
-                    params.extend([year, month])
-                else:
-                    # Entire year
-                    query += ' AND EXTRACT(YEAR FROM t.date) = %s'
-                    params.append(year)
-            
-            if account_id:
-                query += ' AND t.account_id = %s'
-                params.append(account_id)
-            elif account_types:
-                placeholders = ','.join(['%s' for _ in account_types])
-                query += f' AND a.type IN ({placeholders})'
-                params.extend(account_types)
+            db_cursor = conn.cursor(cursor_factory=RealDictCursor)
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
             
-            query += ' ORDER BY t.date DESC, t.datetime DESC LIMIT %s OFFSET %s'
-            params.extend([limit, offset])
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(last['date'], last['datetime'], last['id'])
             
-            cursor.execute(query, params)
-            
-            transactions = []
-            for row in cursor.fetchall():
-                transaction_dict = dict(row)
-                # Format the transaction data
-                formatted_transaction = {
-                    'transaction_id': transaction_dict['transaction_id'],
-                    'account_id': transaction_dict['account_id'],
-                    'account_name': transaction_dict['account_name'],
-                    'account_type': transaction_dict['account_type'],
-                    'account_subtype': transaction_dict['account_subtype'],
-                    'amount': float(transaction_dict['amount']),
-                    'name': transaction_dict['name'],
-                    'merchant_name': transaction_dict['merchant_name'],
-                    'category': transaction_dict['category'],
-                    'subcategory': transaction_dict['subcategory'],
-                    'category_primary': transaction_dict.get('category_primary', 'OTHER'),
-                    'category_detailed': transaction_dict.get('category_detailed', 'OTHER'),
-                    'category_confidence': transaction_dict.get('category_confidence', 'UNKNOWN'),
-                    'date': transaction_dict['date'],
-                    'pending': transaction_dict['pending'],
-                    'institution_name': transaction_dict['institution_name'],
-                    'formatted_amount': f"${abs(float(transaction_dict['amount'])):,.2f}",
-                    'transaction_type': 'debit' if float(transaction_dict['amount']) > 0 else 'credit',
-                    'updated_at': transaction_dict['updated_at']
-                }
-                transactions.append(formatted_transaction)
-            
-            return transactions
+            transactions = [self._format_transaction(row) for row in rows]
+            return {'transactions': transactions, 'next_cursor': next_cursor}
+    
+    def iter_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None,
+                                 account_id: Optional[str] = None, year: Optional[int] = None,
+                                 month: Optional[int] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every cached transaction for the period, newest first, as rows are read
+        
+        Rows come from a server-side cursor batch_size at a time, so memory
+        stays flat however long the period is. The connection is held until
+        the generator is exhausted or closed.
+        """
+        query, params = self._transactions_query(user_id, account_types, account_id, year, month)
+        with self.get_connection() as conn:
+            db_cursor = conn.cursor(name='iter_cached_transactions', cursor_factory=RealDictCursor)
+            db_cursor.itersize = batch_size
+            try:
+                db_cursor.execute(query, params)
+                for row in db_cursor:
+                    yield self._format_transaction(row)
+            finally:
+                db_cursor.close()
     
+    @versioned_summary
     def get_transaction_summary(self, user_id: int, account_types: Optional[list[str]] = None, 
                               account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, Any]:
         """Get transaction summary statistics"""
         with self.get_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Build query with optional account type filtering and account ID filtering
+            # Read the monthly rollups for the period, grouped by both category
+            # schemes; totals and both breakdowns are reduced from these groups
             query = '''
                 SELECT 
-                    COUNT(*) as total_transactions,
-                    SUM(CASE WHEN t.amount > 0 THEN t.amount ELSE 0 END) as total_debits,
-                    SUM(CASE WHEN t.amount < 0 THEN ABS(t.amount) ELSE 0 END) as total_credits,
-                    AVG(ABS(t.amount)) as avg_transaction_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = %s AND a.is_active = TRUE
+                    NULLIF(r.category, '') as category,
+                    NULLIF(r.category_primary, '') as category_primary,
+                    CAST(SUM(r.transaction_count) AS INTEGER) as transaction_count,
+                    SUM(r.total_debits) as total_debits,
+                    SUM(r.total_credits) as total_credits,
+                    SUM(r.total_amount) as total_amount
+                FROM transaction_rollups r
+                JOIN accounts a ON r.account_id = a.account_id AND r.user_id = a.user_id
+                WHERE r.user_id = %s AND a.is_active = TRUE
             '''
             
             params: list[Any] = [user_id]
             
-            # Add year/month filtering
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    query += ' AND EXTRACT(YEAR FROM t.date) = %s AND EXTRACT(MONTH FROM t.date) = %s'
-                    params.extend([year, month])
-                else:
-                    # Entire year
-                    query += ' AND EXTRACT(YEAR FROM t.date) = %s'
-                    params.append(year)
+            # Add year/month filtering as a half-open YYYY-MM range
+            period = self._period_bounds(year, month)
+            if period:
+                query += ' AND r.year_month >= %s AND r.year_month < %s'
+                params.extend(bound.strftime('%Y-%m') for bound in period)
             
             if account_id:
-                query += ' AND t.account_id = %s'
+                query += ' AND r.account_id = %s'
                 params.append(account_id)
             elif account_types:
                 placeholders = ','.join(['%s' for _ in account_types])
                 query += f' AND a.type IN ({placeholders})'
                 params.extend(account_types)
             
+            query += ' GROUP BY r.category, r.category_primary'
             cursor.execute(query, params)
-            row = cursor.fetchone()
-            
-            # Get spending by category
-            category_query = '''
-                SELECT 
-                    t.category,
-                    COUNT(*) as transaction_count,
-                    SUM(ABS(t.amount)) as total_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = %s AND a.is_active = TRUE
-                AND t.category IS NOT NULL
-            '''
             
-            # Add year/month filtering to category query
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    category_query += ' AND EXTRACT(YEAR FROM t.date) = %s AND EXTRACT(MONTH FROM t.date) = %s'
-                else:
-                    # Entire year
-                    category_query += ' AND EXTRACT(YEAR FROM t.date) = %s'
-            
-            if account_id:
-                category_query += ' AND t.account_id = %s'
-            elif account_types:
-                placeholders = ','.join(['%s' for _ in account_types])
-                category_query += f' AND a.type IN ({placeholders})'
-            
-            category_query += ' GROUP BY t.category ORDER BY total_amount DESC LIMIT 10'
-            
-            cursor.execute(category_query, params)
-            categories = []
-            for cat_row in cursor.fetchall():
-                categories.append({
-                    'category': cat_row['category'],
-                    'transaction_count': cat_row['transaction_count'],
-                    'total_amount': float(cat_row['total_amount'])
-                })
-            
-            # Get spending by primary category (new Plaid categorization)
-            primary_category_query = '''
-                SELECT 
-                    t.category_primary,
-                    COUNT(*) as transaction_count,
-                    SUM(ABS(t.amount)) as total_amount
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
-                WHERE t.user_id = %s AND a.is_active = TRUE
-                AND t.category_primary IS NOT NULL
-                AND t.category_primary != 'OTHER'
-            '''
-            
-            # Add year/month filtering to primary category query
-            if year is not None:
-                if month is not None:
-                    # Specific month
-                    primary_category_query += ' AND EXTRACT(YEAR FROM t.date) = %s AND EXTRACT(MONTH FROM t.date) = %s'
-                else:
-                    # Entire year
-                    primary_category_query += ' AND EXTRACT(YEAR FROM t.date) = %s'
-            
-            if account_id:
-                primary_category_query += ' AND t.account_id = %s'
-            elif account_types:
-                placeholders = ','.join(['%s' for _ in account_types])
-                primary_category_query += f' AND a.type IN ({placeholders})'
+            total_transactions = 0
+            total_debits = 0
+            total_credits = 0
+            total_amount = 0
+            category_totals: Dict[str, list] = {}
+            primary_category_totals: Dict[str, list] = {}
+            for group in cursor.fetchall():
+                count = group['transaction_count']
+                amount = group['total_amount'] or 0
+                total_transactions += count
+                total_debits += group['total_debits'] or 0
+                total_credits += group['total_credits'] or 0
+                total_amount += amount
+                
+                # Spending by category (old category field for backward compatibility)
+                if group['category'] is not None:
+                    totals = category_totals.setdefault(group['category'], [0, 0])
+                    totals[0] += count
+                    totals[1] += amount
+                
+                # Spending by primary category (new Plaid categorization)
+                if group['category_primary'] is not None and group['category_primary'] != 'OTHER':
+                    totals = primary_category_totals.setdefault(group['category_primary'], [0, 0])
+                    totals[0] += count
+                    totals[1] += amount
             
-            primary_category_query += ' GROUP BY t.category_primary ORDER BY total_amount DESC LIMIT 10'
+            def top_by_amount(totals: Dict[str, list]) -> list:
+                return sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:10]
             
-            cursor.execute(primary_category_query, params)
-            primary_categories = []
-            for cat_row in cursor.fetchall():
-                primary_categories.append({
-                    'category': cat_row['category_primary'],
-                    'transaction_count': cat_row['transaction_count'],
-                    'total_amount': float(cat_row['total_amount'])
-                })
+            categories = [
+                {'category': category, 'transaction_count': count, 'total_amount': float(amount)}
+                for category, (count, amount) in top_by_amount(category_totals)
+            ]
+            primary_categories = [
+                {'category': category, 'transaction_count': count, 'total_amount': float(amount)}
+                for category, (count, amount) in top_by_amount(primary_category_totals)
+            ]
             
             # Calculate period days
             if year is not None and month is not None:
@@ -722,11 +1269,11 @@ class DatabaseManager:
                 days = 30
             
             return {
-                'total_transactions': row['total_transactions'] or 0,
-                'total_debits': float(row['total_debits']) if row['total_debits'] else 0,
-                'total_credits': float(row['total_credits']) if row['total_credits'] else 0,
-                'avg_transaction_amount': float(row['avg_transaction_amount']) if row['avg_transaction_amount'] else 0,
-                'net_flow': (float(row['total_debits']) if row['total_debits'] else 0) - (float(row['total_credits']) if row['total_credits'] else 0),
+                'total_transactions': total_transactions,
+                'total_debits': float(total_debits),
+                'total_credits': float(total_credits),
+                'avg_transaction_amount': float(total_amount / total_transactions) if total_transactions else 0,
+                'net_flow': float(total_debits - total_credits),
                 'top_categories': categories,
                 'top_primary_categories': primary_categories,
                 'period_days': days
@@ -737,10 +1284,202 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('DELETE FROM transactions WHERE user_id = %s AND account_id = %s', 
+                self._lock_rollups(cursor, user_id)
+                cursor.execute('''
+                    WITH deleted AS (
+                        DELETE FROM transactions WHERE user_id = %s AND account_id = %s
+                        RETURNING user_id, transaction_id
+                    )
+                    INSERT INTO transaction_removals (user_id, transaction_id)
+                    SELECT user_id, transaction_id FROM deleted
+                ''', (user_id, account_id))
+                deleted = cursor.rowcount
+                cursor.execute('DELETE FROM transaction_rollups WHERE user_id = %s AND account_id = %s',
                              (user_id, account_id))
+                if deleted > 0:
+                    self._bump_data_version(cursor, user_id)
                 conn.commit()
                 return True
         except psycopg2.Error as e:
             logger.error(f"Error deleting transactions: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def get_transaction_changes(self, user_id: int, after_updated_at: Optional[datetime.datetime] = None,
+                                after_id: int = 0, settle_seconds: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Get the user's transactions changed since a watermark, oldest change first
+        
+        Rows are ordered on (updated_at, id) and continue strictly after
+        (after_updated_at, after_id); pass None to start from the beginning.
+        updated_at is stamped with the writing transaction's start time, so
+        rows updated within the last settle_seconds are left for the next
+        call: a write still committing can't slip in behind a watermark that
+        has already passed it.
+        
+        Returns:
+            Dictionary with 'transactions' (formatted like get_cached_transactions)
+            and 'watermark', the (updated_at, id) of the last row (None if empty)
+        """
+        query = '''
+            SELECT t.*, a.name as account_name, a.type as account_type, 
+                   a.subtype as account_subtype, a.institution_name
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id AND t.user_id = a.user_id
+            WHERE t.user_id = %s AND a.is_active = TRUE
+              AND t.updated_at <= CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+        '''
+        params: list[Any] = [user_id, int(settle_seconds)]
+        if after_updated_at is not None:
+            query += ' AND (t.updated_at, t.id) > (%s, %s)'
+            params.extend([after_updated_at, after_id])
+        query += ' ORDER BY t.updated_at, t.id LIMIT %s'
+        params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            watermark = (rows[-1]['updated_at'], rows[-1]['id']) if rows else None
+            return {'transactions': [self._format_transaction(row) for row in rows], 'watermark': watermark}
+    
+    def get_sheet_sync(self, user_id: int, spreadsheet_id: str, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """Incremental sync state of a user's sheet (None if it has never been synced)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT id, user_id, spreadsheet_id, sheet_title, watermark_updated_at,
+                       watermark_id, removal_watermark_id, next_row, synced_at
+                FROM sheet_syncs
+                WHERE user_id = %s AND spreadsheet_id = %s AND sheet_title = %s
+            ''', (user_id, spreadsheet_id, sheet_title))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def reset_sheet_sync(self, user_id: int, spreadsheet_id: str, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """
+        Start a sheet's sync state over from an empty sheet, forgetting its row mapping
+        
+        next_row is left at 1 until a sync has written the header row, so a
+        start interrupted before then is started again. Removals recorded so
+        far are already reflected in what the next sync reads.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute('''
+                    INSERT INTO sheet_syncs (user_id, spreadsheet_id, sheet_title, removal_watermark_id, next_row)
+                    VALUES (%s, %s, %s, (SELECT COALESCE(MAX(id), 0) FROM transaction_removals WHERE user_id = %s), 1)
+                    ON CONFLICT (user_id, spreadsheet_id, sheet_title) DO UPDATE SET
+                        watermark_updated_at = NULL,
+                        watermark_id = 0,
+                        removal_watermark_id = EXCLUDED.removal_watermark_id,
+                        next_row = 1,
+                        synced_at = NULL
+                    RETURNING id, user_id, spreadsheet_id, sheet_title, watermark_updated_at,
+                              watermark_id, removal_watermark_id, next_row, synced_at
+                ''', (user_id, spreadsheet_id, sheet_title, user_id))
+                sync = dict(cursor.fetchone())
+                cursor.execute('DELETE FROM sheet_sync_rows WHERE sync_id = %s', (sync['id'],))
+                conn.commit()
+                return sync
+        except psycopg2.Error as e:
+            logger.error(f"Error resetting sheet sync: {e}")
+            return None
+    
+    def get_sheet_rows(self, sync_id: int, transaction_ids: list[str]) -> Dict[str, tuple[int, str]]:
+        """Sheet row number and row hash of each of these transactions already synced"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT transaction_id, row_number, row_hash FROM sheet_sync_rows
+                WHERE sync_id = %s AND transaction_id = ANY(%s)
+            ''', (sync_id, list(transaction_ids)))
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    
+    def get_sheet_removals(self, sync_id: int, user_id: int, after_id: int = 0, settle_seconds: int = 0,
+                           limit: int = 1000) -> Dict[str, Any]:
+        """
+        Get the synced rows of transactions removed since a removal watermark
+        
+        Reads transaction_removals after after_id, oldest first, leaving
+        removals younger than settle_seconds for the next call. Of those it
+        returns the rows the sheet still maps that should be blanked: the
+        transaction hasn't been stored again since, and no posted transaction
+        replacing it is waiting to take its row over.
+        
+        Returns:
+            Dictionary with 'rows' ((transaction_id, row_number) pairs), 'count'
+            (removals read) and 'watermark' (id of the last one, None if none)
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, transaction_id FROM transaction_removals
+                WHERE user_id = %s AND id > %s AND removed_at <= CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+                ORDER BY id LIMIT %s
+            ''', (user_id, after_id, int(settle_seconds), limit))
+            removals = cursor.fetchall()
+            if not removals:
+                return {'rows': [], 'count': 0, 'watermark': None}
+            
+            cursor.execute('''
+                SELECT r.transaction_id, r.row_number
+                FROM sheet_sync_rows r
+                WHERE r.sync_id = %s AND r.transaction_id = ANY(%s)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM transactions t
+                      WHERE t.user_id = %s AND t.transaction_id = r.transaction_id
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM transactions t
+                      WHERE t.user_id = %s AND t.pending_transaction_id = r.transaction_id
+                        AND NOT EXISTS (
+                            SELECT 1 FROM sheet_sync_rows s
+                            WHERE s.sync_id = r.sync_id AND s.transaction_id = t.transaction_id
+                        )
+                  )
+                ORDER BY r.row_number
+            ''', (sync_id, list({row[1] for row in removals}), user_id, user_id))
+            rows = [(row[0], row[1]) for row in cursor.fetchall()]
+            return {'rows': rows, 'count': len(removals), 'watermark': removals[-1][0]}
+    
+    def save_sheet_sync_progress(self, sync_id: int, rows: list[tuple[str, int, str]], released: list[str],
+                                 watermark_updated_at: Optional[datetime.datetime], watermark_id: int,
+                                 removal_watermark_id: int, next_row: int) -> bool:
+        """
+        Record what a sync step wrote, in one transaction
+        
+        Args:
+            sync_id: The sheet_syncs row
+            rows: (transaction_id, row_number, row_hash) of rows written
+            released: Transaction IDs whose rows were blanked or taken over by a posted transaction
+            watermark_updated_at: updated_at of the last change applied
+            watermark_id: id of the last change applied
+            removal_watermark_id: id of the last transaction_removals row applied
+            next_row: First sheet row not yet used
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if released:
+                    cursor.execute('DELETE FROM sheet_sync_rows WHERE sync_id = %s AND transaction_id = ANY(%s)',
+                                   (sync_id, list(released)))
+                if rows:
+                    execute_values(cursor, '''
+                        INSERT INTO sheet_sync_rows (sync_id, transaction_id, row_number, row_hash)
+                        VALUES %s
+                        ON CONFLICT (sync_id, transaction_id) DO UPDATE SET
+                            row_number = EXCLUDED.row_number,
+                            row_hash = EXCLUDED.row_hash
+                    ''', [(sync_id, *row) for row in rows], page_size=TRANSACTION_BATCH_SIZE)
+                cursor.execute('''
+                    UPDATE sheet_syncs
+                    SET watermark_updated_at = %s, watermark_id = %s, removal_watermark_id = %s,
+                        next_row = %s, synced_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                ''', (watermark_updated_at, watermark_id, removal_watermark_id, next_row, sync_id))
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            logger.error(f"Error saving sheet sync progress: {e}")
+            return False
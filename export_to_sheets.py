@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Export cached budget data to Google Sheets for Plaid Budgeting App
+
+Writes a user's cached transactions for a year (or month) to a
+"Transactions" sheet and the monthly summaries to a "Monthly Summary"
+sheet, replacing what those sheets held. With --ledger it instead keeps a
+"Ledger" sheet of every transaction in step incrementally: only rows
+added, modified or removed since the last run are written, so a nightly
+run costs a few API calls however long the history is. Data comes from the
+local cache, so run a refresh first if it may be stale.
+
+Authenticate with a service account key (GOOGLE_SERVICE_ACCOUNT_FILE, with
+the spreadsheet shared to its client_email) or an OAuth access token
+(SHEETS_ACCESS_TOKEN). Set SHEETS_API_HOST=http://127.0.0.1:8901 to export
+to fake_sheets_server.py instead.
+
+Usage:
+    python export_to_sheets.py --user-id 3 --spreadsheet-id <id>                 # Current year
+    python export_to_sheets.py --user-id 3 --spreadsheet-id <id> --year 2025 --month 6
+    python export_to_sheets.py --user-id 3 --spreadsheet-id <id> --account-types depository credit
+    python export_to_sheets.py --user-id 3 --spreadsheet-id <id> --ledger             # Incremental ledger sync
+    python export_to_sheets.py --user-id 3 --spreadsheet-id <id> --ledger --rebuild   # Rewrite the ledger
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from sheets_client import SheetsApiError
+from sheets_export import SheetsExporter
+from sheets_sync import LedgerSync
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export cached budget data to Google Sheets')
+    parser.add_argument('--user-id', type=int, required=True, help='User whose data is exported')
+    parser.add_argument('--spreadsheet-id', default=os.getenv('SHEETS_SPREADSHEET_ID'),
+                        help='Target spreadsheet ID, from its URL (default: SHEETS_SPREADSHEET_ID)')
+    parser.add_argument('--year', type=int, default=datetime.date.today().year,
+                        help='Year to export (default: current year)')
+    parser.add_argument('--month', type=int, choices=range(1, 13), metavar='1-12',
+                        help='Only export this month')
+    parser.add_argument('--account-types', nargs='+', help='Account types to include (default: all)')
+    parser.add_argument('--ledger', action='store_true',
+                        help='Sync every transaction to the Ledger sheet incrementally instead of exporting a period')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='With --ledger, clear the Ledger sheet and write every transaction again')
+    parser.add_argument('--postgres', action='store_true',
+                        help='Use the PostgreSQL database (POSTGRES_* settings) instead of SQLite')
+    parser.add_argument('--sqlite-path', default=os.getenv('SQLITE_DB_PATH', 'plaid_app.db'),
+                        help='SQLite database file (default: plaid_app.db)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if not args.spreadsheet_id:
+        logger.error("No spreadsheet given; pass --spreadsheet-id or set SHEETS_SPREADSHEET_ID")
+        return False
+
+    if args.postgres:
+        from database_postgres import DatabaseManager
+        db = DatabaseManager(pool_max=0)
+    else:
+        from database import DatabaseManager
+        db = DatabaseManager(args.sqlite_path)
+
+    if db.get_user_by_id(args.user_id) is None:
+        logger.error(f"No user with ID {args.user_id}")
+        return False
+
+    if args.ledger:
+        logger.info(f"Syncing the ledger of user {args.user_id} to spreadsheet {args.spreadsheet_id}...")
+        try:
+            LedgerSync(db).sync(args.user_id, args.spreadsheet_id, rebuild=args.rebuild)
+        except (SheetsApiError, RuntimeError) as e:
+            logger.error(f"Ledger sync failed: {e}")
+            return False
+        logger.info("Ledger sync completed")
+        return True
+
+    period = f"{args.year}-{args.month:02d}" if args.month else str(args.year)
+    logger.info(f"Exporting {period} for user {args.user_id} to spreadsheet {args.spreadsheet_id}...")
+    try:
+        SheetsExporter(db).export_period(args.user_id, args.spreadsheet_id, args.year, args.month,
+                                         args.account_types)
+    except SheetsApiError as e:
+        logger.error(f"Export failed: {e}")
+        return False
+
+    logger.info("Export completed")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
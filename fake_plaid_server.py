@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Offline Plaid Stand-in Server for Plaid Budgeting App
+
+Serves the subset of the Plaid API that PlaidService uses, backed by
+deterministic synthetic data, so the fetch path can be load-tested and
+benchmarked without the rate-limited Plaid sandbox. Point the app at it with
+PLAID_HOST=http://127.0.0.1:8900.
+
+Every access token of the form access-fake-<n> is a valid item; its accounts
+and transactions are generated from <n> and --seed, so runs are repeatable.
+Latency and error rates are configurable to mimic a slow or flaky Plaid.
+
+Usage:
+    python fake_plaid_server.py                                 # Medium profile on port 8900
+    python fake_plaid_server.py --profile large --latency-ms 300 # 40k transactions per item
+    python fake_plaid_server.py --rate-limit-rate 0.05          # 5% of calls return 429
+    python fake_plaid_server.py --seed-user bench --seed-items 3 # Create a local user with 3 fake items
+"""
+
+import argparse
+import datetime
+import hashlib
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask, jsonify, request
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_PREFIX = 'access-fake-'
+
+# Item volume presets: (accounts per item, transactions per item, days of history)
+PROFILES = {
+    'small': (2, 200, 90),
+    'medium': (4, 2500, 365),
+    'large': (6, 40000, 730),
+}
+
+# (merchant, personal finance primary, detailed, legacy category, typical amount)
+MERCHANTS = [
+    ('Whole Foods', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_GROCERIES', ['Shops', 'Supermarkets and Groceries'], 85),
+    ('Starbucks', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_COFFEE', ['Food and Drink', 'Restaurants', 'Coffee Shop'], 6),
+    ('Chipotle', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_FAST_FOOD', ['Food and Drink', 'Restaurants', 'Fast Food'], 14),
+    ('Shell', 'TRANSPORTATION', 'TRANSPORTATION_GAS', ['Travel', 'Gas Stations'], 45),
+    ('Uber', 'TRANSPORTATION', 'TRANSPORTATION_TAXIS_AND_RIDE_SHARES', ['Travel', 'Taxi'], 22),
+    ('Amazon', 'GENERAL_MERCHANDISE', 'GENERAL_MERCHANDISE_ONLINE_MARKETPLACES', ['Shops', 'Digital Purchase'], 60),
+    ('Target', 'GENERAL_MERCHANDISE', 'GENERAL_MERCHANDISE_SUPERSTORES', ['Shops', 'Department Stores'], 70),
+    ('Netflix', 'ENTERTAINMENT', 'ENTERTAINMENT_TV_AND_MOVIES', ['Service', 'Subscription'], 15),
+    ('Comcast', 'RENT_AND_UTILITIES', 'RENT_AND_UTILITIES_INTERNET_AND_CABLE', ['Service', 'Cable'], 80),
+    ('PG&E', 'RENT_AND_UTILITIES', 'RENT_AND_UTILITIES_GAS_AND_ELECTRICITY', ['Service', 'Utilities'], 120),
+    ('CVS', 'MEDICAL', 'MEDICAL_PHARMACIES_AND_SUPPLEMENTS', ['Shops', 'Pharmacies'], 25),
+    ('United Airlines', 'TRAVEL', 'TRAVEL_FLIGHTS', ['Travel', 'Airlines and Aviation Services'], 350),
+]
+PAYROLL = ('ACME Corp Payroll', 'INCOME', 'INCOME_WAGES', ['Transfer', 'Payroll'], -2500)
+
+# (name, type, subtype, typical current balance)
+ACCOUNT_KINDS = [
+    ('Checking', 'depository', 'checking', 4000),
+    ('Credit Card', 'credit', 'credit card', 1200),
+    ('Savings', 'depository', 'savings', 15000),
+    ('Rewards Card', 'credit', 'credit card', 600),
+    ('Brokerage', 'investment', 'brokerage', 50000),
+    ('Auto Loan', 'loan', 'auto', 18000),
+]
+
+# Accounts that transactions are drawn from
+SPENDING_TYPES = {'depository', 'credit'}
+
+
+@dataclass
+class FakePlaidConfig:
+    """Volume, latency and failure settings for the fake server"""
+    accounts_per_item: int = 4
+    transactions_per_item: int = 2500
+    history_days: int = 365
+    seed: int = 0
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    latency_per_record_ms: float = 0
+    rate_limit_rate: float = 0
+    not_ready_rate: float = 0
+    server_error_rate: float = 0
+    sync_mutation_rate: float = 0
+
+
+class PlaidError(Exception):
+    """A Plaid-style error response"""
+
+    def __init__(self, status: int, error_type: str, error_code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+        self.error_code = error_code
+        self.message = message
+
+
+class FakePlaid:
+    """Synthetic Plaid items and the endpoint logic that serves them"""
+
+    def __init__(self, config: FakePlaidConfig):
+        self.config = config
+        self.items: Dict[int, Tuple[List[Dict], List[Dict]]] = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+
+    def _chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < rate
+
+    def _item_index(self, access_token: Optional[str]) -> int:
+        """Map an access token to its synthetic item"""
+        if not access_token or not access_token.startswith(ACCESS_TOKEN_PREFIX):
+            raise PlaidError(400, 'INVALID_INPUT', 'INVALID_ACCESS_TOKEN',
+                             'provided access token is in an invalid format')
+        try:
+            return int(access_token[len(ACCESS_TOKEN_PREFIX):])
+        except ValueError:
+            raise PlaidError(400, 'INVALID_INPUT', 'INVALID_ACCESS_TOKEN',
+                             'provided access token is in an invalid format')
+
+    def _item(self, index: int) -> Tuple[List[Dict], List[Dict]]:
+        """Get (or generate) the accounts and date-sorted transactions of an item"""
+        with self.lock:
+            item = self.items.get(index)
+            if item is None:
+                item = self._generate_item(index)
+                self.items[index] = item
+            return item
+
+    def _generate_item(self, index: int) -> Tuple[List[Dict], List[Dict]]:
+        """Deterministically build an item's accounts and transaction history"""
+        rng = random.Random(f"{self.config.seed}:{index}")
+        accounts = []
+        for n in range(self.config.accounts_per_item):
+            name, account_type, subtype, balance = ACCOUNT_KINDS[n % len(ACCOUNT_KINDS)]
+            current = round(balance * rng.uniform(0.5, 1.5), 2)
+            accounts.append({
+                'account_id': f"acc-{index}-{n}",
+                'balances': {
+                    'available': current if account_type == 'depository' else None,
+                    'current': current,
+                    'limit': 10000 if account_type == 'credit' else None,
+                    'iso_currency_code': 'USD',
+                    'unofficial_currency_code': None,
+                },
+                'mask': f"{rng.randint(0, 9999):04d}",
+                'name': f"Fake {name}",
+                'official_name': f"Fake Bank {name}",
+                'type': account_type,
+                'subtype': subtype,
+            })
+
+        spending = [acc for acc in accounts if acc['type'] in SPENDING_TYPES] or accounts
+        today = datetime.date.today()
+        transactions = []
+        for n in range(self.config.transactions_per_item):
+            account = spending[n % len(spending)]
+            if account['type'] == 'depository' and rng.random() < 0.03:
+                merchant, primary, detailed, category, amount = PAYROLL
+            else:
+                merchant, primary, detailed, category, amount = rng.choice(MERCHANTS)
+            date = today - datetime.timedelta(days=rng.randrange(self.config.history_days))
+            transactions.append({
+                'account_id': account['account_id'],
+                'amount': round(amount * rng.uniform(0.5, 1.5), 2),
+                'iso_currency_code': 'USD',
+                'unofficial_currency_code': None,
+                'category': category,
+                'category_id': None,
+                'date': date.isoformat(),
+                'authorized_date': date.isoformat(),
+                'authorized_datetime': None,
+                'datetime': None,
+                'location': {
+                    'address': None, 'city': None, 'region': None, 'postal_code': None,
+                    'country': None, 'lat': None, 'lon': None, 'store_number': None,
+                },
+                'name': merchant.upper(),
+                'merchant_name': merchant,
+                'payment_meta': {
+                    'reference_number': None, 'ppd_id': None, 'payee': None, 'by_order_of': None,
+                    'payer': None, 'payment_method': None, 'payment_processor': None, 'reason': None,
+                },
+                'payment_channel': 'in store',
+                'pending': False,
+                'pending_transaction_id': None,
+                'account_owner': None,
+                'transaction_id': f"txn-{index}-{n}",
+                'transaction_code': None,
+                'personal_finance_category': {
+                    'primary': primary,
+                    'detailed': detailed,
+                    'confidence_level': 'HIGH',
+                },
+            })
+        transactions.sort(key=lambda t: (t['date'], t['transaction_id']))
+        return accounts, transactions
+
+    def _item_body(self, index: int) -> Dict[str, Any]:
+        return {
+            'item_id': f"item-fake-{index}",
+            'institution_id': f"ins_fake_{index % 10}",
+            'webhook': None,
+            'error': None,
+            'available_products': ['balance'],
+            'billed_products': ['transactions'],
+            'products': ['transactions'],
+            'consent_expiration_time': None,
+            'update_type': 'background',
+        }
+
+    def simulate(self, path: str, records: int = 0):
+        """Sleep for the configured latency and maybe raise an injected error"""
+        delay = self.config.latency_ms + self.config.latency_per_record_ms * records
+        if self.config.jitter_ms:
+            with self.rng_lock:
+                delay += self.rng.uniform(0, self.config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self._chance(self.config.rate_limit_rate):
+            raise PlaidError(429, 'RATE_LIMIT_EXCEEDED', 'TRANSACTIONS_LIMIT',
+                             'rate limit exceeded for attempts to access this item')
+        if path.startswith('/transactions/') and self._chance(self.config.not_ready_rate):
+            raise PlaidError(400, 'ITEM_ERROR', 'PRODUCT_NOT_READY',
+                             'the requested product is not yet ready')
+        if self._chance(self.config.server_error_rate):
+            raise PlaidError(500, 'API_ERROR', 'INTERNAL_SERVER_ERROR',
+                             'an unexpected error occurred')
+
+    def accounts_get(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        index = self._item_index(body.get('access_token'))
+        accounts, _ = self._item(index)
+        self.simulate('/accounts/get', len(accounts))
+        return {'accounts': accounts, 'item': self._item_body(index)}
+
+    def transactions_get(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        index = self._item_index(body.get('access_token'))
+        accounts, transactions = self._item(index)
+        options = body.get('options') or {}
+        count = min(int(options.get('count', 100)), 500)
+        offset = int(options.get('offset', 0))
+        account_ids = options.get('account_ids')
+
+        start_date, end_date = body.get('start_date'), body.get('end_date')
+        if not start_date or not end_date or start_date > end_date:
+            raise PlaidError(400, 'INVALID_REQUEST', 'INVALID_FIELD',
+                             'start_date must be on or before end_date')
+
+        matching = [t for t in reversed(transactions)
+                    if start_date <= t['date'] <= end_date
+                    and (not account_ids or t['account_id'] in account_ids)]
+        page = matching[offset:offset + count]
+        self.simulate('/transactions/get', len(page))
+
+        if account_ids:
+            accounts = [acc for acc in accounts if acc['account_id'] in account_ids]
+        return {
+            'accounts': accounts,
+            'transactions': page,
+            'total_transactions': len(matching),
+            'item': self._item_body(index),
+        }
+
+    def transactions_sync(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        index = self._item_index(body.get('access_token'))
+        accounts, transactions = self._item(index)
+        count = min(int(body.get('count', 100)), 500)
+
+        # Cursors are positions in the item's oldest-first transaction list
+        cursor = body.get('cursor') or ''
+        try:
+            position = int(cursor[1:]) if cursor else 0
+        except ValueError:
+            raise PlaidError(400, 'INVALID_INPUT', 'INVALID_FIELD', 'cursor is invalid')
+        if cursor and position < len(transactions) and self._chance(self.config.sync_mutation_rate):
+            raise PlaidError(400, 'TRANSACTIONS_ERROR', 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION',
+                             'underlying transaction data changed since last page was fetched')
+
+        added = transactions[position:position + count]
+        next_position = position + len(added)
+        self.simulate('/transactions/sync', len(added))
+        return {
+            'transactions_update_status': 'HISTORICAL_UPDATE_COMPLETE',
+            'accounts': accounts,
+            'added': added,
+            'modified': [],
+            'removed': [],
+            'next_cursor': f"c{next_position}",
+            'has_more': next_position < len(transactions),
+        }
+
+    def item_get(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        index = self._item_index(body.get('access_token'))
+        self.simulate('/item/get')
+        return {'item': self._item_body(index)}
+
+    def item_remove(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._item_index(body.get('access_token'))
+        self.simulate('/item/remove')
+        return {}
+
+    def item_public_token_exchange(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        public_token = body.get('public_token') or ''
+        self.simulate('/item/public_token/exchange')
+        # Any public token maps to a stable item
+        index = int(hashlib.sha256(public_token.encode('utf-8')).hexdigest()[:6], 16)
+        return {'access_token': f"{ACCESS_TOKEN_PREFIX}{index}", 'item_id': f"item-fake-{index}"}
+
+    def institutions_get_by_id(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        institution_id = body.get('institution_id') or ''
+        if not institution_id.startswith('ins_fake_'):
+            raise PlaidError(400, 'INVALID_INPUT', 'INVALID_INSTITUTION',
+                             'invalid institution_id provided')
+        self.simulate('/institutions/get_by_id')
+        number = institution_id[len('ins_fake_'):]
+        institution = {
+            'institution_id': institution_id,
+            'name': f"Fake Bank {number}",
+            'products': ['transactions'],
+            'country_codes': ['US'],
+            'routing_numbers': [],
+            'oauth': False,
+            'connection_availability': 'SUPPORTED',
+        }
+        if (body.get('options') or {}).get('include_optional_metadata'):
+            institution.update({
+                'logo': None,
+                'primary_color': f"#{hashlib.md5(institution_id.encode('utf-8')).hexdigest()[:6]}",
+                'url': f"https://fakebank{number}.example.com",
+            })
+        return {'institution': institution}
+
+    def link_token_create(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.simulate('/link/token/create')
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=4)
+        return {
+            'link_token': f"link-sandbox-{uuid.uuid4()}",
+            'expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+
+def create_app(fake: FakePlaid) -> Flask:
+    """Build the Flask app that routes Plaid paths to a FakePlaid"""
+    app = Flask(__name__)
+    routes = {
+        '/accounts/get': fake.accounts_get,
+        '/transactions/get': fake.transactions_get,
+        '/transactions/sync': fake.transactions_sync,
+        '/item/get': fake.item_get,
+        '/item/remove': fake.item_remove,
+        '/item/public_token/exchange': fake.item_public_token_exchange,
+        '/institutions/get_by_id': fake.institutions_get_by_id,
+        '/link/token/create': fake.link_token_create,
+    }
+
+    def make_view(handler):
+        def view():
+            request_id = uuid.uuid4().hex[:16]
+            try:
+                body = handler(request.get_json(silent=True) or {})
+            except PlaidError as e:
+                response = jsonify({
+                    'error_type': e.error_type,
+                    'error_code': e.error_code,
+                    'error_message': e.message,
+                    'display_message': None,
+                    'request_id': request_id,
+                })
+                response.status_code = e.status
+                return response
+            body['request_id'] = request_id
+            return jsonify(body)
+        return view
+
+    for path, handler in routes.items():
+        app.add_url_rule(path, endpoint=path, view_func=make_view(handler), methods=['POST'])
+    return app
+
+
+def seed_user(username: str, items: int):
+    """Create (or reuse) a local user whose tokens point at fake items"""
+    from database import DatabaseManager
+
+    db = DatabaseManager()
+    user_id = db.create_user(username, username)
+    if user_id is None:
+        user = db.authenticate_user(username, username)
+        if user is None:
+            raise ValueError(f"User {username} exists with a different password")
+        user_id = user['id']
+
+    for index in range(items):
+        db.store_user_token(user_id, f"{ACCESS_TOKEN_PREFIX}{index}", item_id=f"item-fake-{index}",
+                            institution_id=f"ins_fake_{index % 10}",
+                            institution_name=f"Fake Bank {index % 10}")
+    logger.info(f"Seeded user {username} (password: {username}) with {items} fake items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline Plaid stand-in server for Plaid Budgeting App')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8900, help='Port to listen on (default: 8900)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='medium',
+                        help='Item volume preset (default: medium)')
+    parser.add_argument('--accounts', type=int, help='Accounts per item (overrides the profile)')
+    parser.add_argument('--transactions', type=int, help='Transactions per item (overrides the profile)')
+    parser.add_argument('--history-days', type=int, help='Days of history per item (overrides the profile)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data (default: 0)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fixed latency added to every call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, up to this much')
+    parser.add_argument('--latency-per-record-ms', type=float, default=0,
+                        help='Extra latency per account or transaction returned')
+    parser.add_argument('--rate-limit-rate', type=float, default=0,
+                        help='Fraction of calls failing with RATE_LIMIT_EXCEEDED (429)')
+    parser.add_argument('--not-ready-rate', type=float, default=0,
+                        help='Fraction of transactions calls failing with PRODUCT_NOT_READY')
+    parser.add_argument('--server-error-rate', type=float, default=0,
+                        help='Fraction of calls failing with INTERNAL_SERVER_ERROR (500)')
+    parser.add_argument('--sync-mutation-rate', type=float, default=0,
+                        help='Fraction of follow-up sync pages failing with '
+                             'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION')
+    parser.add_argument('--seed-user', help='Create this local user (password = username) before serving')
+    parser.add_argument('--seed-items', type=int, default=1, help='Fake items to link to --seed-user')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    accounts, transactions, history_days = PROFILES[args.profile]
+    config = FakePlaidConfig(
+        accounts_per_item=args.accounts or accounts,
+        transactions_per_item=args.transactions if args.transactions is not None else transactions,
+        history_days=args.history_days or history_days,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        latency_per_record_ms=args.latency_per_record_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        not_ready_rate=args.not_ready_rate,
+        server_error_rate=args.server_error_rate,
+        sync_mutation_rate=args.sync_mutation_rate,
+    )
+
+    if args.seed_user:
+        try:
+            seed_user(args.seed_user, args.seed_items)
+        except ValueError as e:
+            logger.error(str(e))
+            return False
+
+    logger.info(f"Fake Plaid serving {config.accounts_per_item} accounts and "
+                f"{config.transactions_per_item} transactions per item on http://{args.host}:{args.port}")
+    logger.info(f"Point the app at it with PLAID_HOST=http://{args.host}:{args.port}")
+    create_app(FakePlaid(config)).run(host=args.host, port=args.port, threaded=True)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Offline Google Sheets Stand-in Server for Plaid Budgeting App
+
+Serves the subset of the Sheets API v4 that SheetsClient uses from
+in-memory spreadsheets, so exports can be developed, tested and benchmarked
+without Google credentials or quota. Point the exporter at it with
+SHEETS_API_HOST=http://127.0.0.1:8901.
+
+Any spreadsheet ID is accepted; a spreadsheet is created with an empty
+Sheet1 the first time it is used. Grid limits are enforced like Google's
+(values.batchUpdate cannot write past a sheet's rows, values.append grows
+it), and per-minute read/write quotas, latency and server errors can be
+injected to exercise the client's pacing and retries. GET /_fake/stats
+returns request counts.
+
+Usage:
+    python fake_sheets_server.py                              # Port 8901, Google's default quotas
+    python fake_sheets_server.py --write-quota 10 --latency-ms 200
+    python fake_sheets_server.py --server-error-rate 0.05     # 5% of calls return 500
+"""
+
+import argparse
+import collections
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from flask import Flask, jsonify, request
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Size of a newly added sheet, as in Google Sheets
+DEFAULT_ROWS = 1000
+DEFAULT_COLUMNS = 26
+
+CELL_PATTERN = re.compile(r'^([A-Za-z]*)(\d*)$')
+
+
+@dataclass
+class FakeSheetsConfig:
+    """Quota, latency and failure settings for the fake server"""
+    read_quota_per_minute: int = 60
+    write_quota_per_minute: int = 60
+    latency_ms: float = 0
+    server_error_rate: float = 0
+    seed: int = 0
+
+
+class SheetsError(Exception):
+    """A Google-style error response"""
+
+    def __init__(self, status: int, reason: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.message = message
+
+
+def column_index(letters: str) -> int:
+    """Zero-based index of a column letter sequence (A -> 0, AA -> 26)"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def column_letters(index: int) -> str:
+    """Column letters for a zero-based index"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_range(range_a1: str) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+    """
+    Split A1 notation into (sheet title, first row, first column, end row, end column)
+
+    Rows and columns are zero-based; ends are exclusive and None when the
+    range is open (e.g. 'Sheet1!A2:J' or just 'Sheet1').
+    """
+    if range_a1.startswith("'"):
+        end = 1
+        while True:
+            end = range_a1.index("'", end)
+            if range_a1[end + 1:end + 2] == "'":
+                end += 2
+                continue
+            break
+        title = range_a1[1:end].replace("''", "'")
+        cells = range_a1[end + 2:] if range_a1[end + 1:end + 2] == '!' else ''
+    else:
+        title, _, cells = range_a1.partition('!')
+    if not cells:
+        return title, 0, 0, None, None
+
+    start, _, finish = cells.partition(':')
+    start_match, finish_match = CELL_PATTERN.match(start), CELL_PATTERN.match(finish or start)
+    if not start_match or not finish_match:
+        raise SheetsError(400, 'INVALID_ARGUMENT', f"Unable to parse range: {range_a1}")
+    row0 = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+    col0 = column_index(start_match.group(1)) if start_match.group(1) else 0
+    row1 = int(finish_match.group(2)) if finish_match.group(2) else None
+    col1 = column_index(finish_match.group(1)) + 1 if finish_match.group(1) else None
+    return title, row0, col0, row1, col1
+
+
+class FakeSheets:
+    """In-memory spreadsheets and the endpoint logic that serves them"""
+
+    def __init__(self, config: FakeSheetsConfig):
+        self.config = config
+        self.spreadsheets: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.window: Dict[str, Deque[float]] = {'read': collections.deque(), 'write': collections.deque()}
+        self.stats: Dict[str, int] = collections.Counter()
+
+    def simulate(self, kind: str, operation: str):
+        """Count the call, sleep for the configured latency and enforce quotas and injected errors"""
+        if self.config.latency_ms > 0:
+            time.sleep(self.config.latency_ms / 1000)
+        with self.lock:
+            self.stats[operation] += 1
+            self.stats['requests'] += 1
+            quota = self.config.read_quota_per_minute if kind == 'read' else self.config.write_quota_per_minute
+            window = self.window[kind]
+            now = time.monotonic()
+            while window and window[0] <= now - 60:
+                window.popleft()
+            if quota and len(window) >= quota:
+                self.stats['rate_limited'] += 1
+                raise SheetsError(429, 'RESOURCE_EXHAUSTED',
+                                  f"Quota exceeded for quota metric '{kind.capitalize()} requests' "
+                                  f"and limit '{kind.capitalize()} requests per minute per user'")
+            window.append(now)
+            if self.config.server_error_rate > 0 and self.rng.random() < self.config.server_error_rate:
+                self.stats['server_errors'] += 1
+                raise SheetsError(500, 'INTERNAL', 'Internal error encountered.')
+
+    def _spreadsheet(self, spreadsheet_id: str) -> Dict[str, Any]:
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            spreadsheet = {'next_sheet_id': 1, 'sheets': []}
+            spreadsheet['sheets'].append(self._new_sheet(0, 'Sheet1', 0))
+            self.spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+    @staticmethod
+    def _new_sheet(sheet_id: int, title: str, index: int, grid: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        grid_properties = {'rowCount': DEFAULT_ROWS, 'columnCount': DEFAULT_COLUMNS}
+        grid_properties.update(grid or {})
+        return {'properties': {'sheetId': sheet_id, 'title': title, 'index': index, 'sheetType': 'GRID',
+                               'gridProperties': grid_properties},
+                'rows': []}
+
+    def _sheet(self, spreadsheet: Dict[str, Any], title: str) -> Dict[str, Any]:
+        for sheet in spreadsheet['sheets']:
+            if sheet['properties']['title'] == title:
+                return sheet
+        raise SheetsError(400, 'INVALID_ARGUMENT', f"Unable to parse range: {title}")
+
+    @staticmethod
+    def _write(sheet: Dict[str, Any], row0: int, col0: int, values: List[List[Any]]):
+        """Write a block of values with its top-left cell at (row0, col0)"""
+        rows = sheet['rows']
+        for offset, values_row in enumerate(values):
+            row_index = row0 + offset
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            if len(row) < col0 + len(values_row):
+                row.extend([''] * (col0 + len(values_row) - len(row)))
+            row[col0:col0 + len(values_row)] = ['' if value is None else value for value in values_row]
+
+    @staticmethod
+    def _check_grid(sheet: Dict[str, Any], range_a1: str, row_end: int, col_end: int):
+        grid = sheet['properties']['gridProperties']
+        if row_end > grid['rowCount'] or col_end > grid['columnCount']:
+            raise SheetsError(400, 'INVALID_ARGUMENT',
+                              f"Range ({range_a1}) exceeds grid limits. Max rows: {grid['rowCount']}, "
+                              f"max columns: {grid['columnCount']}")
+
+    @staticmethod
+    def _updated_range(title: str, row0: int, col0: int, values: List[List[Any]]) -> str:
+        width = max((len(row) for row in values), default=1)
+        quoted = "'" + title.replace("'", "''") + "'"
+        return (f"{quoted}!{column_letters(col0)}{row0 + 1}:"
+                f"{column_letters(col0 + max(width, 1) - 1)}{row0 + max(len(values), 1)}")
+
+    def get(self, spreadsheet_id: str) -> Dict[str, Any]:
+        self.simulate('read', 'spreadsheets.get')
+        with self.lock:
+            spreadsheet = self._spreadsheet(spreadsheet_id)
+            return {'spreadsheetId': spreadsheet_id,
+                    'sheets': [{'properties': dict(sheet['properties'])} for sheet in spreadsheet['sheets']]}
+
+    def batch_update(self, spreadsheet_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.simulate('write', 'spreadsheets.batchUpdate')
+        with self.lock:
+            spreadsheet = self._spreadsheet(spreadsheet_id)
+            replies = []
+            for change in body.get('requests', []):
+                if 'addSheet' in change:
+                    properties = change['addSheet'].get('properties', {})
+                    title = properties.get('title') or f"Sheet{spreadsheet['next_sheet_id'] + 1}"
+                    if any(sheet['properties']['title'] == title for sheet in spreadsheet['sheets']):
+                        raise SheetsError(400, 'INVALID_ARGUMENT',
+                                          f"Invalid requests[0].addSheet: A sheet with the name \"{title}\" "
+                                          f"already exists. Please enter another name.")
+                    sheet = self._new_sheet(spreadsheet['next_sheet_id'], title, len(spreadsheet['sheets']),
+                                            properties.get('gridProperties'))
+                    spreadsheet['next_sheet_id'] += 1
+                    spreadsheet['sheets'].append(sheet)
+                    replies.append({'addSheet': {'properties': dict(sheet['properties'])}})
+                elif 'updateSheetProperties' in change:
+                    properties = change['updateSheetProperties']['properties']
+                    for sheet in spreadsheet['sheets']:
+                        if sheet['properties']['sheetId'] == properties.get('sheetId'):
+                            sheet['properties']['gridProperties'].update(properties.get('gridProperties', {}))
+                    replies.append({})
+                else:
+                    raise SheetsError(400, 'INVALID_ARGUMENT',
+                                      f"Unsupported request in fake server: {sorted(change)}")
+            return {'spreadsheetId': spreadsheet_id, 'replies': replies}
+
+    def values_get(self, spreadsheet_id: str, range_a1: str) -> Dict[str, Any]:
+        self.simulate('read', 'values.get')
+        with self.lock:
+            title, row0, col0, row1, col1 = parse_range(range_a1)
+            sheet = self._sheet(self._spreadsheet(spreadsheet_id), title)
+            values = [row[col0:col1] for row in sheet['rows'][row0:row1]]
+            values = [row[:max((i + 1 for i, value in enumerate(row) if value != ''), default=0)]
+                      for row in values]
+            while values and not values[-1]:
+                values.pop()
+            return {'range': range_a1, 'majorDimension': 'ROWS', 'values': values}
+
+    def values_batch_update(self, spreadsheet_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.simulate('write', 'values.batchUpdate')
+        with self.lock:
+            spreadsheet = self._spreadsheet(spreadsheet_id)
+            responses, cells = [], 0
+            # Validate every range first: the API applies all of them or none
+            blocks = []
+            for block in body.get('data', []):
+                title, row0, col0, _, _ = parse_range(block['range'])
+                sheet = self._sheet(spreadsheet, title)
+                values = block.get('values', [])
+                width = max((len(row) for row in values), default=0)
+                self._check_grid(sheet, block['range'], row0 + len(values), col0 + width)
+                blocks.append((sheet, title, row0, col0, values))
+            for sheet, title, row0, col0, values in blocks:
+                self._write(sheet, row0, col0, values)
+                updated = sum(len(row) for row in values)
+                cells += updated
+                responses.append({'updatedRange': self._updated_range(title, row0, col0, values),
+                                  'updatedRows': len(values), 'updatedCells': updated})
+            return {'spreadsheetId': spreadsheet_id, 'totalUpdatedCells': cells, 'responses': responses}
+
+    def values_batch_clear(self, spreadsheet_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.simulate('write', 'values.batchClear')
+        with self.lock:
+            spreadsheet = self._spreadsheet(spreadsheet_id)
+            for range_a1 in body.get('ranges', []):
+                title, row0, col0, row1, col1 = parse_range(range_a1)
+                sheet = self._sheet(spreadsheet, title)
+                for row in sheet['rows'][row0:row1]:
+                    end = len(row) if col1 is None else min(col1, len(row))
+                    row[col0:end] = [''] * max(0, end - col0)
+            return {'spreadsheetId': spreadsheet_id, 'clearedRanges': body.get('ranges', [])}
+
+    def values_append(self, spreadsheet_id: str, range_a1: str, body: Dict[str, Any],
+                      insert_data_option: str) -> Dict[str, Any]:
+        self.simulate('write', 'values.append')
+        with self.lock:
+            title, row0, col0, _, _ = parse_range(range_a1)
+            sheet = self._sheet(self._spreadsheet(spreadsheet_id), title)
+            values = body.get('values', [])
+            width = max((len(row) for row in values), default=0)
+
+            # The table ends at the last row with a value in its columns
+            rows = sheet['rows']
+            table_end = row0
+            for index in range(len(rows) - 1, row0 - 1, -1):
+                if any(value != '' for value in rows[index][col0:col0 + max(width, 1)]):
+                    table_end = index + 1
+                    break
+
+            grid = sheet['properties']['gridProperties']
+            if insert_data_option == 'INSERT_ROWS':
+                rows[table_end:table_end] = [[] for _ in values]
+                grid['rowCount'] += len(values)
+            else:
+                grid['rowCount'] = max(grid['rowCount'], table_end + len(values))
+            grid['columnCount'] = max(grid['columnCount'], col0 + width)
+            self._write(sheet, table_end, col0, values)
+            return {'spreadsheetId': spreadsheet_id,
+                    'updates': {'updatedRange': self._updated_range(title, table_end, col0, values),
+                                'updatedRows': len(values),
+                                'updatedCells': sum(len(row) for row in values)}}
+
+
+def create_app(fake: FakeSheets) -> Flask:
+    """Build the Flask app that routes Sheets API paths to a FakeSheets"""
+    app = Flask(__name__)
+
+    def error_response(e: SheetsError):
+        response = jsonify({'error': {'code': e.status, 'message': e.message, 'status': e.reason}})
+        response.status_code = e.status
+        if e.status == 429:
+            response.headers['Retry-After'] = '1'
+        return response
+
+    # Method suffixes (":append", ":batchUpdate") share path segments with IDs
+    # and ranges, so one view parses the path itself
+    @app.route('/v4/spreadsheets/<path:rest>', methods=['GET', 'POST'])
+    def spreadsheets(rest: str):
+        body = request.get_json(silent=True) or {}
+        try:
+            if '/values/' in rest:
+                spreadsheet_id, _, range_a1 = rest.partition('/values/')
+                if request.method == 'POST' and range_a1.endswith(':append'):
+                    return jsonify(fake.values_append(spreadsheet_id, range_a1[:-len(':append')], body,
+                                                      request.args.get('insertDataOption', 'OVERWRITE')))
+                if request.method == 'GET':
+                    return jsonify(fake.values_get(spreadsheet_id, range_a1))
+            elif rest.endswith('/values:batchUpdate') and request.method == 'POST':
+                return jsonify(fake.values_batch_update(rest[:-len('/values:batchUpdate')], body))
+            elif rest.endswith('/values:batchClear') and request.method == 'POST':
+                return jsonify(fake.values_batch_clear(rest[:-len('/values:batchClear')], body))
+            elif rest.endswith(':batchUpdate') and request.method == 'POST':
+                return jsonify(fake.batch_update(rest[:-len(':batchUpdate')], body))
+            elif '/' not in rest and request.method == 'GET':
+                return jsonify(fake.get(rest))
+        except SheetsError as e:
+            return error_response(e)
+        return error_response(SheetsError(404, 'NOT_FOUND', f"Unsupported path in fake server: {rest}"))
+
+    @app.route('/_fake/stats')
+    def stats():
+        with fake.lock:
+            return jsonify(dict(fake.stats))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline Google Sheets stand-in server for Plaid Budgeting App')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8901, help='Port to listen on (default: 8901)')
+    parser.add_argument('--read-quota', type=int, default=60,
+                        help='Read requests allowed per minute before 429s (default: 60; 0 disables)')
+    parser.add_argument('--write-quota', type=int, default=60,
+                        help='Write requests allowed per minute before 429s (default: 60; 0 disables)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fixed latency added to every call')
+    parser.add_argument('--server-error-rate', type=float, default=0,
+                        help='Fraction of calls failing with INTERNAL (500)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for injected errors (default: 0)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    config = FakeSheetsConfig(
+        read_quota_per_minute=args.read_quota,
+        write_quota_per_minute=args.write_quota,
+        latency_ms=args.latency_ms,
+        server_error_rate=args.server_error_rate,
+        seed=args.seed,
+    )
+
+    logger.info(f"Fake Sheets serving on http://{args.host}:{args.port}")
+    logger.info(f"Point the exporter at it with SHEETS_API_HOST=http://{args.host}:{args.port}")
+    create_app(FakeSheets(config)).run(host=args.host, port=args.port, threaded=True)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,119 @@
+"""
+JSON response encoding for the data routes.
+
+jsonify sorts keys on every call and pretty-prints in debug mode; the data
+routes serialize compactly in a single json.dumps call instead and compress
+the body when the client accepts it (brotli if the optional brotli package
+is installed, otherwise gzip). Transaction listings can also be streamed as
+NDJSON, one transaction per line, encoded and compressed in chunks as rows
+come off the database cursor, so time-to-first-byte and memory stay flat
+however long the period is.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this go out uncompressed; compressing them saves little
+COMPRESS_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 5))
+
+# Transactions encoded (and flushed to the client) per chunk of an NDJSON stream
+NDJSON_CHUNK_ROWS = 200
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _encoder() -> Callable[[Any], str]:
+    """Compact json.dumps using the app's handling of dates, decimals and the like"""
+    default = current_app.json.default
+    return lambda value: json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=default)
+
+
+def _negotiate_encoding() -> Optional[str]:
+    """The content coding to use for this request ('br', 'gzip' or None)"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def wants_ndjson() -> bool:
+    """Whether the client asked for a streamed NDJSON listing (?format=ndjson or Accept)"""
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Serialize payload compactly, compressing it if the client accepts that"""
+    body = _encoder()(payload).encode('utf-8')
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+
+    encoding = _negotiate_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _stream_compressor(encoding: Optional[str]) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """
+    Incremental compressor for a streamed body
+
+    Returns:
+        (compress_chunk, finish); compress_chunk flushes, so each chunk can be
+        decoded as soon as it arrives
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return (lambda data: compressor.process(data) + compressor.flush()), compressor.finish
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return (lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+    return (lambda data: data), (lambda: b'')
+
+
+def ndjson_response(rows: Iterable[Dict[str, Any]]) -> Response:
+    """
+    Stream rows as newline-delimited JSON, compressed if the client accepts that
+
+    rows is consumed lazily while the response is sent and closed afterwards,
+    so a generator holding a database connection releases it even if the
+    client disconnects.
+    """
+    encode = _encoder()
+    encoding = _negotiate_encoding()
+    compress_chunk, finish = _stream_compressor(encoding)
+
+    def generate():
+        try:
+            lines = []
+            for row in rows:
+                lines.append(encode(row))
+                if len(lines) >= NDJSON_CHUNK_ROWS:
+                    yield compress_chunk(('\n'.join(lines) + '\n').encode('utf-8'))
+                    lines = []
+            if lines:
+                yield compress_chunk(('\n'.join(lines) + '\n').encode('utf-8'))
+            yield finish()
+        finally:
+            close = getattr(rows, 'close', None)
+            if close is not None:
+                close()
+
+    response = current_app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,37 @@
+"""
+Keyset pagination cursors.
+
+Transaction lists are ordered newest first by (date, datetime, id). A page
+ends with an opaque cursor holding the sort key of its last row; the next
+page starts strictly after that key, so every page is an index seek instead
+of an ever-growing OFFSET scan.
+"""
+
+import base64
+import json
+from typing import Any, Optional
+
+
+def encode_cursor(date: Any, datetime: Any, row_id: int) -> str:
+    """Encode a row's sort key as a URL-safe cursor token"""
+    key = [str(date), str(datetime) if datetime is not None else None, int(row_id)]
+    payload = json.dumps(key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> tuple[str, Optional[str], int]:
+    """
+    Decode a cursor token back into its (date, datetime, id) sort key
+
+    Raises:
+        ValueError: If the token was not produced by encode_cursor
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, datetime, row_id = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(date, str) or not (datetime is None or isinstance(datetime, str)) \
+            or not isinstance(row_id, int):
+        raise ValueError("Invalid pagination cursor")
+    return date, datetime, row_id
@@ -0,0 +1,169 @@
+"""
+Password hashing off the request threads.
+
+Key derivation is deliberately slow, so a burst of logins hashed on the web
+server's threads would pin every one of them on CPU. PasswordHasher runs the
+KDF on a small dedicated process pool instead; callers wait for a free slot
+in a bounded queue and get PasswordHasherBusy if none frees up in time, so a
+login storm is shed rather than stalling every other page.
+
+Hashes are stored self-describing ("scrypt$<n>$<r>$<p>$<hex>" or
+"pbkdf2_sha256$<iterations>$<hex>"); bare hex digests from before the KDF
+was configurable are PBKDF2-SHA256 with 100,000 iterations. verify() reports
+when a hash doesn't match the configured KDF so it can be upgraded after the
+next successful login.
+"""
+
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+# Parameters of the unprefixed hashes written before the KDF was configurable
+LEGACY_PBKDF2_ITERATIONS = 100000
+
+SUPPORTED_KDFS = ('scrypt', 'pbkdf2_sha256')
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue stays full for longer than the timeout"""
+
+
+def _derive(kdf: str, params: tuple[int, ...], password: str, salt: str) -> str:
+    """Run the KDF and return the hex digest (executed in a pool worker)"""
+    if kdf == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'), n=n, r=r, p=p,
+                              maxmem=128 * r * (n + p + 2) + 2 ** 20).hex()
+    if kdf == 'pbkdf2_sha256':
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'),
+                                   iterations).hex()
+    raise ValueError(f"Unsupported password KDF: {kdf}")
+
+
+def _parse(encoded: str) -> tuple[str, tuple[int, ...], str]:
+    """Split a stored hash into (kdf, params, hex digest)"""
+    if '$' not in encoded:
+        return 'pbkdf2_sha256', (LEGACY_PBKDF2_ITERATIONS,), encoded
+    kdf, *params, digest = encoded.split('$')
+    return kdf, tuple(int(value) for value in params), digest
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a dedicated process pool"""
+
+    def __init__(self, kdf: Optional[str] = None, workers: Optional[int] = None,
+                 queue_size: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            kdf: KDF for new hashes, 'scrypt' or 'pbkdf2_sha256' (default: PASSWORD_KDF or scrypt);
+                 parameters come from PASSWORD_SCRYPT_N/R/P (16384/8/1) and
+                 PASSWORD_PBKDF2_ITERATIONS (600000)
+            workers: Hashing processes (default: PASSWORD_HASH_WORKERS or min(2, CPUs));
+                     0 hashes on the calling thread
+            queue_size: Hashes allowed to wait for a worker (default: PASSWORD_HASH_QUEUE or 32)
+            timeout: Seconds to wait for a queue slot before raising PasswordHasherBusy
+                     (default: PASSWORD_HASH_TIMEOUT or 10)
+        """
+        self.kdf = kdf or os.getenv('PASSWORD_KDF', 'scrypt')
+        if self.kdf not in SUPPORTED_KDFS:
+            raise ValueError(f"Unsupported password KDF: {self.kdf}")
+        if self.kdf == 'scrypt':
+            self.params = (int(os.getenv('PASSWORD_SCRYPT_N', 16384)),
+                           int(os.getenv('PASSWORD_SCRYPT_R', 8)),
+                           int(os.getenv('PASSWORD_SCRYPT_P', 1)))
+        else:
+            self.params = (int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000)),)
+
+        if workers is None:
+            workers = int(os.getenv('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+        if queue_size is None:
+            queue_size = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+        if timeout is None:
+            timeout = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+        self.workers = max(0, workers)
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.workers + max(0, queue_size))
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.executor_pid = None
+        self.lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None or self.executor_pid != os.getpid():
+                # Spawned (not forked) workers: the web server's threads and locks stay behind
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def _run(self, kdf: str, params: tuple[int, ...], password: str, salt: str) -> str:
+        """Derive a digest on the pool, waiting for a queue slot first"""
+        if self.workers == 0:
+            return _derive(kdf, params, password, salt)
+
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("Too many password checks in progress; try again shortly")
+        try:
+            executor = self._get_executor()
+            try:
+                return executor.submit(_derive, kdf, params, password, salt).result()
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next caller
+                with self.lock:
+                    if self.executor is executor:
+                        self.executor = None
+                raise
+        finally:
+            self.slots.release()
+
+    def hash(self, password: str, salt: Optional[str] = None) -> tuple[str, str]:
+        """
+        Hash a password with the configured KDF
+
+        Returns:
+            (encoded hash, salt)
+        """
+        if salt is None:
+            salt = secrets.token_hex(32)
+        digest = self._run(self.kdf, self.params, password, salt)
+        return '$'.join([self.kdf, *map(str, self.params), digest]), salt
+
+    def verify(self, password: str, encoded: str, salt: str) -> tuple[bool, bool]:
+        """
+        Check a password against a stored hash
+
+        Returns:
+            (matches, needs_rehash); needs_rehash is True when the stored hash
+            was made with a different KDF or parameters than configured
+        """
+        kdf, params, expected = _parse(encoded)
+        digest = self._run(kdf, params, password, salt)
+        matches = hmac.compare_digest(digest, expected)
+        return matches, matches and (kdf, params) != (self.kdf, self.params)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self.lock:
+            if self.executor is not None and self.executor_pid == os.getpid():
+                self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """The process-wide PasswordHasher shared by every DatabaseManager"""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
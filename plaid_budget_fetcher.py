@@ -9,7 +9,8 @@ including account balances, transactions, and categorized spending data.
 import os
 import json
 import datetime
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Any
 from dataclasses import dataclass
 from dotenv import load_dotenv
 import plaid
@@ -22,11 +23,37 @@ from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUse
 from plaid.model.country_code import CountryCode
 from plaid.model.item_get_request import ItemGetRequest
 from plaid.model.institutions_get_by_id_request import InstitutionsGetByIdRequest
+from plaid.model.institutions_get_by_id_request_options import InstitutionsGetByIdRequestOptions
 from plaid.model.transactions_get_request import TransactionsGetRequest
+from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
 
 from flask import Flask, request, jsonify
 import pandas as pd
 from database import DatabaseManager
+from cache_utils import TTLCache
+from plaid_rate_limiter import PlaidRateLimiter, RateLimitedPlaidApi
+from single_flight import SingleFlight
+
+# Days of history covered by /transactions/sync; older periods are backfilled
+# with a ranged /transactions/get instead
+TRANSACTIONS_SYNC_HISTORY_DAYS = int(os.getenv('PLAID_SYNC_HISTORY_DAYS', 90))
+
+# How long cached account types may be trusted before a backfill falls back
+# to the accounts carried by the /transactions/get response
+ACCOUNT_CACHE_MAX_AGE = datetime.timedelta(hours=int(os.getenv('PLAID_ACCOUNT_CACHE_MAX_AGE_HOURS', 24)))
+
+# Institution metadata rarely changes; share it across the process and the database
+INSTITUTION_CACHE_TTL = datetime.timedelta(hours=int(os.getenv('PLAID_INSTITUTION_CACHE_TTL_HOURS', 168)))
+institution_cache = TTLCache(maxsize=int(os.getenv('PLAID_INSTITUTION_CACHE_SIZE', 1024)),
+                             ttl=INSTITUTION_CACHE_TTL.total_seconds())
+
+# Maximum page size accepted by /transactions/get and /transactions/sync
+TRANSACTIONS_PAGE_SIZE = 500
+
+# Times a sync is restarted from its original cursor when Plaid reports that
+# the item changed while we were paginating
+TRANSACTIONS_SYNC_MAX_RESTARTS = 3
 
 
 @dataclass
@@ -43,7 +70,9 @@ class BudgetData:
 class PlaidService:
     """Service class to manage Plaid authentication and operations"""
     
-    def __init__(self, client_id: str, secret: str, environment: str = 'sandbox'):
+    def __init__(self, client_id: str, secret: str, environment: str = 'sandbox',
+                 max_concurrency: Optional[int] = None, host: Optional[str] = None,
+                 db: Optional[DatabaseManager] = None):
         """
         Initialize the Plaid service
         
@@ -51,19 +80,35 @@ class PlaidService:
             client_id: Plaid client ID
             secret: Plaid secret key
             environment: Plaid environment (sandbox, development, production)
+            max_concurrency: Maximum number of institutions fetched in parallel
+                             (default: PLAID_MAX_CONCURRENCY or 4)
+            host: Optional API base URL overriding the environment's host
+                  (default: PLAID_HOST, e.g. a local fake_plaid_server.py)
+            db: DatabaseManager to share with the caller (default: a new one)
         """
         self.client_id = client_id
         self.secret = secret
         self.environment = environment
-        self.db = DatabaseManager()
+        self.db = db if db is not None else DatabaseManager()
+        
+        # Shared worker pool for per-institution fan-out; its size is the
+        # per-process cap on concurrent Plaid requests
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('PLAID_MAX_CONCURRENCY', 4))
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix='plaid-fetch')
         
         # Configure Plaid client
-        if self.environment == 'sandbox':
-            host = plaid.Environment.Sandbox
-        elif self.environment == 'production':
-            host = plaid.Environment.Production
-        else:
-            raise ValueError(f"Invalid environment: {self.environment}")
+        if host is None:
+            host = os.getenv('PLAID_HOST')
+        if not host:
+            if self.environment == 'sandbox':
+                host = plaid.Environment.Sandbox
+            elif self.environment == 'production':
+                host = plaid.Environment.Production
+            else:
+                raise ValueError(f"Invalid environment: {self.environment}")
         self.configuration = plaid.Configuration(
             host=host,
             api_key={
@@ -74,7 +119,15 @@ class PlaidService:
         )
         
         api_client = plaid.ApiClient(self.configuration)
-        self.client = plaid_api.PlaidApi(api_client)
+        
+        # All Plaid calls share per-client and per-item rate limits and retry
+        # RATE_LIMIT_EXCEEDED / PRODUCT_NOT_READY with backoff
+        self.rate_limiter = PlaidRateLimiter()
+        self.client = RateLimitedPlaidApi(plaid_api.PlaidApi(api_client), self.rate_limiter)
+        
+        # Concurrent refreshes of the same item (double clicks, open tabs,
+        # webhooks racing the scheduler) share one in-flight Plaid call
+        self.single_flight = SingleFlight(self.db)
     
     def exchange_public_token(self, public_token: str, user_id: int) -> Dict:
         """
@@ -105,14 +158,9 @@ class PlaidService:
                 item_response = self.client.item_get(item_request)
                 institution_id = item_response['item']['institution_id']
                 
-                # Get institution details
+                # Get institution details (usually from cache)
                 if institution_id:
-                    inst_request = InstitutionsGetByIdRequest(
-                        institution_id=institution_id,
-                        country_codes=[CountryCode('US')]
-                    )
-                    inst_response = self.client.institutions_get_by_id(inst_request)
-                    institution_name = inst_response['institution']['name']
+                    institution_name = self.get_institution(institution_id)['name']
                     
             except Exception as e:
                 print(f"Warning: Could not fetch institution information: {e}")
@@ -172,6 +220,48 @@ class PlaidService:
         except plaid.ApiException as e:
             raise Exception(f"Token exchange failed: {e.body}")
     
+    def get_institution(self, institution_id: str) -> Dict[str, Any]:
+        """
+        Get institution metadata (name, logo, primary color, url)
+        
+        Looks in the process-wide cache, then the institutions table, and only
+        calls /institutions/get_by_id when both are missing or older than
+        INSTITUTION_CACHE_TTL.
+        
+        Args:
+            institution_id: Plaid institution ID
+            
+        Returns:
+            Dictionary with institution_id, name, logo, primary_color and url
+        """
+        institution = institution_cache.get(institution_id)
+        if institution is not None:
+            return institution
+        
+        institution = self.db.get_institution(institution_id)
+        if institution and self._is_fresh(institution.get('updated_at'), INSTITUTION_CACHE_TTL):
+            institution_cache.set(institution_id, institution)
+            return institution
+        
+        inst_request = InstitutionsGetByIdRequest(
+            institution_id=institution_id,
+            country_codes=[CountryCode('US')],
+            options=InstitutionsGetByIdRequestOptions(include_optional_metadata=True)
+        )
+        inst_response = self.client.institutions_get_by_id(inst_request)
+        plaid_institution = inst_response['institution']
+        institution = {
+            'institution_id': institution_id,
+            'name': plaid_institution['name'],
+            'logo': plaid_institution.get('logo'),
+            'primary_color': plaid_institution.get('primary_color'),
+            'url': plaid_institution.get('url')
+        }
+        
+        self.db.store_institution(institution)
+        institution_cache.set(institution_id, institution)
+        return institution
+    
     def _classify_account(self, account: Dict[str, Any]) -> str:
         """
         Classify an account as asset or liability based on its type and subtype
@@ -199,37 +289,196 @@ class PlaidService:
             else:
                 return 'asset'  # Default to asset
     
-    def _fetch_transactions_for_token(self, access_token: str, accounts: List[Dict], 
-                                     start_date: datetime.date, end_date: datetime.date) -> List[Dict]:
+    def _decorate_accounts(self, accounts: List[Dict], institution_name: Optional[str],
+                           token_id: Optional[int] = None) -> List[Dict]:
         """
-        Fetch transactions for a specific access token and accounts
+        Add institution info, classification and display formatting to Plaid accounts
+        
+        Args:
+            accounts: List of raw accounts from Plaid API
+            institution_name: Name of the institution
+            token_id: Optional token ID the accounts belong to
+            
+        Returns:
+            The same list of accounts, decorated in place
+        """
+        for account in accounts:
+            account['institution_name'] = institution_name
+            if token_id is not None:
+                account['token_id'] = token_id
+            account['account_classification'] = self._classify_account(account)
+            
+            # Format balance for display
+            if 'balances' in account and 'current' in account['balances']:
+                current_balance = account['balances']['current']
+                if current_balance is not None:
+                    account['formatted_balance'] = f"${current_balance:,.2f}"
+                else:
+                    account['formatted_balance'] = "N/A"
+            else:
+                account['formatted_balance'] = "N/A"
+        
+        return accounts
+    
+    @staticmethod
+    def _is_fresh(updated_at: Any, max_age: datetime.timedelta) -> bool:
+        """
+        Check whether a cached row's updated_at timestamp is within max_age
+        
+        Accepts both SQLite's 'YYYY-MM-DD HH:MM:SS' UTC strings and the
+        datetime objects returned by PostgreSQL.
+        """
+        if not updated_at:
+            return False
+        if isinstance(updated_at, str):
+            try:
+                updated_at = datetime.datetime.fromisoformat(updated_at)
+            except ValueError:
+                return False
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=datetime.timezone.utc)
+        return datetime.datetime.now(datetime.timezone.utc) - updated_at <= max_age
+    
+    def _iter_transaction_pages(self, access_token: str, start_date: datetime.date, end_date: datetime.date,
+                                accounts: Optional[List[Dict]] = None,
+                                account_types: Optional[list[str]] = None) -> Iterator[tuple[List[Dict], List[Dict]]]:
+        """
+        Page through /transactions/get for a specific access token
+        
+        Requests TRANSACTIONS_PAGE_SIZE transactions at a time until the
+        reported total is reached, yielding each page as soon as it arrives so
+        callers can store it and let it go before the next page is fetched.
+        
+        When accounts is None the relevant accounts are resolved from the
+        accounts carried by the first response (filtered by account_types),
+        so no separate /accounts/get round-trip is needed. The yielded
+        accounts are then every account on the item, for refreshing the cache.
         
         Args:
             access_token: Plaid access token
-            accounts: List of accounts to fetch transactions for
             start_date: Start date for transaction fetch
             end_date: End date for transaction fetch
+            accounts: Known accounts to fetch transactions for, if any
+            account_types: Account types to keep when resolving from the response
+            
+        Yields:
+            Tuples of (accounts, transactions filtered to relevant accounts)
+        """
+        relevant_account_ids = [acc['account_id'] for acc in accounts] if accounts is not None else None
+        relevant_account_set = set(relevant_account_ids or [])
+        offset = 0
+        
+        while True:
+            options = TransactionsGetRequestOptions(count=TRANSACTIONS_PAGE_SIZE, offset=offset)
+            if relevant_account_ids is not None:
+                options.account_ids = relevant_account_ids
+            transactions_request = TransactionsGetRequest(
+                access_token=access_token,
+                start_date=start_date,
+                end_date=end_date,
+                options=options
+            )
+            transactions_response = self.client.transactions_get(transactions_request)
+            page = transactions_response['transactions']
+            total_transactions = transactions_response['total_transactions']
+            
+            if accounts is None:
+                accounts = [acc.to_dict() for acc in transactions_response['accounts']]
+                relevant_account_set = {
+                    acc['account_id'] for acc in accounts
+                    if not account_types or acc.get('type') in account_types
+                }
+                if not relevant_account_set:
+                    # Nothing to page through, but still hand back the accounts
+                    yield accounts, []
+                    return
+            
+            # Convert only the rows we keep instead of the whole response
+            yield accounts, [
+                t.to_dict() for t in page
+                if t['account_id'] in relevant_account_set
+            ]
+            
+            offset += len(page)
+            if not page or offset >= total_transactions:
+                break
+    
+    def sync_transactions(self, user_id: int, token_data: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Incrementally sync transactions for one item using /transactions/sync
+        
+        Pages through every change since the stored cursor, applies the
+        added/modified/removed deltas to the transactions table and then saves
+        the new cursor, so each refresh only transfers what changed. Concurrent
+        syncs of the same item are collapsed into one.
+        
+        Args:
+            user_id: The user ID
+            token_data: Token row from the database (must include transactions_cursor)
             
         Returns:
-            List of transactions filtered to relevant accounts
+            Dictionary with counts of added, modified and removed transactions
         """
-        transactions_request = TransactionsGetRequest(
-            access_token=access_token,
-            start_date=start_date,
-            end_date=end_date
-        )
+        def sync():
+            # Another caller may have advanced the cursor while we waited
+            cursor = self.db.get_transactions_cursor(user_id, token_data['id'])
+            if cursor is not None:
+                token_data['transactions_cursor'] = cursor
+            return self._sync_transactions(user_id, token_data)
         
-        transactions_response = self.client.transactions_get(transactions_request)
-        transactions = transactions_response.to_dict()['transactions']
+        return self.single_flight.do(f"sync:{user_id}:{token_data['id']}", sync)
+    
+    def _sync_transactions(self, user_id: int, token_data: Dict[str, Any]) -> Dict[str, int]:
+        """Run one /transactions/sync pass for an item (see sync_transactions)"""
+        access_token = token_data['access_token']
+        institution_name = token_data.get('institution_name', 'Unknown Institution')
+        original_cursor = token_data.get('transactions_cursor')
         
-        # Filter transactions to only include those from relevant accounts
-        relevant_account_ids = {acc['account_id'] for acc in accounts}
-        filtered_transactions = [
-            t for t in transactions 
-            if t.get('account_id') in relevant_account_ids
-        ]
+        restarts = 0
+        while True:
+            cursor = original_cursor
+            added, modified, removed = [], [], []
+            try:
+                has_more = True
+                while has_more:
+                    if cursor:
+                        sync_request = TransactionsSyncRequest(access_token=access_token, cursor=cursor,
+                                                               count=TRANSACTIONS_PAGE_SIZE)
+                    else:
+                        sync_request = TransactionsSyncRequest(access_token=access_token, count=TRANSACTIONS_PAGE_SIZE)
+                    response = self.client.transactions_sync(sync_request).to_dict()
+                    
+                    added.extend(response['added'])
+                    modified.extend(response['modified'])
+                    removed.extend(t['transaction_id'] for t in response['removed'])
+                    has_more = response['has_more']
+                    cursor = response['next_cursor']
+                break
+            except plaid.ApiException as e:
+                # Plaid asks clients to restart the whole pagination loop if the
+                # item is updated mid-sync; anything else is a real failure
+                if ('TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION' in str(e.body)
+                        and restarts < TRANSACTIONS_SYNC_MAX_RESTARTS):
+                    restarts += 1
+                    continue
+                raise
+        
+        # Apply deltas before persisting the cursor so a failure re-syncs them
+        changed = self._format_transactions(added + modified, institution_name)
+        if changed and not self.db.store_transactions(user_id, changed):
+            raise Exception(f"Failed to store synced transactions from {institution_name}")
+        if removed and not self.db.delete_transactions(user_id, removed):
+            raise Exception(f"Failed to delete removed transactions from {institution_name}")
         
-        return filtered_transactions
+        if cursor != original_cursor:
+            self.db.update_transactions_cursor(user_id, token_data['id'], cursor)
+            token_data['transactions_cursor'] = cursor
+        
+        return {
+            'added': len(added),
+            'modified': len(modified),
+            'removed': len(removed)
+        }
     
     def _format_transactions(self, transactions: List[Dict], institution_name: str) -> List[Dict]:
         """
@@ -310,7 +559,78 @@ class PlaidService:
             
         except Exception as e:
             raise Exception(f"Failed to get cached accounts: {str(e)}")
+
+    def _refresh_accounts_for_token(self, user_id: int, token_data: Dict[str, Any], custom_names: Dict[str, str],
+                                    force_refresh: bool) -> tuple[List[Dict], Optional[Dict], List[str]]:
+        """
+        Fetch, store and (optionally) refresh transactions for a single institution
+
+        Runs on the service executor so that institutions are fetched concurrently;
+        concurrent refreshes of the same item share a single fetch.
+
+        Args:
+            user_id: The user ID
+            token_data: Token row from the database
+            custom_names: Mapping of account_id to user-defined custom name
+            force_refresh: If True, also sync transaction changes for the item
+
+        Returns:
+            Tuple of (accounts, institution info or None, error messages)
+        """
+        key = f"accounts:{user_id}:{token_data['id']}:{int(force_refresh)}"
+        return self.single_flight.do(
+            key, lambda: self._fetch_accounts_for_token(user_id, token_data, custom_names, force_refresh)
+        )
     
+    def _fetch_accounts_for_token(self, user_id: int, token_data: Dict[str, Any], custom_names: Dict[str, str],
+                                  force_refresh: bool) -> tuple[List[Dict], Optional[Dict], List[str]]:
+        """Fetch and store one institution's accounts (see _refresh_accounts_for_token)"""
+        access_token = token_data['access_token']
+        institution_name = token_data.get('institution_name', 'Unknown Institution')
+        token_id = token_data['id']
+        errors = []
+
+        try:
+            request = AccountsGetRequest(access_token=access_token)
+            response = self.client.accounts_get(request)
+            accounts = response.to_dict()['accounts']
+        except plaid.ApiException as e:
+            return [], None, [f"Failed to get accounts from {institution_name}: {e.body}"]
+
+        # Add institution info to each account and merge custom names
+        self._decorate_accounts(accounts, institution_name, token_id)
+        for account in accounts:
+            account_id = account['account_id']
+            if account_id in custom_names:
+                account['custom_name'] = custom_names[account_id]
+                account['display_name'] = custom_names[account_id]
+            else:
+                account['custom_name'] = None
+                account['display_name'] = account['name']
+
+        institution = {
+            'name': institution_name,
+            'id': token_data.get('institution_id'),
+            'item_id': token_data.get('item_id'),
+            'token_id': token_id,
+            'account_count': len(accounts)
+        }
+
+        # Store/update accounts in database
+        self.db.store_accounts(user_id, token_id, accounts)
+
+        # If forcing refresh, also pull transaction changes for this institution
+        if force_refresh:
+            try:
+                self.sync_transactions(user_id, token_data)
+            except plaid.ApiException as trans_e:
+                errors.append(f"Failed to refresh transactions from {institution_name}: {trans_e.body}")
+                # Continue with accounts even if transaction refresh fails
+            except Exception as trans_e:
+                errors.append(f"Failed to refresh transactions from {institution_name}: {str(trans_e)}")
+
+        return accounts, institution, errors
+
     def get_accounts(self, user_id: int, force_refresh: bool = False) -> Dict:
         """
         Get user accounts from all connected institutions
@@ -337,89 +657,25 @@ class PlaidService:
         if not tokens_data:
             raise Exception("No access tokens found for user. Please exchange public token first.")
         
+        # Get cached accounts once to preserve custom names across institutions
+        cached_accounts = self.db.get_cached_accounts(user_id)
+        custom_names = {acc['account_id']: acc['custom_name'] for acc in cached_accounts if acc['custom_name']}
+        
         all_accounts = []
         institutions = []
         errors = []
         
-        for token_data in tokens_data:
-            access_token = token_data['access_token']
-            institution_name = token_data.get('institution_name', 'Unknown Institution')
-            token_id = token_data['id']
-            
-            try:
-                request = AccountsGetRequest(access_token=access_token)
-                response = self.client.accounts_get(request)
-                accounts = response.to_dict()['accounts']
-                
-                # Add institution info to each account and merge custom names
-                for account in accounts:
-                    account['institution_name'] = institution_name
-                    account['token_id'] = token_id
-                    account['account_classification'] = self._classify_account(account)
-                    
-                    # Format balance for display
-                    if 'balances' in account and 'current' in account['balances']:
-                        current_balance = account['balances']['current']
-                        if current_balance is not None:
-                            account['formatted_balance'] = f"${current_balance:,.2f}"
-                        else:
-                            account['formatted_balance'] = "N/A"
-                    else:
-                        account['formatted_balance'] = "N/A"
-                
-                # Get cached accounts to preserve custom names
-                cached_accounts = self.db.get_cached_accounts(user_id)
-                custom_names = {acc['account_id']: acc['custom_name'] for acc in cached_accounts if acc['custom_name']}
-                
-                # Merge custom names with fresh account data
-                for account in accounts:
-                    account_id = account['account_id']
-                    if account_id in custom_names:
-                        account['custom_name'] = custom_names[account_id]
-                        account['display_name'] = custom_names[account_id]
-                    else:
-                        account['custom_name'] = None
-                        account['display_name'] = account['name']
-                
-                all_accounts.extend(accounts)
-                institutions.append({
-                    'name': institution_name,
-                    'id': token_data.get('institution_id'),
-                    'item_id': token_data.get('item_id'),
-                    'token_id': token_id,
-                    'account_count': len(accounts)
-                })
-                
-                # Store/update accounts in database
-                self.db.store_accounts(user_id, token_id, accounts)
-                
-                # If forcing refresh, also refresh transaction data for this institution
-                if force_refresh:
-                    try:
-                        # Calculate date range for transactions (last 30 days)
-                        end_date = datetime.datetime.now().date()
-                        start_date = end_date - datetime.timedelta(days=30)
-                        
-                        # Fetch transactions using helper function
-                        filtered_transactions = self._fetch_transactions_for_token(
-                            access_token, accounts, start_date, end_date
-                        )
-                        
-                        # Format transactions using helper function
-                        formatted_transactions = self._format_transactions(filtered_transactions, institution_name)
-                        
-                        # Store transactions in database
-                        self.db.store_transactions(user_id, formatted_transactions)
-                        
-                    except plaid.ApiException as trans_e:
-                        error_msg = f"Failed to refresh transactions from {institution_name}: {trans_e.body}"
-                        errors.append(error_msg)
-                        # Continue with accounts even if transaction refresh fails
-                
-            except plaid.ApiException as e:
-                error_msg = f"Failed to get accounts from {institution_name}: {e.body}"
-                errors.append(error_msg)
-                continue
+        # Fan out across institutions; results are merged in token order
+        futures = [
+            self.executor.submit(self._refresh_accounts_for_token, user_id, token_data, custom_names, force_refresh)
+            for token_data in tokens_data
+        ]
+        for future in futures:
+            accounts, institution, token_errors = future.result()
+            all_accounts.extend(accounts)
+            if institution:
+                institutions.append(institution)
+            errors.extend(token_errors)
         
         # No need to format balances again since it's done above
         
@@ -432,8 +688,28 @@ class PlaidService:
             'is_cached': False
         }
     
-    def get_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None, 
-                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: int = 100, offset: int = 0) -> Dict:
+    def refresh_item(self, user_id: int, token_data: Dict[str, Any]) -> List[str]:
+        """
+        Refresh accounts and sync transactions for a single item
+
+        Used by background workers, which schedule work per item rather than
+        per user.
+
+        Args:
+            user_id: The user ID
+            token_data: Token row from the database
+
+        Returns:
+            List of error messages (empty on success)
+        """
+        cached_accounts = self.db.get_cached_accounts(user_id)
+        custom_names = {acc['account_id']: acc['custom_name'] for acc in cached_accounts if acc['custom_name']}
+        _, _, errors = self._refresh_accounts_for_token(user_id, token_data, custom_names, force_refresh=True)
+        return errors
+
+    def get_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None,
+                              account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, limit: Optional[int] = 100,
+                              cursor: Optional[str] = None) -> Dict:
         """
         Get cached transaction information from database
         
@@ -443,11 +719,15 @@ class PlaidService:
             account_id: Optional specific account ID to filter by
             year: Year to filter by (default: current year)
             month: Optional month to filter by (1-12)
-            limit: Maximum number of transactions to return
-            offset: Number of transactions to skip
+            limit: Maximum number of transactions to return (None for the whole period)
+            cursor: next_cursor from the previous page, to continue after it
             
         Returns:
-            Dictionary containing cached transaction information
+            Dictionary containing cached transaction information, with next_cursor
+            set when more transactions follow
+            
+        Raises:
+            ValueError: If cursor is not a valid pagination cursor
         """
         try:
             # Default to current year if not specified
@@ -455,7 +735,8 @@ class PlaidService:
                 year = datetime.datetime.now().year
             
             # Get cached transactions from database
-            cached_transactions = self.db.get_cached_transactions(user_id, account_types, account_id, year, month, limit, offset)
+            page = self.db.get_cached_transactions(user_id, account_types, account_id, year, month, limit, cursor)
+            cached_transactions = page['transactions']
             
             # Get transaction summary
             transaction_summary = self.db.get_transaction_summary(user_id, account_types, account_id, year, month)
@@ -464,15 +745,118 @@ class PlaidService:
                 'transactions': cached_transactions,
                 'summary': transaction_summary,
                 'total_transactions': len(cached_transactions),
+                'next_cursor': page['next_cursor'],
                 'is_cached': True,
                 'account_types_filter': account_types
             }
             
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to get cached transactions: {str(e)}")
+
+    def iter_cached_transactions(self, user_id: int, account_types: Optional[list[str]] = None,
+                                 account_id: Optional[str] = None, year: Optional[int] = None,
+                                 month: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream every cached transaction for a period, newest first
+
+        Args:
+            user_id: The user ID
+            account_types: Optional list of account types to filter by
+            account_id: Optional specific account ID to filter by
+            year: Year to filter by (default: current year)
+            month: Optional month to filter by (1-12)
+
+        Returns:
+            Iterator of formatted transactions, read from the database as it is consumed
+        """
+        if year is None:
+            year = datetime.datetime.now().year
+        return self.db.iter_cached_transactions(user_id, account_types, account_id, year, month)
+
+    def _refresh_transactions_for_token(self, user_id: int, token_data: Dict[str, Any],
+                                        account_types: Optional[list[str]],
+                                        start_date: datetime.date, end_date: datetime.date,
+                                        cached_accounts: List[Dict]) -> List[str]:
+        """
+        Bring the cached transactions for a single institution up to date
+
+        Periods inside the /transactions/sync history window are refreshed
+        incrementally from the item's cursor; older periods are backfilled with
+        a ranged /transactions/get. Runs on the service executor so that
+        institutions are refreshed concurrently; concurrent requests for the
+        same item and range share a single refresh.
+
+        Args:
+            user_id: The user ID
+            token_data: Token row from the database
+            account_types: Optional list of account types to keep (backfill only)
+            start_date: Start date of the requested period
+            end_date: End date of the requested period
+            cached_accounts: Cached accounts belonging to this token
+
+        Returns:
+            List of error messages
+        """
+        types_key = ','.join(sorted(account_types)) if account_types else '*'
+        key = f"transactions:{user_id}:{token_data['id']}:{start_date}:{end_date}:{types_key}"
+        # If another process just refreshed this range, its rows are already stored
+        return self.single_flight.do(
+            key,
+            lambda: self._fetch_transactions_for_token(user_id, token_data, account_types,
+                                                       start_date, end_date, cached_accounts),
+            shared_result=list
+        )
     
+    def _fetch_transactions_for_token(self, user_id: int, token_data: Dict[str, Any],
+                                      account_types: Optional[list[str]],
+                                      start_date: datetime.date, end_date: datetime.date,
+                                      cached_accounts: List[Dict]) -> List[str]:
+        """Sync or backfill one institution's transactions (see _refresh_transactions_for_token)"""
+        access_token = token_data['access_token']
+        institution_name = token_data.get('institution_name', 'Unknown Institution')
+        sync_horizon = datetime.date.today() - datetime.timedelta(days=TRANSACTIONS_SYNC_HISTORY_DAYS)
+
+        try:
+            if start_date >= sync_horizon:
+                self.sync_transactions(user_id, token_data)
+                return []
+
+            # Resolve account types from the local cache when it is fresh enough;
+            # otherwise let the first transactions page supply the accounts
+            accounts = None
+            if cached_accounts and all(self._is_fresh(acc.get('updated_at'), ACCOUNT_CACHE_MAX_AGE)
+                                       for acc in cached_accounts):
+                accounts = cached_accounts
+                if account_types:
+                    accounts = [acc for acc in accounts if acc.get('type') in account_types]
+                if not accounts:
+                    return []
+
+            # Format and store each page as it arrives to keep memory flat
+            first_page = True
+            for page_accounts, page in self._iter_transaction_pages(access_token, start_date, end_date,
+                                                                    accounts, account_types):
+                if first_page and accounts is None:
+                    # Refresh the stale cache with the accounts Plaid just sent
+                    self.db.store_accounts(user_id, token_data['id'],
+                                           self._decorate_accounts(page_accounts, institution_name, token_data['id']))
+                first_page = False
+                formatted_transactions = self._format_transactions(page, institution_name)
+                if not self.db.store_transactions(user_id, formatted_transactions):
+                    raise Exception("Failed to store transactions in database")
+
+            return []
+
+        except plaid.ApiException as e:
+            return [f"Failed to get transactions from {institution_name}: {e.body}"]
+        except Exception as e:
+            return [f"Failed to get transactions from {institution_name}: {str(e)}"]
+
     def get_transactions(self, user_id: int, account_types: Optional[list[str]] = None,
-                        account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, force_refresh: bool = False) -> Dict:
+                        account_id: Optional[str] = None, year: Optional[int] = None, month: Optional[int] = None, force_refresh: bool = False,
+                        limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
         """
         Get user transactions from specified account types
         
@@ -482,18 +866,32 @@ class PlaidService:
             year: Year to fetch transactions for (default: current year)
             month: Optional month to filter by (1-12)
             force_refresh: If True, fetch fresh data from Plaid API
+            limit: Page size; None returns the whole period after a refresh
+                   (cached results default to the first 100)
+            cursor: next_cursor from the previous page; later pages are always
+                    served from the cache
             
         Returns:
-            Dictionary containing transaction information
+            Dictionary containing transaction information, with next_cursor
+            set when more transactions follow
+            
+        Raises:
+            ValueError: If cursor is not a valid pagination cursor
         """
         # Default to current year if not specified
         if year is None:
             year = datetime.datetime.now().year
         
+        # Continuing a listing reads the cache the first page was served from
+        if cursor:
+            return self.get_cached_transactions(user_id, account_types, account_id, year, month,
+                                                limit if limit is not None else 100, cursor)
+        
         # If not forcing refresh, try to get cached data first
         if not force_refresh:
             try:
-                cached_result = self.get_cached_transactions(user_id, account_types, account_id, year, month)
+                cached_result = self.get_cached_transactions(user_id, account_types, account_id, year, month,
+                                                             limit if limit is not None else 100)
                 if cached_result['transactions']:
                     return cached_result
             except Exception:
@@ -505,7 +903,6 @@ class PlaidService:
         if not tokens_data:
             raise Exception("No access tokens found for user. Please connect a bank account first.")
         
-        all_transactions = []
         errors = []
         
         # Calculate date range based on year and month
@@ -521,51 +918,33 @@ class PlaidService:
             start_date = datetime.date(year, 1, 1)
             end_date = datetime.date(year, 12, 31)
         
-        for token_data in tokens_data:
-            access_token = token_data['access_token']
-            institution_name = token_data.get('institution_name', 'Unknown Institution')
-            
-            try:
-                # Get accounts for this token first
-                accounts_request = AccountsGetRequest(access_token=access_token)
-                accounts_response = self.client.accounts_get(accounts_request)
-                accounts = accounts_response.to_dict()['accounts']
-                
-                # Filter accounts by type if specified
-                if account_types:
-                    accounts = [acc for acc in accounts if acc.get('type') in account_types]
-                
-                if not accounts:
-                    continue
-                
-                # Fetch transactions using helper function
-                filtered_transactions = self._fetch_transactions_for_token(
-                    access_token, accounts, start_date, end_date
-                )
-                
-                # Format transactions using helper function
-                formatted_transactions = self._format_transactions(filtered_transactions, institution_name)
-                
-                all_transactions.extend(formatted_transactions)
-                
-                # Store transactions in database
-                self.db.store_transactions(user_id, formatted_transactions)
-                
-            except plaid.ApiException as e:
-                error_msg = f"Failed to get transactions from {institution_name}: {e.body}"
-                errors.append(error_msg)
-                continue
+        # Load cached accounts once; backfills use them instead of /accounts/get
+        cached_accounts_by_token: Dict[int, List[Dict]] = {}
+        for account in self.db.get_cached_accounts(user_id):
+            cached_accounts_by_token.setdefault(account['token_id'], []).append(account)
         
-        # Sort transactions by date (newest first)
-        all_transactions.sort(key=lambda x: x.get('date', ''), reverse=True)
+        # Fan out across institutions; results are merged in token order
+        futures = [
+            self.executor.submit(self._refresh_transactions_for_token, user_id, token_data,
+                                 account_types, start_date, end_date,
+                                 cached_accounts_by_token.get(token_data['id'], []))
+            for token_data in tokens_data
+        ]
+        for future in futures:
+            errors.extend(future.result())
+        
+        # Serve the refreshed period from the cache (newest first)
+        page = self.db.get_cached_transactions(user_id, account_types, account_id, year, month, limit=limit)
+        all_transactions = page['transactions']
         
         # Get transaction summary
-        transaction_summary = self.db.get_transaction_summary(user_id, account_types, None, year, month)
+        transaction_summary = self.db.get_transaction_summary(user_id, account_types, account_id, year, month)
         
         return {
             'transactions': all_transactions,
             'summary': transaction_summary,
             'total_transactions': len(all_transactions),
+            'next_cursor': page['next_cursor'],
             'errors': errors,
             'is_cached': False,
             'account_types_filter': account_types,
@@ -645,6 +1024,11 @@ class PlaidService:
                 user=LinkTokenCreateRequestUser(client_user_id=str(user_id))
             )
             
+            # Have Plaid notify /plaid/webhook when the new item has updates
+            webhook_url = os.getenv('PLAID_WEBHOOK_URL')
+            if webhook_url:
+                request.webhook = webhook_url
+            
             response = self.client.link_token_create(request)
             return response.to_dict()
         except plaid.ApiException as e:
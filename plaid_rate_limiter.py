@@ -0,0 +1,186 @@
+"""
+Rate limiting and retry policy for Plaid API calls.
+
+Every call made through RateLimitedPlaidApi first takes a token from a shared
+per-client bucket and, when the request carries an access_token, from that
+item's bucket. Calls that fail with RATE_LIMIT_EXCEEDED or PRODUCT_NOT_READY
+are retried with exponential backoff and full jitter, and rate-limit errors
+also pause the offending bucket so concurrent workers back off together.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import plaid
+
+logger = logging.getLogger(__name__)
+
+# Plaid error types/codes that are worth retrying after a delay
+RETRYABLE_ERROR_TYPES = {'RATE_LIMIT_EXCEEDED'}
+RETRYABLE_ERROR_CODES = {'PRODUCT_NOT_READY'}
+
+
+class TokenBucket:
+    """Thread-safe token bucket that blocks callers until a token is available"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given number of seconds"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class PlaidRateLimiter:
+    """Per-client and per-item token buckets plus the retry policy"""
+
+    def __init__(self, client_rate: Optional[float] = None, client_burst: Optional[float] = None,
+                 item_rate: Optional[float] = None, item_burst: Optional[float] = None,
+                 max_retries: Optional[int] = None, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Args:
+            client_rate: Requests per second across the whole client (PLAID_CLIENT_RATE_LIMIT)
+            client_burst: Client bucket capacity (default: one second of client_rate)
+            item_rate: Requests per second per item (PLAID_ITEM_RATE_LIMIT)
+            item_burst: Item bucket capacity (default: 5)
+            max_retries: Retries for retryable errors (PLAID_MAX_RETRIES)
+            base_delay: First backoff delay in seconds
+            max_delay: Upper bound on any single backoff delay
+        """
+        if client_rate is None:
+            client_rate = float(os.getenv('PLAID_CLIENT_RATE_LIMIT', 10))
+        if item_rate is None:
+            item_rate = float(os.getenv('PLAID_ITEM_RATE_LIMIT', 0.5))
+        if max_retries is None:
+            max_retries = int(os.getenv('PLAID_MAX_RETRIES', 5))
+
+        self.client_bucket = TokenBucket(client_rate, client_burst or max(1.0, client_rate))
+        self.item_rate = item_rate
+        self.item_burst = item_burst or 5
+        self.item_buckets: Dict[str, TokenBucket] = {}
+        self.item_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def item_bucket(self, item_key: str) -> TokenBucket:
+        """Get (or create) the bucket for an item"""
+        with self.item_lock:
+            bucket = self.item_buckets.get(item_key)
+            if bucket is None:
+                bucket = TokenBucket(self.item_rate, self.item_burst)
+                self.item_buckets[item_key] = bucket
+            return bucket
+
+    @staticmethod
+    def parse_error(e: plaid.ApiException) -> Dict[str, Any]:
+        """Decode the Plaid error body, returning an empty dict if it isn't JSON"""
+        body = e.body
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', errors='replace')
+        try:
+            error = json.loads(body) if body else {}
+        except ValueError:
+            return {}
+        return error if isinstance(error, dict) else {}
+
+    def is_retryable(self, e: plaid.ApiException) -> bool:
+        """Check whether an API error should be retried"""
+        error = self.parse_error(e)
+        return (e.status == 429
+                or error.get('error_type') in RETRYABLE_ERROR_TYPES
+                or error.get('error_code') in RETRYABLE_ERROR_CODES)
+
+    def backoff_delay(self, attempt: int, e: plaid.ApiException) -> float:
+        """Exponential backoff with full jitter, honoring Retry-After when present"""
+        headers = e.headers or {}
+        retry_after = headers.get('Retry-After') if hasattr(headers, 'get') else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func: Callable, request: Any = None, *args, **kwargs):
+        """
+        Call a Plaid API method under the rate limits, retrying retryable errors
+
+        Args:
+            func: Bound PlaidApi method
+            request: The request model (its access_token selects the item bucket)
+        """
+        access_token = getattr(request, 'access_token', None) if request is not None else None
+        item_bucket = self.item_bucket(access_token) if access_token else None
+        call_args = (request,) + args if request is not None else args
+
+        attempt = 0
+        while True:
+            self.client_bucket.acquire()
+            if item_bucket:
+                item_bucket.acquire()
+            try:
+                return func(*call_args, **kwargs)
+            except plaid.ApiException as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                error = self.parse_error(e)
+                if error.get('error_type') in RETRYABLE_ERROR_TYPES or e.status == 429:
+                    # Make every worker sharing this bucket wait, not just this one
+                    (item_bucket or self.client_bucket).pause(delay)
+                logger.warning(f"Plaid {getattr(func, '__name__', 'call')} returned "
+                               f"{error.get('error_code') or e.status}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+
+class RateLimitedPlaidApi:
+    """Wraps a PlaidApi so every method goes through a PlaidRateLimiter"""
+
+    def __init__(self, client: Any, limiter: PlaidRateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def rate_limited(*args, **kwargs):
+            return self._limiter.call(attr, *args, **kwargs)
+        rate_limited.__name__ = name
+        return rate_limited
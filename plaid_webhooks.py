@@ -0,0 +1,161 @@
+"""
+Plaid webhook verification and item refresh queue.
+
+Plaid signs every webhook with an ES256 JWT in the Plaid-Verification header.
+WebhookVerifier checks that signature against the key Plaid publishes for the
+JWT's key ID and compares the body hash it carries. WebhookQueue then turns
+verified transaction webhooks into targeted per-item refreshes, coalescing
+repeat notifications for an item that is already waiting in the queue.
+"""
+
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import jwt
+import plaid
+from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+from plaid_budget_fetcher import PlaidService
+
+logger = logging.getLogger(__name__)
+
+# Transactions webhook codes that mean new data is available for the item
+REFRESH_WEBHOOK_CODES = {
+    'SYNC_UPDATES_AVAILABLE',
+    'DEFAULT_UPDATE',
+    'INITIAL_UPDATE',
+    'HISTORICAL_UPDATE',
+    'TRANSACTIONS_REMOVED',
+}
+
+# Plaid recommends rejecting webhooks signed more than five minutes ago
+WEBHOOK_MAX_AGE_SECONDS = 5 * 60
+
+
+class WebhookVerifier:
+    """Verifies the Plaid-Verification JWT attached to incoming webhooks"""
+
+    def __init__(self, service: PlaidService, max_age: int = WEBHOOK_MAX_AGE_SECONDS):
+        self.service = service
+        self.max_age = max_age
+        self.keys: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+    def _get_key(self, key_id: str):
+        """Fetch (and cache) the public key Plaid used to sign a webhook"""
+        with self.lock:
+            key = self.keys.get(key_id)
+        if key is not None:
+            return key
+
+        response = self.service.client.webhook_verification_key_get(
+            WebhookVerificationKeyGetRequest(key_id=key_id)
+        )
+        jwk = response.to_dict()['key']
+        key = jwt.PyJWK(jwk, algorithm='ES256').key
+        # Rotated keys carry expired_at; only cache keys that are still current
+        if not jwk.get('expired_at'):
+            with self.lock:
+                self.keys[key_id] = key
+        return key
+
+    def verify(self, body: bytes, token: Optional[str]) -> bool:
+        """
+        Check a webhook's signature, age and body hash
+
+        Args:
+            body: Raw request body
+            token: Value of the Plaid-Verification header
+
+        Returns:
+            True if the webhook was signed by Plaid for exactly this body
+        """
+        if not token:
+            return False
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get('alg') != 'ES256' or not header.get('kid'):
+                return False
+
+            claims = jwt.decode(token, self._get_key(header['kid']), algorithms=['ES256'],
+                                options={'require': ['iat', 'request_body_sha256']})
+            if time.time() - claims['iat'] > self.max_age:
+                return False
+
+            body_hash = hashlib.sha256(body).hexdigest()
+            return hmac.compare_digest(body_hash, claims['request_body_sha256'])
+        except (jwt.PyJWTError, plaid.ApiException, KeyError, ValueError) as e:
+            logger.warning(f"Webhook verification failed: {e}")
+            return False
+
+
+class WebhookQueue:
+    """Background workers that refresh individual items named by webhooks"""
+
+    def __init__(self, service: PlaidService, workers: int = 1):
+        self.service = service
+        self.db = service.db
+        self.queue: queue.Queue = queue.Queue()
+        self.pending: Dict[str, List[str]] = {}
+        self.lock = threading.Lock()
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f'plaid-webhook-{i}', daemon=True).start()
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a refresh for the item named in a webhook payload
+
+        Args:
+            payload: Parsed webhook body
+
+        Returns:
+            True if the webhook was relevant (queued or coalesced), False if ignored
+        """
+        if payload.get('webhook_type') != 'TRANSACTIONS':
+            return False
+        if payload.get('webhook_code') not in REFRESH_WEBHOOK_CODES:
+            return False
+        item_id = payload.get('item_id')
+        if not item_id:
+            return False
+
+        removed = list(payload.get('removed_transactions') or [])
+        with self.lock:
+            if item_id in self.pending:
+                # Already waiting; just fold in any removals
+                self.pending[item_id].extend(removed)
+                return True
+            self.pending[item_id] = removed
+        self.queue.put(item_id)
+        return True
+
+    def _worker(self):
+        while True:
+            item_id = self.queue.get()
+            try:
+                with self.lock:
+                    removed = self.pending.pop(item_id, [])
+                self.process(item_id, removed)
+            except Exception as e:
+                logger.error(f"Webhook refresh failed for item {item_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def process(self, item_id: str, removed: List[str]):
+        """Apply a webhook to one item: drop removed transactions, then sync"""
+        token_data = self.db.get_token_by_item_id(item_id)
+        if token_data is None:
+            logger.warning(f"Ignoring webhook for unknown item {item_id}")
+            return
+
+        user_id = token_data['user_id']
+        if removed:
+            self.db.delete_transactions(user_id, removed)
+
+        counts = self.service.sync_transactions(user_id, token_data)
+        logger.info(f"Webhook sync for item {item_id}: {counts}")
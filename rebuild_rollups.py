@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Rebuild the transaction_rollups table for Plaid Budgeting App
+
+Rollups are kept up to date as transactions are stored and deleted, so this
+is only needed after editing transactions by hand, restoring a backup, or
+bulk-loading data outside DatabaseManager.
+
+Usage:
+    python rebuild_rollups.py                          # Rebuild every user's rollups (SQLite)
+    python rebuild_rollups.py --user-id 3              # Rebuild a single user's rollups
+    python rebuild_rollups.py --postgres               # Rebuild in the PostgreSQL database
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild transaction rollups for Plaid Budgeting App')
+    parser.add_argument('--user-id', type=int, help='Only rebuild this user (default: all users)')
+    parser.add_argument('--postgres', action='store_true',
+                        help='Use the PostgreSQL database (POSTGRES_* settings) instead of SQLite')
+    parser.add_argument('--sqlite-path', default=os.getenv('SQLITE_DB_PATH', 'plaid_app.db'),
+                        help='SQLite database file (default: plaid_app.db)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.postgres:
+        from database_postgres import DatabaseManager
+        db = DatabaseManager(pool_max=0)
+    else:
+        from database import DatabaseManager
+        db = DatabaseManager(args.sqlite_path)
+
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    logger.info(f"Rebuilding transaction rollups for {scope}...")
+    if not db.rebuild_transaction_rollups(args.user_id):
+        logger.error("Rollup rebuild failed")
+        return False
+
+    logger.info("Rollup rebuild completed")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Background Refresh Scheduler for Plaid Budgeting App
+
+Keeps the account and transaction cache warm so web requests rarely need
+?refresh=true. Every connected item (user_tokens row) gets its own schedule:
+items of recently active users are refreshed more often and go first when
+many are due, and every run is jittered so items don't hit Plaid in lockstep.
+
+Usage:
+    python refresh_scheduler.py                        # Run until interrupted
+    python refresh_scheduler.py --once                 # Refresh every item once and exit
+    python refresh_scheduler.py --max-concurrency 2    # Limit parallel item refreshes
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from plaid_budget_fetcher import PlaidService
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScheduledItem:
+    """Refresh schedule for a single connected item"""
+    user_id: int
+    token_id: int
+    next_run: float
+    active: bool = False
+    in_flight: bool = False
+
+
+class RefreshScheduler:
+    """Refreshes every user's connected items on a per-item schedule"""
+
+    def __init__(self, service: PlaidService,
+                 interval: datetime.timedelta = datetime.timedelta(hours=6),
+                 active_interval: datetime.timedelta = datetime.timedelta(hours=1),
+                 active_window: datetime.timedelta = datetime.timedelta(days=7),
+                 jitter: float = 0.1,
+                 max_concurrency: int = 4):
+        """
+        Initialize the scheduler
+
+        Args:
+            service: PlaidService used to refresh items
+            interval: Time between refreshes for inactive users' items
+            active_interval: Time between refreshes for recently active users' items
+            active_window: How recently a user must have been seen to count as active
+            jitter: Fraction of the interval to randomly add or subtract per run
+            max_concurrency: Maximum number of items refreshed in parallel
+        """
+        self.service = service
+        self.db = service.db
+        self.interval = interval
+        self.active_interval = active_interval
+        self.active_window = active_window
+        self.jitter = jitter
+        self.max_concurrency = max(1, max_concurrency)
+        self.items: Dict[int, ScheduledItem] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix='refresh-scheduler')
+
+    def _is_active(self, last_seen_at: Any) -> bool:
+        """Check whether a user's last_seen_at falls inside the active window"""
+        return PlaidService._is_fresh(last_seen_at, self.active_window)
+
+    def _next_delay(self, active: bool) -> float:
+        """Seconds until an item's next run, with jitter applied"""
+        base = (self.active_interval if active else self.interval).total_seconds()
+        return base * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def reload_items(self):
+        """Sync the schedule with the users and tokens currently in the database"""
+        now = time.time()
+        seen_token_ids = set()
+
+        # get_all_users returns one row per token, so collapse to users first
+        users: Dict[int, Dict[str, Any]] = {}
+        for user in self.db.get_all_users():
+            if user['has_token']:
+                users[user['id']] = user
+
+        with self.lock:
+            for user_id, user in users.items():
+                active = self._is_active(user.get('last_seen_at'))
+                for token_data in self.db.get_user_tokens(user_id):
+                    token_id = token_data['id']
+                    seen_token_ids.add(token_id)
+                    item = self.items.get(token_id)
+                    if item is None:
+                        # Spread newly discovered items across their first interval
+                        first_run = now + random.uniform(0, self._next_delay(active))
+                        self.items[token_id] = ScheduledItem(user_id, token_id, first_run, active)
+                    elif active and not item.active:
+                        # A user who just came back shouldn't wait out an inactive interval
+                        item.next_run = min(item.next_run, now + self._next_delay(True))
+                        item.active = True
+                    else:
+                        item.active = active
+
+            # Forget items whose tokens were revoked
+            for token_id in list(self.items):
+                if token_id not in seen_token_ids and not self.items[token_id].in_flight:
+                    del self.items[token_id]
+
+    def due_items(self, now: Optional[float] = None) -> List[ScheduledItem]:
+        """Items that are due, recently active users first, then oldest due first"""
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [item for item in self.items.values() if item.next_run <= now and not item.in_flight]
+        due.sort(key=lambda item: (not item.active, item.next_run))
+        return due
+
+    def _refresh(self, item: ScheduledItem):
+        """Refresh a single item and reschedule it"""
+        try:
+            token_data = next((t for t in self.db.get_user_tokens(item.user_id) if t['id'] == item.token_id), None)
+            if token_data is None:
+                return
+
+            started = time.time()
+            errors = self.service.refresh_item(item.user_id, token_data)
+            elapsed = time.time() - started
+            if errors:
+                logger.warning(f"Refreshed item {item.token_id} for user {item.user_id} with errors "
+                               f"in {elapsed:.1f}s: {'; '.join(errors)}")
+            else:
+                logger.info(f"Refreshed item {item.token_id} for user {item.user_id} in {elapsed:.1f}s")
+        except Exception as e:
+            logger.error(f"Failed to refresh item {item.token_id} for user {item.user_id}: {e}")
+        finally:
+            with self.lock:
+                item.next_run = time.time() + self._next_delay(item.active)
+                item.in_flight = False
+
+    def _submit_due(self) -> list:
+        """Mark every due item in flight and submit it to the worker pool"""
+        due = self.due_items()
+        with self.lock:
+            for item in due:
+                item.in_flight = True
+        return [self.executor.submit(self._refresh, item) for item in due]
+
+    def run_pending(self) -> int:
+        """Submit every due item to the worker pool and return how many were submitted"""
+        return len(self._submit_due())
+
+    def run_once(self):
+        """Refresh every known item once, ignoring the schedule, and wait for completion"""
+        self.reload_items()
+        with self.lock:
+            for item in self.items.values():
+                item.next_run = 0
+        for future in self._submit_due():
+            future.result()
+
+    def run_forever(self, poll_seconds: float = 30, reload_seconds: float = 300):
+        """
+        Run the scheduler loop until interrupted
+
+        Args:
+            poll_seconds: How often to check for due items
+            reload_seconds: How often to re-read users and tokens from the database
+        """
+        last_reload = 0.0
+        logger.info(f"Refresh scheduler started (max concurrency {self.max_concurrency})")
+        try:
+            while True:
+                if time.time() - last_reload >= reload_seconds:
+                    self.reload_items()
+                    last_reload = time.time()
+                    logger.info(f"Tracking {len(self.items)} items")
+
+                submitted = self.run_pending()
+                if submitted:
+                    logger.info(f"Submitted {submitted} item refreshes")
+
+                time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            logger.info("Refresh scheduler stopping...")
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Background refresh scheduler for Plaid Budgeting App')
+    parser.add_argument('--once', action='store_true', help='Refresh every item once and exit')
+    parser.add_argument('--interval-minutes', type=int,
+                        default=int(os.getenv('REFRESH_INTERVAL_MINUTES', 360)),
+                        help='Refresh interval for inactive users (default: 360)')
+    parser.add_argument('--active-interval-minutes', type=int,
+                        default=int(os.getenv('REFRESH_ACTIVE_INTERVAL_MINUTES', 60)),
+                        help='Refresh interval for recently active users (default: 60)')
+    parser.add_argument('--active-days', type=int,
+                        default=int(os.getenv('REFRESH_ACTIVE_DAYS', 7)),
+                        help='Days since last visit for a user to count as active (default: 7)')
+    parser.add_argument('--jitter', type=float,
+                        default=float(os.getenv('REFRESH_JITTER', 0.1)),
+                        help='Fraction of the interval to randomize each run (default: 0.1)')
+    parser.add_argument('--max-concurrency', type=int,
+                        default=int(os.getenv('REFRESH_MAX_CONCURRENCY', 4)),
+                        help='Maximum items refreshed in parallel (default: 4)')
+    parser.add_argument('--poll-seconds', type=float, default=30,
+                        help='How often to check for due items (default: 30)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    client_id = os.getenv('PLAID_CLIENT_ID')
+    secret = os.getenv('PLAID_SECRET')
+    environment = os.getenv('PLAID_ENVIRONMENT', 'sandbox')
+
+    if not client_id or not secret:
+        logger.error("Missing PLAID_CLIENT_ID or PLAID_SECRET environment variables")
+        return False
+
+    service = PlaidService(client_id=client_id, secret=secret, environment=environment)
+    scheduler = RefreshScheduler(
+        service,
+        interval=datetime.timedelta(minutes=args.interval_minutes),
+        active_interval=datetime.timedelta(minutes=args.active_interval_minutes),
+        active_window=datetime.timedelta(days=args.active_days),
+        jitter=args.jitter,
+        max_concurrency=args.max_concurrency
+    )
+
+    if args.once:
+        scheduler.run_once()
+        scheduler.executor.shutdown(wait=True)
+    else:
+        scheduler.run_forever(poll_seconds=args.poll_seconds)
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,90 @@
+"""
+Request-scoped memoization of per-user lookups.
+
+A single page load asks for the same facts several times (the user's tokens
+back has_access_token, get_user_token and get_institutions_count). Read
+methods decorated with @request_memoized keep their results on flask.g for
+the rest of the request, so each fact is loaded once; write methods
+decorated with @invalidates drop the facts they change for that user.
+Outside a request (background workers, scripts, executor threads) the
+decorators pass straight through.
+"""
+
+import copy
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+
+from flask import Flask, g, has_request_context
+
+
+class RequestCache:
+    """Identity map of loaded facts for one request"""
+
+    def __init__(self):
+        self.entries: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading it on first use"""
+        if key in self.entries:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.entries[key] = load()
+        # Hand out copies so a caller mutating its result can't change what others see
+        return copy.deepcopy(self.entries[key])
+
+    def invalidate(self, owner: int, fact: str, user_id: Any):
+        """Forget every cached lookup of one fact for one user"""
+        for key in [key for key in self.entries if key[:3] == (owner, fact, user_id)]:
+            del self.entries[key]
+
+
+def current_cache():
+    """The active request's cache, or None outside a request"""
+    if not has_request_context():
+        return None
+    cache = g.get('request_cache')
+    if cache is None:
+        cache = g.request_cache = RequestCache()
+    return cache
+
+
+def request_memoized(fact: str):
+    """Memoize a read method whose first argument is a user ID for the current request"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, user_id, *args, **kwargs):
+            cache = current_cache()
+            if cache is None:
+                return method(self, user_id, *args, **kwargs)
+            key = (id(self), fact, user_id, method.__name__, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(key, lambda: method(self, user_id, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def invalidates(*facts: str):
+    """Drop the given facts for the user (first argument) when a write method runs"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, user_id, *args, **kwargs):
+            try:
+                return method(self, user_id, *args, **kwargs)
+            finally:
+                cache = current_cache()
+                if cache is not None:
+                    for fact in facts:
+                        cache.invalidate(id(self), fact, user_id)
+        return wrapper
+    return decorator
+
+
+def init_app(app: Flask):
+    """Log each request's cache hit/miss counts at debug level"""
+    @app.teardown_request
+    def log_request_cache(exc=None):
+        cache = g.get('request_cache')
+        if cache is not None and (cache.hits or cache.misses):
+            app.logger.debug(f"Request cache: {cache.hits} hits, {cache.misses} misses")
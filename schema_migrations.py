@@ -0,0 +1,150 @@
+"""
+Versioned schema migrations.
+
+Every database records the migrations applied to it in a schema_version
+table. At startup DatabaseManager reads the highest applied version with a
+single query and only runs migrations newer than that, instead of replaying
+the whole schema history (CREATE ... IF NOT EXISTS, column introspection,
+conditional ALTER TABLEs) on every construction. A process checks each
+database once, however many DatabaseManagers it builds.
+
+SQLite migrations are Python callables defined in database.py. PostgreSQL
+migrations are the numbered scripts in sql/ named NN_create_*.sql or
+NN_add_*.sql; the number is the schema version.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# sql/ scripts that are schema migrations (not cleanup or reference scripts)
+SQL_MIGRATION_PATTERN = re.compile(r'^(\d+)_((?:create|add)_\w+)\.sql$')
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema change; apply receives a cursor inside the migration transaction"""
+    version: int
+    name: str
+    apply: Callable[[Any], None]
+
+
+def sql_file_migrations(sql_dir: Path) -> list[Migration]:
+    """Build migrations from the numbered NN_create_*/NN_add_*.sql scripts in sql_dir"""
+    migrations = []
+    for path in sorted(Path(sql_dir).glob('*.sql')):
+        match = SQL_MIGRATION_PATTERN.match(path.name)
+        if match:
+            sql = path.read_text()
+            migrations.append(Migration(int(match.group(1)), match.group(2),
+                                        lambda cursor, sql=sql: cursor.execute(sql)))
+    return migrations
+
+
+def current_version(conn, errors: tuple) -> int:
+    """
+    Read the highest applied schema version (0 for a database that has none)
+
+    Args:
+        conn: DB-API connection; left without an open transaction
+        errors: Exception types the driver raises when schema_version doesn't exist
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+        version = cursor.fetchone()[0] or 0
+    except errors:
+        version = 0
+    finally:
+        cursor.close()
+        conn.rollback()
+    return version
+
+
+def run_migrations(conn, migrations: list[Migration], begin: Callable[[Any], None],
+                   errors: tuple, placeholder: str = '?') -> list[int]:
+    """
+    Apply the migrations newer than the database's schema version
+
+    All pending migrations run in one transaction, after begin() has taken
+    a lock that keeps concurrently starting processes from applying them
+    twice; the version is re-read once the lock is held.
+
+    Args:
+        conn: DB-API connection dedicated to the migration
+        migrations: Every migration for this database, in any order
+        begin: Starts the locked transaction on a cursor (e.g. BEGIN IMMEDIATE)
+        errors: Exception types the driver raises when schema_version doesn't exist
+        placeholder: The driver's parameter placeholder
+
+    Returns:
+        Versions applied, oldest first (empty if the schema was current)
+    """
+    migrations = sorted(migrations, key=lambda migration: migration.version)
+    if not migrations or current_version(conn, errors) >= migrations[-1].version:
+        return []
+
+    cursor = conn.cursor()
+    try:
+        begin(cursor)
+        cursor.execute(SCHEMA_VERSION_TABLE)
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+        version = cursor.fetchone()[0] or 0
+
+        applied = []
+        for migration in migrations:
+            if migration.version <= version:
+                continue
+            logger.info(f"Applying schema migration {migration.version}: {migration.name}")
+            migration.apply(cursor)
+            cursor.execute(f'INSERT INTO schema_version (version, name) VALUES ({placeholder}, {placeholder})',
+                           (migration.version, migration.name))
+            applied.append(migration.version)
+        conn.commit()
+        return applied
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+_checked: set = set()
+_checked_lock = threading.Lock()
+
+
+def migrate_once(key: Hashable, connect: Callable[[], Any], migrations: list[Migration],
+                 begin: Callable[[Any], None], errors: tuple, placeholder: str = '?') -> list[int]:
+    """
+    run_migrations for the database identified by key, at most once per process
+
+    Args:
+        key: Identifies the database (e.g. its file path or connection settings)
+        connect: Opens a connection dedicated to the migration; it is closed afterwards
+
+    Returns:
+        Versions applied (empty if already checked in this process or current)
+    """
+    with _checked_lock:
+        if key in _checked:
+            return []
+        conn = connect()
+        try:
+            applied = run_migrations(conn, migrations, begin, errors, placeholder)
+        finally:
+            conn.close()
+        _checked.add(key)
+    return applied
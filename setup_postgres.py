@@ -145,6 +145,29 @@ class PostgreSQLSetup:
             logger.error(f"Failed to execute SQL file {filename}: {e}")
             return False
     
+    def apply_migrations(self) -> bool:
+        """Apply the numbered sql/ schema migrations the database hasn't seen yet"""
+        from database_postgres import MIGRATION_ERRORS, SCHEMA_MIGRATIONS, begin_migration
+        from schema_migrations import run_migrations
+        
+        try:
+            conn = psycopg2.connect(**self.db_config)
+            try:
+                applied = run_migrations(conn, SCHEMA_MIGRATIONS, begin_migration,
+                                         MIGRATION_ERRORS, placeholder='%s')
+            finally:
+                conn.close()
+            
+            if applied:
+                logger.info(f"Applied schema migrations: {', '.join(map(str, applied))}")
+            else:
+                logger.info("Schema is already up to date")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to apply schema migrations: {e}")
+            return False
+    
     def init_database(self) -> bool:
         """Initialize the PostgreSQL database with schema"""
         logger.info("Initializing PostgreSQL database...")
@@ -155,7 +178,7 @@ class PostgreSQLSetup:
         if not self.create_database():
             return False
         
-        if not self.run_sql_file('01_create_schema.sql'):
+        if not self.apply_migrations():
             return False
         
         logger.info("Database initialization completed successfully")
@@ -192,6 +215,12 @@ class PostgreSQLSetup:
             postgres_conn.close()
             sqlite_conn.close()
             
+            # Migrated rows bypass DatabaseManager, so derive their rollups afterwards
+            from database_postgres import DatabaseManager
+            if not DatabaseManager(self.db_config, pool_max=0).rebuild_transaction_rollups():
+                logger.error("Rebuilding transaction rollups failed")
+                return False
+            
             logger.info("Migration completed successfully")
             return True
             
@@ -309,7 +338,7 @@ class PostgreSQLSetup:
         if not self.run_sql_file('03_cleanup.sql'):
             return False
         
-        if not self.run_sql_file('01_create_schema.sql'):
+        if not self.apply_migrations():
             return False
         
         logger.info("Database reset completed")
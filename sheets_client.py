@@ -0,0 +1,280 @@
+"""
+Minimal Google Sheets API v4 client for budget exports.
+
+Only the spreadsheet and values calls the exporter needs are implemented,
+over a pluggable HTTP transport: UrllibTransport talks to Google (or to
+fake_sheets_server.py when SHEETS_API_HOST points at it), and tests can
+pass any object with the same request() method. Every call takes a token
+from a shared bucket paced below the per-user write quota (60 requests a
+minute); 429 and 5xx responses are retried with exponential backoff and
+full jitter, honoring Retry-After, and a 429 pauses the bucket so every
+caller backs off together. A 5xx may arrive after the server applied the
+request, so calls that aren't idempotent (values.append) retry only 429s.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+
+from plaid_rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SHEETS_API_HOST = 'https://sheets.googleapis.com'
+SHEETS_SCOPE = 'https://www.googleapis.com/auth/spreadsheets'
+GOOGLE_TOKEN_URI = 'https://oauth2.googleapis.com/token'
+
+# Status codes worth retrying after a delay
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# The only one of them that guarantees the request wasn't applied
+REJECTED_STATUSES = {429}
+
+
+class SheetsApiError(Exception):
+    """A non-retryable (or retried-out) error response from the Sheets API"""
+
+    def __init__(self, status: int, message: str, body: Optional[Dict[str, Any]] = None):
+        super().__init__(f"Sheets API error {status}: {message}")
+        self.status = status
+        self.message = message
+        self.body = body or {}
+
+
+class UrllibTransport:
+    """HTTP transport on the standard library"""
+
+    def __init__(self, timeout: float = 60):
+        self.timeout = timeout
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                body: Optional[bytes] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send one HTTP request
+
+        Returns:
+            (status, response headers, response body); error statuses are
+            returned, not raised
+        """
+        req = urllib.request.Request(url, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers or {}), e.read()
+
+
+class StaticToken:
+    """An OAuth access token obtained elsewhere (e.g. gcloud auth print-access-token)"""
+
+    def __init__(self, token: str):
+        self._token = token
+
+    def token(self) -> str:
+        return self._token
+
+
+class ServiceAccountCredentials:
+    """Access tokens for a Google service account, refreshed shortly before they expire"""
+
+    def __init__(self, info: Dict[str, Any], transport: Any, scope: str = SHEETS_SCOPE):
+        """
+        Args:
+            info: Parsed service account key file (client_email, private_key, token_uri)
+            transport: Transport used for the token exchange
+            scope: OAuth scope to request
+        """
+        self.client_email = info['client_email']
+        self.private_key = info['private_key']
+        self.token_uri = info.get('token_uri', GOOGLE_TOKEN_URI)
+        self.scope = scope
+        self.transport = transport
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, transport: Any) -> 'ServiceAccountCredentials':
+        with open(path) as f:
+            return cls(json.load(f), transport)
+
+    def token(self) -> str:
+        with self._lock:
+            if self._token is None or time.time() > self._expires_at - 60:
+                self._refresh()
+            return self._token
+
+    def _refresh(self):
+        """Exchange a signed JWT assertion for an access token"""
+        now = int(time.time())
+        assertion = jwt.encode({
+            'iss': self.client_email,
+            'scope': self.scope,
+            'aud': self.token_uri,
+            'iat': now,
+            'exp': now + 3600,
+        }, self.private_key, algorithm='RS256')
+        body = urllib.parse.urlencode({
+            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+            'assertion': assertion,
+        }).encode('utf-8')
+        status, _, response = self.transport.request(
+            'POST', self.token_uri, {'Content-Type': 'application/x-www-form-urlencoded'}, body)
+        if status != 200:
+            raise SheetsApiError(status, f"token exchange failed: {response[:200]!r}")
+        data = json.loads(response)
+        self._token = data['access_token']
+        self._expires_at = now + int(data.get('expires_in', 3600))
+
+
+def credentials_from_env(transport: Any):
+    """Credentials from GOOGLE_SERVICE_ACCOUNT_FILE or SHEETS_ACCESS_TOKEN (None if neither is set)"""
+    key_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE')
+    if key_file:
+        return ServiceAccountCredentials.from_file(key_file, transport)
+    token = os.getenv('SHEETS_ACCESS_TOKEN')
+    return StaticToken(token) if token else None
+
+
+def a1_range(sheet_title: str, cells: str = '') -> str:
+    """A1 notation for a range on a sheet, quoting the sheet title"""
+    quoted = "'" + sheet_title.replace("'", "''") + "'"
+    return f"{quoted}!{cells}" if cells else quoted
+
+
+class SheetsClient:
+    """Paced, retrying calls to the Sheets API"""
+
+    def __init__(self, transport: Any = None, credentials: Any = None, base_url: Optional[str] = None,
+                 rate: Optional[float] = None, burst: Optional[float] = None,
+                 max_retries: Optional[int] = None, base_delay: float = 1.0, max_delay: float = 64.0):
+        """
+        Args:
+            transport: Object with request(method, url, headers, body) (default: UrllibTransport)
+            credentials: Object with token() (default: from the environment; None sends no auth)
+            base_url: API host (SHEETS_API_HOST, default: Google)
+            rate: Requests per second (SHEETS_RATE_LIMIT, default 1)
+            burst: Bucket capacity (SHEETS_RATE_BURST, default 5)
+            max_retries: Retries for 429 and 5xx responses (SHEETS_MAX_RETRIES, default 5)
+            base_delay: First backoff delay in seconds
+            max_delay: Upper bound on any single backoff delay
+        """
+        self.transport = transport or UrllibTransport()
+        self.credentials = credentials if credentials is not None else credentials_from_env(self.transport)
+        self.base_url = (base_url or os.getenv('SHEETS_API_HOST', SHEETS_API_HOST)).rstrip('/')
+        if rate is None:
+            rate = float(os.getenv('SHEETS_RATE_LIMIT', 1))
+        if burst is None:
+            burst = float(os.getenv('SHEETS_RATE_BURST', 5))
+        if max_retries is None:
+            max_retries = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Requests sent, retries included
+        self.calls = 0
+
+    def _backoff_delay(self, attempt: int, headers: Dict[str, str]) -> float:
+        """Exponential backoff with full jitter, honoring Retry-After when present"""
+        retry_after = {key.lower(): value for key, value in headers.items()}.get('retry-after')
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                body: Optional[Dict[str, Any]] = None, idempotent: bool = True) -> Dict[str, Any]:
+        """
+        Call the API, pacing and retrying as configured
+
+        Args:
+            method: HTTP method
+            path: Path below /v4/spreadsheets, already URL-quoted
+            params: Query parameters
+            body: JSON request body
+            idempotent: Whether repeating the request is harmless; if not,
+                        only responses that guarantee it wasn't applied are retried
+
+        Raises:
+            SheetsApiError: On a non-retryable error, or once retries run out
+        """
+        url = f"{self.base_url}/v4/spreadsheets{path}"
+        if params:
+            url += '?' + urllib.parse.urlencode(params, doseq=True)
+        data = json.dumps(body, separators=(',', ':')).encode('utf-8') if body is not None else None
+        retryable = RETRYABLE_STATUSES if idempotent else REJECTED_STATUSES
+
+        attempt = 0
+        while True:
+            headers = {'Content-Type': 'application/json'}
+            if self.credentials is not None:
+                headers['Authorization'] = f"Bearer {self.credentials.token()}"
+            self.bucket.acquire()
+            self.calls += 1
+            status, response_headers, response = self.transport.request(method, url, headers, data)
+            if 200 <= status < 300:
+                return json.loads(response) if response else {}
+
+            try:
+                error = json.loads(response).get('error', {}) if response else {}
+            except (ValueError, AttributeError):
+                error = {}
+            if status not in retryable or attempt >= self.max_retries:
+                raise SheetsApiError(status, error.get('message') or response[:200].decode('utf-8', 'replace'),
+                                     error)
+            delay = self._backoff_delay(attempt, response_headers)
+            if status == 429:
+                # Make every caller sharing the bucket wait, not just this one
+                self.bucket.pause(delay)
+            logger.warning(f"Sheets {method} {path.split('?')[0]} returned {status}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _path(spreadsheet_id: str, suffix: str = '') -> str:
+        return '/' + urllib.parse.quote(spreadsheet_id, safe='') + suffix
+
+    def get_spreadsheet(self, spreadsheet_id: str, fields: str = 'sheets.properties') -> Dict[str, Any]:
+        """Spreadsheet metadata (by default just each sheet's properties)"""
+        return self.request('GET', self._path(spreadsheet_id), params={'fields': fields})
+
+    def batch_update(self, spreadsheet_id: str, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """spreadsheets.batchUpdate: structural changes such as addSheet"""
+        return self.request('POST', self._path(spreadsheet_id, ':batchUpdate'), body={'requests': requests})
+
+    def values_batch_update(self, spreadsheet_id: str, data: List[Dict[str, Any]],
+                            value_input_option: str = 'RAW') -> Dict[str, Any]:
+        """spreadsheets.values.batchUpdate: write several {'range', 'values'} blocks in one call"""
+        return self.request('POST', self._path(spreadsheet_id, '/values:batchUpdate'),
+                            body={'valueInputOption': value_input_option, 'data': data})
+
+    def values_batch_clear(self, spreadsheet_id: str, ranges: List[str]) -> Dict[str, Any]:
+        """spreadsheets.values.batchClear: empty several ranges in one call"""
+        return self.request('POST', self._path(spreadsheet_id, '/values:batchClear'), body={'ranges': ranges})
+
+    def values_append(self, spreadsheet_id: str, range_a1: str, values: List[List[Any]],
+                      value_input_option: str = 'RAW', insert_data_option: str = 'OVERWRITE') -> Dict[str, Any]:
+        """
+        spreadsheets.values.append: write rows after the table found in range_a1
+
+        The sheet grows as needed either way; OVERWRITE fills empty rows below
+        the table before adding new ones, INSERT_ROWS always inserts. Not
+        idempotent, so only 429s are retried; prefer values_batch_update with
+        explicit ranges when the target rows are known.
+        """
+        path = self._path(spreadsheet_id, '/values/' + urllib.parse.quote(range_a1, safe='') + ':append')
+        return self.request('POST', path,
+                            params={'valueInputOption': value_input_option, 'insertDataOption': insert_data_option},
+                            body={'values': values}, idempotent=False)
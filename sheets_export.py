@@ -0,0 +1,223 @@
+"""
+Export cached transactions and monthly summaries to a Google Sheets spreadsheet.
+
+A period is written as a handful of API calls however many transactions it
+holds: one metadata read, an addSheet batch the first time, one batchClear
+of both sheets, a grid resize when the sheet is too short for the period,
+a values.batchUpdate per rows_per_request transactions, and one
+values.batchUpdate for the monthly summary. Each block goes to explicit row
+numbers, so a write retried after a 5xx overwrites the same rows instead of
+appending them twice. Transactions are read from the cache a page at a time
+with get_cached_transactions, so memory is bounded by rows_per_request and
+no database transaction stays open while the exporter waits on the API's
+quota pacing.
+"""
+
+import calendar
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sheets_client import SheetsClient, a1_range
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_SHEET = 'Transactions'
+SUMMARY_SHEET = 'Monthly Summary'
+
+TRANSACTION_COLUMNS = ['Date', 'Name', 'Merchant', 'Amount', 'Category', 'Detailed Category',
+                       'Account', 'Institution', 'Pending', 'Transaction ID']
+SUMMARY_COLUMNS = ['Month', 'Transactions', 'Debits', 'Credits', 'Net Flow', 'Top Category']
+
+TRANSACTION_LAST_COLUMN = chr(ord('A') + len(TRANSACTION_COLUMNS) - 1)
+
+# Rows added beyond what's needed whenever a grid has to grow (at least; a
+# quarter of the sheet's size when that's more, so big loads resize rarely)
+GRID_HEADROOM_ROWS = 1000
+
+
+def transaction_row(transaction: Dict[str, Any]) -> List[Any]:
+    """A cached transaction as a spreadsheet row (see TRANSACTION_COLUMNS)"""
+    return [
+        str(transaction['date']),
+        transaction['name'] or '',
+        transaction['merchant_name'] or '',
+        transaction['amount'],
+        transaction['category_primary'] or '',
+        transaction['category_detailed'] or '',
+        transaction['account_name'] or '',
+        transaction['institution_name'] or '',
+        bool(transaction['pending']),
+        transaction['transaction_id'],
+    ]
+
+
+def grow_grid(client: SheetsClient, spreadsheet_id: str, properties: Dict[str, Any], last_row: int) -> int:
+    """
+    Make a sheet at least last_row rows tall, with headroom (one batchUpdate, if needed)
+
+    Args:
+        properties: The sheet's properties as last read; its rowCount is kept up to date
+
+    Returns:
+        The sheet's row count
+    """
+    row_count = properties['gridProperties']['rowCount']
+    if last_row > row_count:
+        row_count = last_row + max(GRID_HEADROOM_ROWS, last_row // 4)
+        client.batch_update(spreadsheet_id, [{'updateSheetProperties': {
+            'properties': {'sheetId': properties['sheetId'], 'gridProperties': {'rowCount': row_count}},
+            'fields': 'gridProperties.rowCount',
+        }}])
+        properties['gridProperties']['rowCount'] = row_count
+    return row_count
+
+
+def summary_row(label: str, summary: Dict[str, Any]) -> List[Any]:
+    """A transaction summary as a spreadsheet row (see SUMMARY_COLUMNS)"""
+    top = summary['top_primary_categories']
+    return [
+        label,
+        summary['total_transactions'],
+        round(summary['total_debits'], 2),
+        round(summary['total_credits'], 2),
+        round(summary['net_flow'], 2),
+        top[0]['category'] if top else '',
+    ]
+
+
+class SheetsExporter:
+    """Writes a user's cached budget data into a spreadsheet"""
+
+    def __init__(self, db, client: Optional[SheetsClient] = None, page_size: Optional[int] = None,
+                 rows_per_request: Optional[int] = None):
+        """
+        Args:
+            db: DatabaseManager to read transactions and summaries from
+            client: Sheets API client (default: SheetsClient configured from the environment)
+            page_size: Transactions read from the database at a time (SHEETS_PAGE_SIZE, default 1000)
+            rows_per_request: Rows per values.batchUpdate call (SHEETS_ROWS_PER_REQUEST, default 10000,
+                              about 1.5 MB, under the API's recommended 2 MB payload)
+        """
+        self.db = db
+        self.client = client or SheetsClient()
+        if page_size is None:
+            page_size = int(os.getenv('SHEETS_PAGE_SIZE', 1000))
+        if rows_per_request is None:
+            rows_per_request = int(os.getenv('SHEETS_ROWS_PER_REQUEST', 10000))
+        self.page_size = max(1, page_size)
+        self.rows_per_request = max(1, rows_per_request)
+
+    def ensure_sheets(self, spreadsheet_id: str, titles: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Add whichever of the named sheets the spreadsheet lacks (one addSheet batch)
+
+        Returns:
+            Sheet properties (sheetId, gridProperties, ...) by title for the requested sheets
+        """
+        spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+        sheets = {sheet['properties']['title']: sheet['properties'] for sheet in spreadsheet.get('sheets', [])}
+        missing = [title for title in titles if title not in sheets]
+        if missing:
+            response = self.client.batch_update(spreadsheet_id, [
+                {'addSheet': {'properties': {'title': title, 'gridProperties': {'frozenRowCount': 1}}}}
+                for title in missing
+            ])
+            for reply in response.get('replies', []):
+                properties = reply['addSheet']['properties']
+                sheets[properties['title']] = properties
+        return {title: sheets[title] for title in titles}
+
+    def _transaction_rows(self, user_id: int, account_types: Optional[list[str]],
+                          year: int, month: Optional[int]):
+        """Yield the period's transactions as rows, newest first, one cache page at a time"""
+        cursor = None
+        while True:
+            page = self.db.get_cached_transactions(user_id, account_types, None, year, month,
+                                                   limit=self.page_size, cursor=cursor)
+            for transaction in page['transactions']:
+                yield transaction_row(transaction)
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def _write_block(self, spreadsheet_id: str, properties: Dict[str, Any], first_row: int,
+                     block: List[List[Any]]):
+        """Write rows starting at sheet row first_row, growing the grid first if it's too short"""
+        last_row = first_row + len(block) - 1
+        grow_grid(self.client, spreadsheet_id, properties, last_row)
+        cells = f"A{first_row}:{TRANSACTION_LAST_COLUMN}{last_row}"
+        self.client.values_batch_update(spreadsheet_id, [{'range': a1_range(properties['title'], cells),
+                                                           'values': block}])
+
+    def write_transactions(self, spreadsheet_id: str, user_id: int, year: int, month: Optional[int] = None,
+                           account_types: Optional[list[str]] = None, sheet_title: str = TRANSACTIONS_SHEET,
+                           properties: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Write the period's transactions under a header row (the sheet should be empty)
+
+        Args:
+            properties: The sheet's properties from ensure_sheets (looked up if not given)
+
+        Returns:
+            Number of transactions written
+        """
+        if properties is None:
+            properties = self.ensure_sheets(spreadsheet_id, [sheet_title])[sheet_title]
+        block = [TRANSACTION_COLUMNS]
+        first_row = 1
+        written = 0
+        for row in self._transaction_rows(user_id, account_types, year, month):
+            block.append(row)
+            written += 1
+            if len(block) >= self.rows_per_request:
+                self._write_block(spreadsheet_id, properties, first_row, block)
+                first_row += len(block)
+                block = []
+        if block:
+            self._write_block(spreadsheet_id, properties, first_row, block)
+        return written
+
+    def summary_rows(self, user_id: int, year: int, month: Optional[int] = None,
+                     account_types: Optional[list[str]] = None) -> List[List[Any]]:
+        """Header, one row per month of the period and a total row, from the cached rollups"""
+        months = [month] if month else range(1, 13)
+        rows = [SUMMARY_COLUMNS]
+        for number in months:
+            summary = self.db.get_transaction_summary(user_id, account_types, None, year, number)
+            rows.append(summary_row(f"{calendar.month_name[number]} {year}", summary))
+        if not month:
+            rows.append(summary_row(f"Total {year}",
+                                    self.db.get_transaction_summary(user_id, account_types, None, year, None)))
+        return rows
+
+    def export_period(self, user_id: int, spreadsheet_id: str, year: int, month: Optional[int] = None,
+                      account_types: Optional[list[str]] = None) -> Dict[str, int]:
+        """
+        Replace the Transactions and Monthly Summary sheets with a period's data
+
+        Args:
+            user_id: The user whose cached data is exported
+            spreadsheet_id: Target spreadsheet (the ID in its URL)
+            year: Year to export
+            month: Optional single month (1-12)
+            account_types: Optional account types to include (e.g. ['depository', 'credit'])
+
+        Returns:
+            {'transactions': rows written, 'api_calls': Sheets requests made, retries included}
+        """
+        calls_before = self.client.calls
+        summary = self.summary_rows(user_id, year, month, account_types)
+
+        sheets = self.ensure_sheets(spreadsheet_id, [TRANSACTIONS_SHEET, SUMMARY_SHEET])
+        self.client.values_batch_clear(spreadsheet_id, [a1_range(TRANSACTIONS_SHEET), a1_range(SUMMARY_SHEET)])
+        # The summary's last row counts the whole period, so the grid can be sized in one go
+        grow_grid(self.client, spreadsheet_id, sheets[TRANSACTIONS_SHEET], summary[-1][1] + 1)
+        written = self.write_transactions(spreadsheet_id, user_id, year, month, account_types,
+                                          properties=sheets[TRANSACTIONS_SHEET])
+        self.client.values_batch_update(spreadsheet_id, [{'range': a1_range(SUMMARY_SHEET, 'A1'), 'values': summary}])
+
+        stats = {'transactions': written, 'api_calls': self.client.calls - calls_before}
+        logger.info(f"Exported {written} transactions for user {user_id} to spreadsheet {spreadsheet_id} "
+                    f"in {stats['api_calls']} API calls")
+        return stats
@@ -0,0 +1,214 @@
+"""
+Incremental sync of a user's whole transaction ledger to a Google Sheets sheet.
+
+A full export rewrites every row each time; the ledger sync instead reads
+only the transactions changed since its last run, in (updated_at, id) order
+after a watermark stored per user and sheet. Each transaction keeps the sheet
+row it was first written to (sheet_sync_rows), so a modified transaction is
+rewritten in place, and a pending one that posts under a new ID hands its row
+to the posted transaction (matched on pending_transaction_id). A new one is
+written at the next free row. Removed transactions are read from the
+transaction_removals log after a second watermark and their rows blanked.
+A hash of each written row skips changes that don't alter what the sheet
+shows. Every page of changes becomes a single values.batchUpdate, preceded
+by a grid resize when the ledger outgrows the sheet, so a night's sync costs
+a few API calls however many years the ledger holds.
+
+Rows stay in the order they were first synced and removed rows leave blank
+rows behind; sync(..., rebuild=True) rewrites the sheet from scratch.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sheets_client import SheetsApiError, SheetsClient, a1_range
+from sheets_export import TRANSACTION_COLUMNS, TRANSACTION_LAST_COLUMN, grow_grid, transaction_row
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SHEET = 'Ledger'
+
+BLANK_ROW = [''] * len(TRANSACTION_COLUMNS)
+
+
+def row_hash(row: List[Any]) -> str:
+    """Fingerprint of a sheet row's values, to skip rewriting unchanged rows"""
+    return hashlib.sha1(json.dumps(row, separators=(',', ':'), default=str).encode('utf-8')).hexdigest()
+
+
+class LedgerSync:
+    """Keeps a ledger sheet in step with a user's cached transactions"""
+
+    def __init__(self, db, client: Optional[SheetsClient] = None, page_size: Optional[int] = None,
+                 settle_seconds: Optional[int] = None):
+        """
+        Args:
+            db: DatabaseManager to read changes from and keep sync state in
+            client: Sheets API client (default: SheetsClient configured from the environment)
+            page_size: Changed transactions per values.batchUpdate (SHEETS_PAGE_SIZE, default 1000)
+            settle_seconds: Changes younger than this wait for the next sync, so writes
+                            still committing aren't skipped (SHEETS_SYNC_SETTLE_SECONDS, default 300)
+        """
+        self.db = db
+        self.client = client or SheetsClient()
+        if page_size is None:
+            page_size = int(os.getenv('SHEETS_PAGE_SIZE', 1000))
+        if settle_seconds is None:
+            settle_seconds = int(os.getenv('SHEETS_SYNC_SETTLE_SECONDS', 300))
+        self.page_size = max(1, page_size)
+        self.settle_seconds = max(0, settle_seconds)
+        # The synced sheet's properties once looked up, and how many rows it's known to have
+        self._grid: Optional[Dict[str, Any]] = None
+        self._known_rows = 0
+
+    def _sheet_properties(self, spreadsheet_id: str, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """The sheet's properties (sheetId, gridProperties, ...), or None if it doesn't exist"""
+        spreadsheet = self.client.get_spreadsheet(spreadsheet_id)
+        for sheet in spreadsheet.get('sheets', []):
+            if sheet['properties']['title'] == sheet_title:
+                return sheet['properties']
+        return None
+
+    def _start(self, user_id: int, spreadsheet_id: str, sheet_title: str) -> Dict[str, Any]:
+        """Reset the sync state and empty the sheet, adding it if needed; returns the new state"""
+        state = self.db.reset_sheet_sync(user_id, spreadsheet_id, sheet_title)
+        if state is None:
+            raise RuntimeError(f"Could not reset the sync state of sheet {sheet_title!r}")
+
+        properties = self._sheet_properties(spreadsheet_id, sheet_title)
+        if properties is None:
+            response = self.client.batch_update(spreadsheet_id, [
+                {'addSheet': {'properties': {'title': sheet_title, 'gridProperties': {'frozenRowCount': 1}}}}
+            ])
+            properties = response['replies'][0]['addSheet']['properties']
+        else:
+            self.client.values_batch_clear(spreadsheet_id, [a1_range(sheet_title)])
+        self._grid = properties
+        return state
+
+    def _ensure_grid(self, spreadsheet_id: str, sheet_title: str, last_row: int):
+        """Grow the sheet to at least last_row rows, looking its size up only when it may be too small"""
+        if last_row <= self._known_rows:
+            return
+        if self._grid is None:
+            self._grid = self._sheet_properties(spreadsheet_id, sheet_title)
+            if self._grid is None:
+                raise SheetsApiError(404, f"Sheet {sheet_title!r} no longer exists; rebuild it to sync again")
+        self._known_rows = grow_grid(self.client, spreadsheet_id, self._grid, last_row)
+
+    def _write_rows(self, spreadsheet_id: str, sheet_title: str, writes: Dict[int, List[Any]]):
+        """Write rows by sheet row number in one values.batchUpdate, one range per run of adjacent rows"""
+        data = []
+        for row_number in sorted(writes):
+            if data and data[-1]['end'] == row_number - 1:
+                data[-1]['values'].append(writes[row_number])
+                data[-1]['end'] = row_number
+            else:
+                data.append({'start': row_number, 'end': row_number, 'values': [writes[row_number]]})
+        self._ensure_grid(spreadsheet_id, sheet_title, data[-1]['end'])
+        self.client.values_batch_update(spreadsheet_id, [
+            {'range': a1_range(sheet_title, f"A{block['start']}:{TRANSACTION_LAST_COLUMN}{block['end']}"),
+             'values': block['values']}
+            for block in data
+        ])
+
+    def sync(self, user_id: int, spreadsheet_id: str, sheet_title: str = LEDGER_SHEET,
+             rebuild: bool = False) -> Dict[str, int]:
+        """
+        Bring a ledger sheet up to date with the user's cached transactions
+
+        The first sync (or rebuild=True) writes the whole ledger under a
+        header row. Later syncs apply only what changed since the last one.
+        Progress is saved after every page, so an interrupted sync picks up
+        where it stopped.
+
+        Args:
+            user_id: The user whose cached transactions are synced
+            spreadsheet_id: Target spreadsheet (the ID in its URL)
+            sheet_title: Sheet holding the ledger
+            rebuild: Clear the sheet and write every transaction again
+
+        Returns:
+            {'written': rows appended, 'updated': rows rewritten in place,
+             'removed': rows blanked, 'api_calls': Sheets requests made, retries included}
+
+        Raises:
+            SheetsApiError: If the API rejects a request or retries run out
+            RuntimeError: If the sync state can't be saved
+        """
+        calls_before = self.client.calls
+        self._grid = None
+        writes: Dict[int, List[Any]] = {}
+
+        state = None if rebuild else self.db.get_sheet_sync(user_id, spreadsheet_id, sheet_title)
+        # A state whose header was never saved (next_row 1) may sit over a sheet that was never cleared
+        if state is None or state['next_row'] < 2:
+            state = self._start(user_id, spreadsheet_id, sheet_title)
+            writes[1] = TRANSACTION_COLUMNS
+        # Rows below next_row were written by earlier syncs, so the grid already has them
+        self._known_rows = state['next_row'] - 1
+
+        stats = {'written': 0, 'updated': 0, 'removed': 0}
+        watermark = (state['watermark_updated_at'], state['watermark_id'])
+        next_row = max(state['next_row'], 2)
+        removal_watermark = state['removal_watermark_id']
+        while True:
+            page = self.db.get_transaction_changes(user_id, watermark[0], watermark[1],
+                                                   self.settle_seconds, self.page_size)
+            removals = self.db.get_sheet_removals(state['id'], user_id, removal_watermark,
+                                                  self.settle_seconds, self.page_size)
+            changes = page['transactions']
+            lookup = [change['transaction_id'] for change in changes]
+            lookup += [change['pending_transaction_id'] for change in changes if change.get('pending_transaction_id')]
+            mapped = self.db.get_sheet_rows(state['id'], lookup)
+
+            released = []
+            for transaction_id, row_number in removals['rows']:
+                writes[row_number] = BLANK_ROW
+                released.append(transaction_id)
+            stats['removed'] += len(removals['rows'])
+
+            saved = []
+            for transaction in changes:
+                row = transaction_row(transaction)
+                fingerprint = row_hash(row)
+                existing = mapped.get(transaction['transaction_id'])
+                if existing is not None and existing[1] == fingerprint:
+                    continue
+                pending_id = transaction.get('pending_transaction_id')
+                if existing is None and pending_id and pending_id in mapped:
+                    # A pending transaction posted under a new ID: take over its row
+                    existing = mapped.pop(pending_id)
+                    released.append(pending_id)
+                if existing is not None:
+                    row_number = existing[0]
+                    stats['updated'] += 1
+                else:
+                    row_number = next_row
+                    next_row += 1
+                    stats['written'] += 1
+                writes[row_number] = row
+                saved.append((transaction['transaction_id'], row_number, fingerprint))
+
+            if writes:
+                self._write_rows(spreadsheet_id, sheet_title, writes)
+            if page['watermark'] is not None:
+                watermark = page['watermark']
+            if removals['watermark'] is not None:
+                removal_watermark = removals['watermark']
+            if writes or page['watermark'] is not None or removals['watermark'] is not None:
+                if not self.db.save_sheet_sync_progress(state['id'], saved, released, watermark[0], watermark[1],
+                                                        removal_watermark, next_row):
+                    raise RuntimeError(f"Could not save the sync state of sheet {sheet_title!r}")
+            writes = {}
+            if len(changes) < self.page_size and removals['count'] < self.page_size:
+                break
+
+        stats['api_calls'] = self.client.calls - calls_before
+        logger.info(f"Synced ledger for user {user_id} to sheet {sheet_title!r} of spreadsheet {spreadsheet_id}: "
+                    f"{stats['written']} new, {stats['updated']} updated, {stats['removed']} removed "
+                    f"in {stats['api_calls']} API calls")
+        return stats
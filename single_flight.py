@@ -0,0 +1,114 @@
+"""
+Single-flight deduplication of concurrent refreshes.
+
+When several callers ask for the same refresh at once (a double-clicked
+"Refresh from Banks", two open tabs, a webhook racing the scheduler), only the
+first one talks to Plaid; the others wait for it and share its result.
+Within a process this is done with an in-memory table of in-flight calls.
+Across worker processes the leader also holds a row in the refresh_locks
+table; a process that finds the row taken waits for it to be released and
+then either reuses what the other process stored or runs the (now cheap)
+refresh itself.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution"""
+
+    def __init__(self, db: Any = None, lock_ttl: Optional[float] = None, poll_interval: float = 0.5):
+        """
+        Args:
+            db: DatabaseManager used for cross-process lock rows (None for in-process only)
+            lock_ttl: Seconds a lock row is honored before it is considered abandoned
+                      (default: PLAID_REFRESH_LOCK_TTL_SECONDS or 300)
+            poll_interval: Seconds between attempts to take a lock held by another process
+        """
+        if lock_ttl is None:
+            lock_ttl = float(os.getenv('PLAID_REFRESH_LOCK_TTL_SECONDS', 300))
+        self.db = db
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.calls: Dict[str, _Call] = {}
+        self.lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any],
+           shared_result: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run func once for all concurrent callers with the same key
+
+        Args:
+            key: Identifies the work, e.g. "transactions:<user>:<token>:<start>:<end>"
+            func: The refresh to run
+            shared_result: Called instead of func when another process has just
+                           finished the same work; if None, func runs after waiting
+
+        Returns:
+            func's result (re-raising its exception) for the leader and every follower
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_locked(key, func, shared_result)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def _run_locked(self, key: str, func: Callable[[], Any],
+                    shared_result: Optional[Callable[[], Any]]) -> Any:
+        """Run func while holding the cross-process lock row for key"""
+        if self.db is None:
+            return func()
+
+        owner = f"{self.owner_prefix}:{uuid.uuid4().hex}"
+        waited = False
+        deadline = time.monotonic() + self.lock_ttl + self.poll_interval
+        while not self.db.acquire_refresh_lock(key, owner, self.lock_ttl):
+            if time.monotonic() >= deadline:
+                # The lock table is unreachable or wedged; refreshing twice beats not at all
+                logger.warning(f"Timed out waiting for refresh lock {key}; running anyway")
+                return func()
+            waited = True
+            time.sleep(self.poll_interval)
+
+        try:
+            if waited and shared_result is not None:
+                return shared_result()
+            return func()
+        finally:
+            self.db.release_refresh_lock(key, owner)
@@ -107,12 +107,16 @@ END;
 $$ language 'plpgsql';
 
 -- Create triggers to automatically update updated_at columns
+-- (dropped first so the script can run against an existing schema)
+DROP TRIGGER IF EXISTS update_user_tokens_updated_at ON user_tokens;
 CREATE TRIGGER update_user_tokens_updated_at BEFORE UPDATE ON user_tokens
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_accounts_updated_at ON accounts;
 CREATE TRIGGER update_accounts_updated_at BEFORE UPDATE ON accounts
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_transactions_updated_at ON transactions;
 CREATE TRIGGER update_transactions_updated_at BEFORE UPDATE ON transactions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
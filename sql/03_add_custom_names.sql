@@ -11,5 +11,11 @@ CREATE INDEX IF NOT EXISTS idx_accounts_custom_name ON accounts(custom_name);
 COMMENT ON COLUMN accounts.custom_name IS 'User-defined custom name for the account (e.g., for couples to identify whose account it is)';
 
 -- Optional: Add a constraint to prevent empty strings (but allow NULL)
-ALTER TABLE accounts ADD CONSTRAINT check_custom_name_not_empty 
-    CHECK (custom_name IS NULL OR length(trim(custom_name)) > 0); 
\ No newline at end of file
+-- (skipped if present, so the migration runner can apply this to any existing schema)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'check_custom_name_not_empty') THEN
+        ALTER TABLE accounts ADD CONSTRAINT check_custom_name_not_empty 
+            CHECK (custom_name IS NULL OR length(trim(custom_name)) > 0);
+    END IF;
+END $$; 
\ No newline at end of file
@@ -6,10 +6,17 @@
 -- Only use this in development environments or when you want to completely reset the database
 
 -- Drop tables in correct order (respecting foreign key constraints)
+DROP TABLE IF EXISTS sheet_sync_rows CASCADE;
+DROP TABLE IF EXISTS sheet_syncs CASCADE;
+DROP TABLE IF EXISTS transaction_removals CASCADE;
+DROP TABLE IF EXISTS transaction_rollups CASCADE;
 DROP TABLE IF EXISTS transactions CASCADE;
 DROP TABLE IF EXISTS accounts CASCADE;
 DROP TABLE IF EXISTS user_tokens CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
+DROP TABLE IF EXISTS institutions CASCADE;
+DROP TABLE IF EXISTS refresh_locks CASCADE;
+DROP TABLE IF EXISTS schema_version CASCADE;
 
 -- Drop functions
 DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
@@ -0,0 +1,8 @@
+-- PostgreSQL Migration: Add transactions_cursor column to user_tokens table
+-- Stores the Plaid /transactions/sync cursor per item so refreshes only fetch changes
+
+-- Add transactions_cursor column to user_tokens table
+ALTER TABLE user_tokens ADD COLUMN IF NOT EXISTS transactions_cursor TEXT;
+
+-- Add a comment to the column
+COMMENT ON COLUMN user_tokens.transactions_cursor IS 'Plaid /transactions/sync cursor; NULL until the first sync completes';
@@ -0,0 +1,8 @@
+-- PostgreSQL Migration: Add last_seen_at column to users table
+-- Lets the background refresh scheduler prioritize recently active users
+
+-- Add last_seen_at column to users table
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITH TIME ZONE;
+
+-- Add a comment to the column
+COMMENT ON COLUMN users.last_seen_at IS 'Last login or dashboard visit; NULL if never recorded';
@@ -0,0 +1,12 @@
+-- PostgreSQL Migration: Add institutions table
+-- Caches Plaid institution metadata (name, logo, colors) so linking another
+-- item at a known bank skips /institutions/get_by_id
+
+CREATE TABLE IF NOT EXISTS institutions (
+    institution_id VARCHAR(255) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    logo TEXT,
+    primary_color VARCHAR(16),
+    url VARCHAR(500),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
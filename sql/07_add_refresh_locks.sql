@@ -0,0 +1,9 @@
+-- PostgreSQL Migration: Add refresh_locks table
+-- Holds one row per in-flight Plaid refresh so that concurrent worker
+-- processes wait for (and reuse) it instead of repeating the same calls
+
+CREATE TABLE IF NOT EXISTS refresh_locks (
+    lock_key VARCHAR(500) PRIMARY KEY,
+    owner VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
@@ -0,0 +1,14 @@
+-- PostgreSQL Migration: Covering index for transaction period queries
+-- Year/month filters are half-open date ranges on (user_id, date); the
+-- INCLUDE columns let summaries run as index-only scans.
+-- Replaces idx_transactions_user_date, which it makes redundant.
+
+-- Personal finance category columns written by DatabaseManager.store_transactions
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS category_primary VARCHAR(100);
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS category_detailed VARCHAR(100);
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS category_confidence VARCHAR(20);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_covering
+    ON transactions(user_id, date) INCLUDE (account_id, amount, category_primary, category);
+
+DROP INDEX IF EXISTS idx_transactions_user_date;
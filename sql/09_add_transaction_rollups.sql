@@ -0,0 +1,38 @@
+-- PostgreSQL Migration: Monthly transaction rollups
+-- One row per (user, YYYY-MM month, account, category) with counts and sums.
+-- DatabaseManager keeps it in step with transactions in the same database
+-- transaction, so monthly and yearly summaries read a handful of rollup rows
+-- instead of scanning raw transactions. Uncategorized values are stored as ''.
+-- Rebuild at any time with: python rebuild_rollups.py --postgres
+
+CREATE TABLE IF NOT EXISTS transaction_rollups (
+    user_id INTEGER NOT NULL,
+    year_month VARCHAR(7) NOT NULL,
+    account_id VARCHAR(255) NOT NULL,
+    category_primary VARCHAR(100) NOT NULL DEFAULT '',
+    category VARCHAR(255) NOT NULL DEFAULT '',
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    total_debits DECIMAL(15,2) NOT NULL DEFAULT 0,
+    total_credits DECIMAL(15,2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, year_month, account_id, category_primary, category),
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+
+-- Backfill from existing transactions
+INSERT INTO transaction_rollups (
+    user_id, year_month, account_id, category_primary, category,
+    transaction_count, total_debits, total_credits, total_amount
+)
+SELECT
+    user_id, to_char(date, 'YYYY-MM'), account_id,
+    COALESCE(category_primary, ''), COALESCE(category, ''),
+    COUNT(*),
+    SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+    SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END),
+    SUM(ABS(amount))
+FROM transactions
+GROUP BY user_id, to_char(date, 'YYYY-MM'), account_id,
+         COALESCE(category_primary, ''), COALESCE(category, '')
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,7 @@
+-- PostgreSQL Migration: Keyset pagination index for transactions
+-- Transaction lists are ordered by (date, datetime, id) newest first and paged
+-- with an opaque cursor on that key, so each page is an index seek no matter
+-- how deep the listing goes.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_keyset
+    ON transactions(user_id, date DESC, datetime DESC NULLS LAST, id DESC);
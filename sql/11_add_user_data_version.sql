@@ -0,0 +1,10 @@
+-- PostgreSQL Migration: Add data_version column to users table
+-- Bumped in the same transaction as every write to a user's accounts or
+-- transactions, so cached summaries keyed by it go stale exactly when the
+-- data does, whichever process made the change
+
+-- Add data_version column to users table
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
+
+-- Add a comment to the column
+COMMENT ON COLUMN users.data_version IS 'Incremented on every change to the user''s accounts or transactions';
@@ -0,0 +1,35 @@
+-- PostgreSQL Migration: Incremental spreadsheet sync state
+-- A ledger sheet is kept in step with a user's transactions by reading only
+-- the rows changed since the last sync: sheet_syncs holds each sheet's
+-- (updated_at, id) watermark and its next free row, and sheet_sync_rows
+-- remembers which sheet row every transaction was written to, so a modified
+-- transaction is rewritten in place instead of re-exporting the ledger.
+
+-- Create sheet_syncs table: one row per synced sheet
+CREATE TABLE IF NOT EXISTS sheet_syncs (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    spreadsheet_id VARCHAR(255) NOT NULL,
+    sheet_title VARCHAR(255) NOT NULL,
+    watermark_updated_at TIMESTAMP WITH TIME ZONE,
+    watermark_id INTEGER NOT NULL DEFAULT 0,
+    next_row INTEGER NOT NULL DEFAULT 2,
+    synced_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+    UNIQUE(user_id, spreadsheet_id, sheet_title)
+);
+
+-- Create sheet_sync_rows table: the sheet row holding each synced transaction
+CREATE TABLE IF NOT EXISTS sheet_sync_rows (
+    sync_id INTEGER NOT NULL,
+    transaction_id VARCHAR(255) NOT NULL,
+    row_number INTEGER NOT NULL,
+    row_hash VARCHAR(40) NOT NULL,
+    PRIMARY KEY (sync_id, transaction_id),
+    FOREIGN KEY (sync_id) REFERENCES sheet_syncs (id) ON DELETE CASCADE
+);
+
+-- Change feed index: transactions in (updated_at, id) order after a watermark
+CREATE INDEX IF NOT EXISTS idx_transactions_user_updated
+    ON transactions(user_id, updated_at, id);
@@ -0,0 +1,27 @@
+-- PostgreSQL Migration: Transaction change tracking for incremental sheet syncs
+-- pending_transaction_id links a posted transaction to the pending one it
+-- replaces, so a ledger sheet can post it in the pending row's place.
+-- transaction_removals records every deleted transaction, so a sync reads
+-- only the removals since its watermark instead of comparing its whole row
+-- mapping against transactions.
+
+-- Plaid's link from a posted transaction to its pending predecessor
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS pending_transaction_id VARCHAR(255);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_pending
+    ON transactions(user_id, pending_transaction_id);
+
+-- Create transaction_removals table: one row per deleted transaction
+CREATE TABLE IF NOT EXISTS transaction_removals (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    transaction_id VARCHAR(255) NOT NULL,
+    removed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_removals_user_id
+    ON transaction_removals(user_id, id);
+
+-- Last transaction_removals row each synced sheet has applied
+ALTER TABLE sheet_syncs ADD COLUMN IF NOT EXISTS removal_watermark_id INTEGER NOT NULL DEFAULT 0;
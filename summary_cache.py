@@ -0,0 +1,63 @@
+"""
+Read-through cache for per-user summaries.
+
+Account and transaction summaries only change when the user's accounts or
+transactions do, yet every dashboard and transactions page recomputed them.
+Each user row carries a data_version that the write methods bump in the same
+transaction as their change; @versioned_summary keys cached results by
+(database, method, user_id, data_version, filters), so a page load costs one
+primary-key lookup of the version until the next write, from any process,
+makes the old entries unreachable. Those age out through the LRU, entry-count
+and memory bounds of the shared TTLCache.
+"""
+
+import copy
+import json
+import os
+from functools import wraps
+from typing import Any, Hashable
+
+from cache_utils import TTLCache
+
+summary_cache = TTLCache(
+    maxsize=int(os.getenv('SUMMARY_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('SUMMARY_CACHE_TTL_SECONDS', 3600)),
+    max_bytes=int(os.getenv('SUMMARY_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+)
+
+_MISSING = object()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Make a filter argument usable in a cache key (lists become tuples)"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _footprint(value: Any) -> int:
+    """Approximate memory used by a cached summary, in bytes"""
+    return len(json.dumps(value, default=str))
+
+
+def versioned_summary(method):
+    """
+    Cache a read method whose first argument is a user ID until the user's data changes
+
+    The owning DatabaseManager provides get_data_version(user_id) and a
+    cache_namespace identifying its database.
+    """
+    @wraps(method)
+    def wrapper(self, user_id, *args, **kwargs):
+        version = self.get_data_version(user_id)
+        if version is None:
+            return method(self, user_id, *args, **kwargs)
+        key = (self.cache_namespace, method.__name__, user_id, version,
+               _freeze(args), tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())))
+        value = summary_cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = method(self, user_id, *args, **kwargs)
+            summary_cache.set(key, value, size=_footprint(value))
+        # Hand out copies so a caller mutating its result can't change the cached one
+        return copy.deepcopy(value)
+    return wrapper